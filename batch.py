@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from agents import Agent, InputGuardrailTripwireTriggered, Runner
+
+from context import UserContext
+from metrics import observe
+from response_cache import CachedRunResult, ResponseCache, get_response_cache, run_cached
+from router import last_user_text, run_routed
+from speculative import run_speculative
+from trip import TripOrchestrator
+
+# -- Batch runner --
+
+# Runs a list of queries through an agent concurrently, bounded by a semaphore, with a timeout
+# per query. Results always come back in input order, so the demo scripts can print them the
+# same way their sequential loops did, and the CLI can replay JSONL query files.
+
+DEFAULT_CONCURRENCY = 4
+
+
+@dataclass
+class BatchResult:
+    index: int
+    query: Any
+    final_output: Any = None
+    guardrail_triggered: bool = False
+    guardrail_output: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    last_agent: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.guardrail_triggered
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "query": self.query,
+            "ok": self.ok,
+            "final_output": _to_jsonable(self.final_output),
+            "last_agent": self.last_agent,
+            "cached": self.cached,
+            "guardrail_triggered": self.guardrail_triggered,
+            "guardrail_output": _to_jsonable(self.guardrail_output),
+            "error": self.error,
+            "elapsed": round(self.elapsed, 4),
+        }
+
+
+def _to_jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    return str(value)
+
+
+async def run_query(
+    agent: Agent,
+    index: int,
+    query: Any,
+    *,
+    context: Any = None,
+    timeout: Optional[float] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    speculative: bool = False,
+    routes: Optional[Dict[str, Agent]] = None,
+    cache: Optional[ResponseCache] = None,
+    trip: Optional[TripOrchestrator] = None,
+) -> BatchResult:
+    """Run one query, turning guardrail trips, timeouts and errors into a BatchResult.
+
+    With `speculative`, input guardrails run alongside the agent instead of ahead of it.
+    With `routes`, the intent router may send the query to one of those agents directly.
+    With `cache`, repeated queries are served from the response cache.
+    With `trip`, whole-trip requests are planned in one concurrent step by the orchestrator.
+    """
+    result = BatchResult(index=index, query=query)
+    if semaphore is not None:
+        await semaphore.acquire()
+    started = time.perf_counter()
+    try:
+        runner = run_speculative if speculative else Runner.run
+        if routes:
+            agent_runner = runner
+
+            async def runner(planner, input, context=None):
+                return await run_routed(planner, routes, input, context=context, runner=agent_runner)
+        if trip is not None:
+            single_runner = runner
+
+            async def runner(planner, input, context=None):
+                request = trip.parse(last_user_text(input))
+                if request is not None:
+                    return await trip.run(input, context=context, request=request)
+                return await single_runner(planner, input, context=context)
+
+        run = await asyncio.wait_for(run_cached(cache, agent, query, context=context, runner=runner), timeout)
+        result.final_output = run.final_output
+        result.last_agent = run.last_agent.name
+        result.cached = isinstance(run, CachedRunResult)
+    except InputGuardrailTripwireTriggered as e:
+        result.guardrail_triggered = True
+        result.guardrail_output = e.guardrail_result.output.output_info
+    except asyncio.TimeoutError:
+        result.error = f"Timed out after {timeout}s"
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.elapsed = time.perf_counter() - started
+        if semaphore is not None:
+            semaphore.release()
+    outcome = result.last_agent or ("guardrail" if result.guardrail_triggered else "error")
+    observe("request", outcome, result.elapsed)
+    return result
+
+
+async def iter_batch(
+    agent: Agent,
+    queries: Sequence[Any],
+    *,
+    context: Any = None,
+    contexts: Optional[Sequence[Any]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = None,
+    speculative: bool = False,
+    routes: Optional[Dict[str, Agent]] = None,
+    cache: Optional[ResponseCache] = None,
+    trip: Optional[TripOrchestrator] = None,
+) -> AsyncIterator[BatchResult]:
+    """Run queries concurrently and yield results in input order as soon as they are ready.
+
+    `contexts` gives one context per query; otherwise `context` is shared by all of them.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(
+            run_query(
+                agent, i, query, context= contexts[i] if contexts else context, timeout= timeout, semaphore= semaphore,
+                speculative= speculative, routes= routes, cache= cache, trip= trip,
+            )
+        )
+        for i, query in enumerate(queries)
+    ]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_batch(
+    agent: Agent,
+    queries: Sequence[Any],
+    *,
+    context: Any = None,
+    contexts: Optional[Sequence[Any]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = None,
+    speculative: bool = False,
+    routes: Optional[Dict[str, Agent]] = None,
+    cache: Optional[ResponseCache] = None,
+    trip: Optional[TripOrchestrator] = None,
+) -> List[BatchResult]:
+    """Run queries concurrently and return every result in input order."""
+    return [
+        result
+        async for result in iter_batch(
+            agent, queries, context= context, contexts= contexts, concurrency= concurrency, timeout= timeout,
+            speculative= speculative, routes= routes, cache= cache, trip= trip,
+        )
+    ]
+
+
+# -- CLI --
+
+def load_agent(spec: str, default_attr: str = "travel_agent") -> Any:
+    """Import an agent given as 'module:attribute', e.g. 'output:travel_agent'."""
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr or default_attr)
+
+
+def parse_query_line(line: str, default_user_id: str):
+    """Read one JSONL line: a bare string or {"query": ..., "context": {...UserContext fields}}."""
+    record = json.loads(line)
+    if isinstance(record, str):
+        return record, UserContext(user_id=default_user_id)
+    context = dict(record.get("context") or {})
+    context.setdefault("user_id", default_user_id)
+    return record["query"], UserContext(**context)
+
+
+async def replay(args) -> int:
+    agent = load_agent(args.agent)
+    routes = load_agent(args.routes, "fast_routes") if args.routes else None
+    cache = get_response_cache(force=True) if args.response_cache else None
+    trip = load_agent(args.trip, "trip_planner") if args.trip else None
+    with open(args.queries, encoding="utf-8") if args.queries != "-" else sys.stdin as f:
+        parsed = [parse_query_line(line, args.user_id) for line in f if line.strip()]
+    queries = [query for query, _ in parsed]
+    contexts = [context for _, context in parsed]
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failures = 0
+    try:
+        batch = iter_batch(
+            agent, queries, contexts=contexts, concurrency=args.concurrency,
+            timeout=args.timeout, speculative=args.speculative, routes=routes,
+            cache=cache, trip=trip,
+        )
+        async for result in batch:
+            failures += result.error is not None
+            out.write(json.dumps(result.to_dict()) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a JSONL file of queries through an agent concurrently.")
+    parser.add_argument("queries", help="JSONL file of queries ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="Write JSONL results here instead of stdout")
+    parser.add_argument("--agent", default="output:travel_agent", help="Agent to run, as module:attribute")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="Per-query timeout in seconds")
+    parser.add_argument("--speculative", action="store_true", help="Run input guardrails alongside the agent")
+    parser.add_argument(
+        "--routes", metavar="MODULE:ATTR",
+        help="Let the intent router send queries straight to these agents, e.g. output:fast_routes",
+    )
+    parser.add_argument(
+        "--response-cache", action="store_true",
+        help="Serve repeated queries from the response cache (configured by RESPONSE_CACHE_TTL)",
+    )
+    parser.add_argument(
+        "--trip", metavar="MODULE:ATTR",
+        help="Plan whole-trip requests in one concurrent step with this orchestrator, e.g. output:trip_planner",
+    )
+    parser.add_argument("--user-id", default="batch", help="user_id for queries without a context")
+    args = parser.parse_args(argv)
+    return asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Benchmark the agent graph end to end on the replay model: latency percentiles and throughput.
+
+Model calls are answered from recorded responses (replay.py) after a seeded artificial latency,
+so the model is held constant and the numbers show our own overhead: guardrails, routing,
+handoffs, tool execution and output parsing, alone and under concurrency.
+
+Run from the repository root:
+
+    python -m benchmarks.agent_graph --latency 0.2 --concurrency 1 8 32 128
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+# The span console would dominate the measurements
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+# Offline there is no key to export traces with; the SDK would warn on every flush
+logging.getLogger("openai.agents").setLevel(logging.ERROR)
+
+from batch import run_query  # noqa: E402
+from context import UserContext  # noqa: E402
+from metrics import format_report, get_metrics  # noqa: E402
+from output import budget_analysis_agent, conversational_agent, fast_routes, travel_agent  # noqa: E402
+from replay import DEFAULT_RECORDING, Latency, Recording, use_replay_model  # noqa: E402
+
+AGENTS = [travel_agent, budget_analysis_agent, conversational_agent, *fast_routes.values()]
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+async def run_level(queries, n_requests, concurrency, context, routes, speculative):
+    """Closed loop: `concurrency` workers each send their next request as soon as one finishes."""
+    pending = iter(range(n_requests))
+    latencies, errors = [], []
+
+    async def worker():
+        for i in pending:
+            result = await run_query(
+                travel_agent, i, queries[i % len(queries)], context=context, speculative=speculative, routes=routes,
+            )
+            latencies.append(result.elapsed)
+            if result.error:
+                errors.append(result.error)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(label, latencies, errors, wall):
+    ms = [latency * 1e3 for latency in latencies]
+    print(
+        f"{label:<18} p50 {percentile(ms, 50):8.1f} ms  p95 {percentile(ms, 95):8.1f} ms  "
+        f"p99 {percentile(ms, 99):8.1f} ms  {len(ms) / wall:8.1f} req/s"
+        + (f"  {len(errors)} errors, e.g. {errors[0]}" if errors else "")
+    )
+
+
+async def main_async(args):
+    recording = Recording.from_jsonl(args.recording)
+    queries = recording.queries()
+    routes = fast_routes if args.routes else None
+    context = UserContext(
+        user_id="benchmark", preferred_airlines=["SkyWays", "OceanAir"],
+        hotel_amenities=["WiFi", "Pool"], budget_level="mid-range",
+    )
+    print(
+        f"{len(queries)} recorded queries, {len(recording)} model turns; "
+        f"routes={'on' if routes else 'off'}, speculative={'on' if args.speculative else 'off'}"
+    )
+
+    # Our overhead alone: no model latency, one request at a time
+    use_replay_model(AGENTS, recording, Latency())
+    await run_level(queries, len(queries), 1, context, routes, args.speculative)  # warm caches and imports
+    report("overhead only", *await run_level(queries, args.requests, 1, context, routes, args.speculative))
+
+    print(f"model latency {args.latency * 1e3:.0f} ms (+{args.per_token * 1e3:.2f} ms/token, jitter {args.jitter})")
+    for concurrency in args.concurrency:
+        # The same seeded latency draws at every level
+        use_replay_model(AGENTS, recording, Latency(args.latency, args.per_token, args.jitter, seed=1))
+        report(f"concurrency {concurrency}", *await run_level(queries, args.requests, concurrency, context, routes, args.speculative))
+
+    if args.stages:
+        print("\nslowest stages over every run (p95, from the stage histograms):")
+        print(format_report(get_metrics().summaries(), limit=args.stages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", default=DEFAULT_RECORDING)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per model call")
+    parser.add_argument("--per-token", type=float, default=0.0, help="Extra seconds per output token")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Lognormal spread of the latency")
+    parser.add_argument("--routes", action="store_true", help="Let the intent router skip the planner")
+    parser.add_argument("--speculative", action="store_true", help="Run input guardrails alongside the agent")
+    parser.add_argument("--stages", type=int, default=12, help="Slowest stages to list at the end (0 for none)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the local budget cost model with the Budget Analyzer LLM agent.
+
+Run from the repository root:
+
+    python -m benchmarks.budget                 # local path only
+    python -m benchmarks.budget --llm 10        # also time 10 LLM calls (needs OPENAI_API_KEY)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from budget import MIN_CONFIDENCE, assess_budget, get_cost_table
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "budget_queries.txt")
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def llm_analysis(query):
+    from agents import Runner
+    from output import BudgetAnalysis, budget_analysis_agent
+
+    prompt = f"The user is planning a trip and said: {query}.\nAnalyze if their budget is realistic for a trip to their destination for the length they mentioned."
+    result = await Runner.run(budget_analysis_agent, prompt)
+    return result.final_output_as(BudgetAnalysis)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the corpus for the local path")
+    parser.add_argument("--llm", type=int, default=0, help="Number of corpus queries to send to the LLM agent")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    get_cost_table()  # load the table outside the timed region
+
+    samples = []
+    for _ in range(args.repeat):
+        for query in queries:
+            started = time.perf_counter()
+            assess_budget(query)
+            samples.append(time.perf_counter() - started)
+
+    assessments = [assess_budget(q) for q in queries]
+    local_share = sum(a.confidence >= MIN_CONFIDENCE for a in assessments) / len(queries)
+    print(f"corpus: {len(queries)} queries, {local_share:.0%} answered locally (confidence >= {MIN_CONFIDENCE})")
+    print(
+        f"local model: p50 {percentile(samples, 0.5) * 1e6:.1f} us, "
+        f"p95 {percentile(samples, 0.95) * 1e6:.1f} us, mean {statistics.mean(samples) * 1e6:.1f} us"
+    )
+
+    if args.llm:
+        if not os.getenv("OPENAI_API_KEY"):
+            print("skipping LLM path: OPENAI_API_KEY is not set")
+            return
+        llm_samples, agree = [], 0
+        for query, local in zip(queries[: args.llm], assessments):
+            started = time.perf_counter()
+            analysis = asyncio.run(llm_analysis(query))
+            llm_samples.append(time.perf_counter() - started)
+            agree += analysis.is_realistic == local.analysis.is_realistic
+        print(
+            f"LLM agent:   p50 {percentile(llm_samples, 0.5) * 1e3:.0f} ms, "
+            f"p95 {percentile(llm_samples, 0.95) * 1e3:.0f} ms, "
+            f"verdict agreement with local model {agree}/{len(llm_samples)}"
+        )
+        print(f"speedup at p50: {percentile(llm_samples, 0.5) / percentile(samples, 0.5):,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark the memory-mapped climatology store: open time, forecasts and city-name resolution.
+
+A synthetic store of made-up cities with random monthly normals is compiled and saved to a
+temporary directory, then opened with mmap_mode="r" as every worker process does. Resolution
+is timed uncached, for exact names, prefixes and misspellings, and the forecast the weather
+tool returns is timed with the per-process name cache warm.
+
+Run from the repository root:
+
+    python -m benchmarks.climatology --cities 20000 --lookups 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from climatology import Climatology, normalize_city
+
+# Onset, vowel and coda combinations give a few hundred syllables, enough for names to differ
+SYLLABLES = [
+    onset + vowel + coda
+    for onset in ["", "b", "br", "c", "d", "f", "g", "k", "l", "m", "n", "p", "r", "s", "st", "t", "v", "z"]
+    for vowel in ["a", "e", "i", "o", "u", "ou"]
+    for coda in ["", "n", "r", "s", "l"]
+]
+
+
+def build_synthetic_store(n_cities: int, seed: int = 5) -> Climatology:
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+    names, seen = [], set()
+    while len(names) < n_cities:
+        name = "".join(pick.choice(SYLLABLES) for _ in range(pick.randint(2, 4))).title()
+        if pick.random() < 0.2:
+            name = f"{name} {pick.choice(['City', 'Beach', 'Springs', 'Falls'])}"
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+
+    # A seasonal cycle per city, shifted by half a year in the southern hemisphere
+    season = np.cos((np.arange(12) - 0.5) / 12 * 2 * np.pi)
+    hemisphere = rng.choice([1, -1], size=(n_cities, 1), p=[0.8, 0.2])
+    mean = rng.uniform(-5, 28, size=(n_cities, 1))
+    swing = rng.uniform(1, 15, size=(n_cities, 1))
+    tmax = mean + 5 - hemisphere * swing * season
+    normals = {
+        "tmin": tmax - rng.uniform(5, 12, size=(n_cities, 1)),
+        "tmax": tmax,
+        "wet_days": rng.uniform(0, 20, size=(n_cities, 12)),
+        "sunshine": rng.uniform(15, 90, size=(n_cities, 12)),
+    }
+    return Climatology.from_monthly(
+        names,
+        ["XX"] * n_cities,
+        rng.integers(1, 20_000, size=n_cities),
+        [[] for _ in range(n_cities)],
+        normals,
+    )
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Drop, double or swap one letter after the first."""
+    i = rng.randrange(1, len(name) - 1)
+    edit = rng.choice(["drop", "double", "swap"])
+    if edit == "drop":
+        return name[:i] + name[i + 1:]
+    if edit == "double":
+        return name[:i] + name[i] + name[i:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def per_call_us(func, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=20_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    built = build_synthetic_store(args.cities)
+    print(f"compiled {len(built):,} cities ({len(built.keys):,} names) in {time.perf_counter() - started:.2f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        built.save(directory)
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        started = time.perf_counter()
+        store = Climatology.open(directory)
+        print(f"store {size / 2**20:.1f} MiB on disk, opened (memory-mapped) in {(time.perf_counter() - started) * 1e3:.2f} ms")
+
+        rng = random.Random(11)
+        names = [str(name) for name in rng.choices(built.names.tolist(), k=args.lookups)]
+        prefixes = [normalize_city(name)[:max(4, len(name) // 2)] for name in names]
+        typos = [misspell(name, rng) for name in names]
+        days = [date(2025, 1, 1) + timedelta(days=rng.randrange(365)) for _ in names]
+
+        first = time.perf_counter()
+        store.forecast(names[0], days[0])
+        print(f"first forecast, pages cold: {(time.perf_counter() - first) * 1e6:8.1f} us")
+
+        print(f"resolve exact name:         {per_call_us(store._resolve, names):8.1f} us")
+        print(f"resolve prefix:             {per_call_us(store._resolve, prefixes):8.1f} us")
+        print(f"resolve misspelling:        {per_call_us(store._resolve, typos):8.1f} us")
+
+        found = sum(store.resolve(typo) == store.resolve(name) for typo, name in zip(typos, names))
+        print(f"misspellings resolved to the intended city: {found / len(names):.1%}")
+
+        pairs = list(zip(names, days))
+        print(f"forecast, name cache warm:  {per_call_us(lambda pair: store.forecast(*pair), pairs):8.1f} us")
+        del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark the connection search against brute-force pairing of legs.
+
+Run from the repository root:
+
+    python -m benchmarks.connections --places 150 --legs-per-day 4000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from connections import MAX_TRIP_DAYS, MINUTES_PER_DAY, Itinerary, RouteGraph, rank_itineraries
+from flight_inventory import AIRLINES, FlightInventory
+
+
+def build_schedule(n_places: int, legs_per_day: int, n_days: int, seed: int = 7) -> FlightInventory:
+    """A daily schedule repeated over `n_days`: hubs get most of the traffic, like real networks."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_places + 1) ** 0.8
+    weights /= weights.sum()
+    origin = rng.choice(n_places, legs_per_day, p=weights).astype(np.int32)
+    destination = (origin + 1 + rng.choice(n_places - 1, legs_per_day)).astype(np.int32) % n_places
+    departure = rng.integers(5 * 60, 23 * 60, legs_per_day)
+    arrival = departure + rng.integers(50, 10 * 60, legs_per_day)
+    price = rng.uniform(59, 900, legs_per_day)
+    stops = np.zeros(legs_per_day, dtype=np.int8)
+    airline = rng.integers(0, len(AIRLINES), legs_per_day)
+    first_day = date.today().toordinal()
+    day = np.repeat(np.arange(first_day, first_day + n_days), legs_per_day)
+    tile = lambda column: np.tile(column, n_days)
+    places = [f"City {i:03d}" for i in range(n_places)]
+    return FlightInventory(
+        tile(origin), tile(destination), day, tile(departure), tile(arrival), tile(price),
+        tile(stops), tile(airline), places, AIRLINES,
+    )
+
+
+def brute_force(graph: RouteGraph, origin: str, destination: str, day: date, max_legs: int = 3):
+    """Try every chain of legs with valid connections, then rank; no pruning, no index."""
+    o, d = graph.inventory.place_id(origin), graph.inventory.place_id(destination)
+    deadline = (day.toordinal() + 1 + MAX_TRIP_DAYS) * MINUTES_PER_DAY
+    by_origin = {}
+    for row in range(len(graph.price)):
+        by_origin.setdefault(int(graph.origin[row]), []).append(row)
+    found = []
+
+    def extend(legs):
+        last = legs[-1]
+        hub = int(graph.destination[last])
+        if graph.arr_utc[last] > deadline:
+            return
+        if hub == d:
+            found.append(legs)
+            return
+        if len(legs) == max_legs:
+            return
+        visited = {int(graph.origin[legs[0]])} | {int(graph.destination[leg]) for leg in legs}
+        for row in by_origin.get(hub, []):
+            wait = graph.dep_utc[row] - graph.arr_utc[last]
+            if wait >= graph.min_connection[hub] and int(graph.destination[row]) not in visited:
+                extend(legs + (row,))
+
+    for row in by_origin.get(o, []):
+        if graph.day[row] == day.toordinal():
+            extend((row,))
+    itineraries = [
+        Itinerary(legs, float(sum(graph.price[list(legs)])), int(graph.dep_utc[legs[0]]), int(graph.arr_utc[legs[-1]]),
+                  int(sum(graph.stops[list(legs)])) + len(legs) - 1)
+        for legs in found
+    ]
+    return rank_itineraries(itineraries), len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", type=int, default=150)
+    parser.add_argument("--legs-per-day", type=int, default=4000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--brute-queries", type=int, default=5)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = RouteGraph(build_schedule(args.places, args.legs_per_day, args.days))
+    print(f"graph over {len(graph.price):,} legs ({args.legs_per_day:,}/day) built in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(1)
+    day = date.today() + timedelta(days=1)
+    queries = [tuple(rng.sample(graph.place_names, 2)) for _ in range(args.queries)]
+
+    samples, found = [], 0
+    for origin, destination in queries:
+        started = time.perf_counter()
+        found += len(graph.search(origin, destination, day, preferred_airlines=["SkyWays"], limit=10))
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    print(
+        f"route graph: p50 {samples[len(samples) // 2] * 1e3:.2f} ms, p95 {samples[int(len(samples) * 0.95)] * 1e3:.2f} ms "
+        f"({found / len(queries):.1f} options/query)"
+    )
+
+    brute_samples, agree = [], 0
+    for origin, destination in queries[: args.brute_queries]:
+        started = time.perf_counter()
+        expected, chains = brute_force(graph, origin, destination, day)
+        brute_samples.append(time.perf_counter() - started)
+        got = graph.search(origin, destination, day)
+        key = lambda its: sorted((round(i.price, 2), i.duration, i.stops) for i in its)
+        agree += key(got) == key(expected)
+    print(
+        f"brute force: mean {np.mean(brute_samples) * 1e3:.0f} ms over {len(brute_samples)} queries, "
+        f"same Pareto front {agree}/{len(brute_samples)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
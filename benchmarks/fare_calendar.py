@@ -0,0 +1,93 @@
+"""Benchmark fare-calendar range lookups and incremental repricing against per-day searches.
+
+Run from the repository root:
+
+    python -m benchmarks.fare_calendar --fares 2000000 --updates 200000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from benchmarks.flights import build_synthetic_inventory
+from fare_calendar import FareCalendar
+
+
+def cheapest_by_search(inventory, origin, destination, start, n_days):
+    """What the agent does without the calendar: one search per day, keeping the cheapest fare."""
+    days = []
+    for i in range(n_days):
+        fares = inventory.search(origin, destination, start + timedelta(days=i))
+        if fares:
+            days.append(min(fare.price for fare in fares))
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fares", type=int, default=2_000_000)
+    parser.add_argument("--places", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--range-days", type=int, default=14)
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=100, help="Fares repriced per update_prices call")
+    args = parser.parse_args()
+
+    inventory = build_synthetic_inventory(args.fares, n_places=args.places)
+    started = time.perf_counter()
+    calendar = FareCalendar(inventory)
+    print(f"calendar over {len(inventory):,} fares built in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(3)
+    today = date.today()
+    queries = []
+    for _ in range(args.queries):
+        origin, destination = rng.sample(inventory.places, 2)
+        queries.append((origin, destination, today + timedelta(days=rng.randrange(60))))
+
+    started = time.perf_counter()
+    for origin, destination, start in queries:
+        calendar.lookup(origin, destination, start, start + timedelta(days=args.range_days - 1))
+    calendar_us = (time.perf_counter() - started) / len(queries) * 1e6
+    started = time.perf_counter()
+    for origin, destination, start in queries:
+        cheapest_by_search(inventory, origin, destination, start, args.range_days)
+    search_us = (time.perf_counter() - started) / len(queries) * 1e6
+    print(
+        f"{args.range_days}-day range: calendar {calendar_us:7.1f} us/query, "
+        f"per-day searches {search_us:7.1f} us/query ({args.range_days} tool calls instead of 1)"
+    )
+    agree = all(
+        [day.price for day in calendar.lookup(o, d, s, s + timedelta(days=args.range_days - 1))]
+        == cheapest_by_search(inventory, o, d, s, args.range_days)
+        for o, d, s in queries[:50]
+    )
+    print(f"calendar matches per-day searches: {agree}")
+
+    # Random repricing, half of it aimed at the current cheapest fares so rises force rescans
+    np_rng = np.random.default_rng(5)
+    n_batches = max(args.updates // args.batch, 1)
+    batches = []
+    for _ in range(n_batches):
+        rows = np_rng.integers(0, len(inventory), args.batch)
+        cheapest = calendar.min_row[np_rng.integers(0, len(calendar.min_row), args.batch // 2)]
+        rows[: len(cheapest)] = np.where(cheapest >= 0, cheapest, rows[: len(cheapest)])
+        batches.append((rows, np_rng.uniform(49, 1500, args.batch).astype(np.float32)))
+
+    started = time.perf_counter()
+    for rows, prices in batches:
+        inventory.update_prices(rows, prices)
+    elapsed = time.perf_counter() - started
+    print(f"incremental updates: {elapsed / (n_batches * args.batch) * 1e6:6.2f} us/fare")
+
+    started = time.perf_counter()
+    rebuilt = FareCalendar(inventory)
+    rebuild = time.perf_counter() - started
+    print(f"full rebuild:        {rebuild:6.2f} s")
+    print(f"aggregates match a rebuild: {np.array_equal(calendar.min_price, rebuilt.min_price)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark indexed flight lookups against a Python scan over the same fares.
+
+Run from the repository root:
+
+    python -m benchmarks.flights --fares 2000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from flight_inventory import AIRLINES, FlightInventory
+
+
+def build_synthetic_inventory(n_fares: int, n_places: int = 200, n_days: int = 90, seed: int = 7) -> FlightInventory:
+    """Generate a random but reproducible inventory of `n_fares` fares."""
+    rng = np.random.default_rng(seed)
+    origin = rng.integers(0, n_places, n_fares, dtype=np.int32)
+    # Shift destinations by a non-zero offset so no fare flies back to its origin
+    destination = (origin + rng.integers(1, n_places, n_fares, dtype=np.int32)) % n_places
+    first_day = date.today().toordinal()
+    day = first_day + rng.integers(0, n_days, n_fares, dtype=np.int32)
+    departure = rng.integers(0, 24 * 60, n_fares, dtype=np.int16)
+    arrival = departure + rng.integers(45, 16 * 60, n_fares, dtype=np.int16)
+    price = rng.uniform(49, 1500, n_fares).astype(np.float32)
+    stops = rng.choice(np.array([0, 0, 0, 1, 1, 2], dtype=np.int8), n_fares)
+    airline = rng.integers(0, len(AIRLINES), n_fares, dtype=np.int16)
+    places = [f"City {i:04d}" for i in range(n_places)]
+    return FlightInventory(origin, destination, day, departure, arrival, price, stops, airline, places, AIRLINES)
+
+
+def scan(rows, origin, destination, day):
+    return [r for r in rows if r[0] == origin and r[1] == destination and r[2] == day]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fares", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--scan-queries", type=int, default=20)
+    parser.add_argument("--fixture", help="Where to write the .npz fixture (defaults to a temp file)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    inventory = build_synthetic_inventory(args.fares)
+    print(f"built {len(inventory):,} fares in {time.perf_counter() - started:.2f}s")
+
+    fixture = args.fixture or os.path.join(tempfile.mkdtemp(), "flights.npz")
+    inventory.save_npz(fixture)
+    started = time.perf_counter()
+    inventory = FlightInventory.load(fixture)
+    print(f"loaded fixture {fixture} in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(1)
+    today = date.today()
+    queries = [
+        (rng.choice(inventory.places), rng.choice(inventory.places), today + timedelta(days=rng.randrange(90)))
+        for _ in range(args.queries)
+    ]
+
+    started = time.perf_counter()
+    found = sum(len(inventory.search(o, d, day, preferred_airlines=["SkyWays"], limit=10)) for o, d, day in queries)
+    elapsed = time.perf_counter() - started
+    print(f"indexed search: {elapsed / len(queries) * 1e6:8.1f} us/query ({found} results)")
+
+    places = inventory.places
+    rows = [
+        (places[o], places[d], day)
+        for o, d, day in zip(inventory.origin.tolist(), inventory.destination.tolist(), inventory.day.tolist())
+    ]
+    started = time.perf_counter()
+    for o, d, day in queries[: args.scan_queries]:
+        scan(rows, o, d, day.toordinal())
+    elapsed = time.perf_counter() - started
+    print(f"python scan:    {elapsed / args.scan_queries * 1e6:8.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark bitmask hotel ranking against the original per-hotel Python ranking.
+
+Run from the repository root:
+
+    python -m benchmarks.hotels --hotels 50000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from hotel_inventory import AMENITIES, HotelInventory, amenity_names
+
+
+def build_synthetic_inventory(n_hotels: int, city: str = "Paris", seed: int = 7) -> HotelInventory:
+    """Generate `n_hotels` random hotels in one city."""
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(40, 900, n_hotels).astype(np.float32)
+    amenities = rng.integers(0, 1 << len(AMENITIES), n_hotels, dtype=np.uint32)
+    names = [f"Hotel {i}" for i in range(n_hotels)]
+    locations = [f"District {i % 20}" for i in range(n_hotels)]
+    return HotelInventory(np.zeros(n_hotels, dtype=np.int32), price, amenities, names, locations, [city])
+
+
+def rank_python(hotels, preferred_amenities, budget_level, max_price):
+    """The ranking search_hotels used before the bitmask inventory."""
+    filtered = [hotel for hotel in hotels if hotel["price_per_night"] <= max_price]
+    for hotel in filtered:
+        matching = [a for a in preferred_amenities if a in hotel["amenities"]]
+        hotel["matching_amenities"] = matching
+        hotel["preference_score"] = len(matching)
+    filtered.sort(key=lambda x: x["preference_score"], reverse=True)
+    if budget_level == "budget":
+        filtered.sort(key=lambda x: x["price_per_night"])
+    elif budget_level == "luxury":
+        filtered.sort(key=lambda x: x["price_per_night"], reverse=True)
+    return filtered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hotels", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    inventory = build_synthetic_inventory(args.hotels)
+    hotels = [
+        {
+            "name": inventory.names[i],
+            "location": inventory.locations[i],
+            "price_per_night": float(inventory.price[i]),
+            "amenities": amenity_names(int(inventory.amenities[i])),
+        }
+        for i in range(len(inventory))
+    ]
+
+    rng = random.Random(1)
+    queries = [
+        (rng.sample(AMENITIES, rng.randint(1, 4)), rng.choice(["budget", "mid-range", "luxury"]), rng.uniform(100, 900))
+        for _ in range(args.queries)
+    ]
+
+    started = time.perf_counter()
+    for amenities, level, max_price in queries:
+        inventory.search("Paris", amenities, level, max_price, limit=args.top)
+    vectorized = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    for amenities, level, max_price in queries:
+        rank_python(hotels, amenities, level, max_price)[: args.top]
+    python = (time.perf_counter() - started) / len(queries)
+
+    print(f"{args.hotels:,} hotels, top {args.top}")
+    print(f"bitmask + argpartition: {vectorized * 1e3:8.2f} ms/query")
+    print(f"python ranking:         {python * 1e3:8.2f} ms/query ({python / vectorized:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
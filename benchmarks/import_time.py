@@ -0,0 +1,95 @@
+"""Benchmark start-up import time and fail when the lazy layout regresses.
+
+Each target runs in fresh interpreters, so nothing is already imported: `import output`
+(the models and agent factories, no agents built), the module-level imports of home.py (what
+the first page render waits for), and building the agents on first use. Wall time is the
+median over --repeat runs; one extra run under `python -X importtime` lists the modules
+loaded and the slowest ones. The check fails (exit status 1) when a start-up target loads
+the Agents SDK, openai or logfire, or takes longer than its budget.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time --repeat 5 --top 8
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded with the first message, never before the first render
+DEFERRED = ("agents", "openai", "logfire", "opentelemetry")
+
+
+def home_imports() -> str:
+    """home.py's module-level import statements, leaving out the ones deferred to the first message."""
+    with open(os.path.join(ROOT, "home.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+# (name, code, budget in ms or None, start-up target: DEFERRED modules must stay unloaded)
+TARGETS: List[Tuple[str, str, Optional[float], bool]] = [
+    ("import output", "import output", 400, True),
+    ("home.py first render", home_imports(), 600, True),
+    ("agents built", "import output\noutput.load('agent_graph')", None, False),
+]
+
+
+def run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    timed = f"import time\n_started = time.perf_counter()\n{code}\nprint(time.perf_counter() - _started)"
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", timed]
+    env = {**os.environ, "LOGFIRE_CONSOLE": "false", "PYTHONPATH": ROOT}
+    process = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f"{code!r} failed:\n{process.stderr}")
+    return process
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) per `import time:` line."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=8, help="Slowest modules to list per target")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget, for slower machines")
+    args = parser.parse_args()
+
+    failures = []
+    for name, code, budget, startup in TARGETS:
+        wall = statistics.median(float(run(code).stdout.split()[-1]) for _ in range(args.repeat)) * 1e3
+        modules = parse_importtime(run(code, importtime=True).stderr)
+        roots = {module.split(".")[0] for module, _, _ in modules}
+        deferred = sorted(roots.intersection(DEFERRED))
+
+        limit = budget * args.budget_scale if budget else None
+        print(f"{name:<22} {wall:8.1f} ms" + (f"  (budget {limit:.0f} ms)" if limit else "") + f"   {len(modules)} modules")
+        print(f"  loads: {', '.join(deferred) or 'none of ' + ', '.join(DEFERRED)}")
+        for module, _, cumulative in sorted(modules, key=lambda m: m[2], reverse=True)[: args.top]:
+            print(f"  {cumulative / 1e3:8.1f} ms  {module}")
+
+        if startup and deferred:
+            failures.append(f"{name} imports {', '.join(deferred)}")
+        if limit and wall > limit:
+            failures.append(f"{name} took {wall:.0f} ms, over its {limit:.0f} ms budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
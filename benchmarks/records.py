@@ -0,0 +1,99 @@
+"""Benchmark slotted tool-output records against the dict-per-result representation.
+
+Run from the repository root:
+
+    python -m benchmarks.records --results 100000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.flights import build_synthetic_inventory as build_flights
+from benchmarks.hotels import build_synthetic_inventory as build_hotels
+from flight_inventory import format_clock
+from hotel_inventory import amenity_mask, amenity_names
+from records import dumps
+
+PREFERRED_AIRLINES = ["SkyWays", "United"]
+PREFERRED_AMENITIES = ["Pool", "WiFi", "Spa"]
+
+
+def flight_dict(inventory, row, preferred):
+    """How FlightInventory built a result before the records: a dict grown key by key."""
+    flight = {
+        "airline": inventory.airlines[inventory.airline[row]],
+        "departure_time": format_clock(inventory.departure[row]),
+        "arrival_time": format_clock(inventory.arrival[row]),
+        "price": round(float(inventory.price[row]), 2),
+        "direct": bool(inventory.stops[row] == 0),
+    }
+    if preferred:
+        flight["preferred"] = True
+    return flight
+
+
+def hotel_dict(inventory, row, score, preference_mask):
+    """How HotelInventory built a result before the records."""
+    hotel = {
+        "name": inventory.names[row],
+        "location": inventory.locations[row],
+        "price_per_night": round(float(inventory.price[row]), 2),
+        "amenities": amenity_names(int(inventory.amenities[row])),
+    }
+    hotel["matching_amenities"] = amenity_names(int(inventory.amenities[row]) & preference_mask)
+    hotel["preference_score"] = score
+    return hotel
+
+
+def measure(label, build, serialize):
+    """Time building and serializing the results, and the memory the built results hold."""
+    gc.collect()
+    started = time.perf_counter()
+    results = build()
+    built = time.perf_counter() - started
+    del results
+    # Memory is measured on a second build, as tracing slows allocation down
+    gc.collect()
+    tracemalloc.start()
+    results = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    text = serialize(results)
+    serialized = time.perf_counter() - started
+    print(
+        f"  {label:<8} build {built * 1e3:7.1f} ms   serialize {serialized * 1e3:7.1f} ms   "
+        f"total {(built + serialized) * 1e3:7.1f} ms   held {held / 2**20:6.1f} MiB ({held / len(results):5.0f} B/result)"
+    )
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", type=int, default=100_000)
+    args = parser.parse_args()
+
+    flights = build_flights(args.results)
+    rows = np.arange(args.results)
+    preferred = flights.airline_mask(PREFERRED_AIRLINES)[flights.airline]
+    print(f"{args.results:,} flight results")
+    old = measure("dicts", lambda: [flight_dict(flights, r, p) for r, p in zip(rows.tolist(), preferred.tolist())], json.dumps)
+    new = measure("records", lambda: flights._to_records(rows, preferred), dumps)
+    print(f"  same JSON: {old == new}")
+
+    hotels = build_hotels(args.results)
+    mask = amenity_mask(PREFERRED_AMENITIES)
+    scores = np.bitwise_count(hotels.amenities & mask).astype(np.int64)
+    print(f"{args.results:,} hotel results")
+    old = measure("dicts", lambda: [hotel_dict(hotels, r, s, mask) for r, s in zip(rows.tolist(), scores.tolist())], json.dumps)
+    new = measure("records", lambda: hotels._to_records(rows, scores, mask), dumps)
+    print(f"  same JSON: {old == new}")
+
+
+if __name__ == "__main__":
+    main()
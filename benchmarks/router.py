@@ -0,0 +1,91 @@
+"""Measure the fast-path intent router: routing accuracy, LLM calls saved and decision time.
+
+Run from the repository root:
+
+    python -m benchmarks.router               # 5-fold cross-validation over data/intent_queries.tsv
+    python -m benchmarks.router --folds 10
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+
+from router import DEFAULT_CORPUS, FALLBACK_INTENT, INTENTS, IntentRouter, NaiveBayes, load_corpus
+
+# Model calls per query with and without the router. Through the planner, a flight or hotel
+# query costs a handoff turn plus the specialist's tool and answer turns, and a weather query
+# a tool turn plus an answer turn; routed, the handoff turn disappears and weather needs no
+# model at all. Budget guardrail calls are the same on both paths and are left out.
+PLANNER_CALLS = {"flight": 3, "hotel": 3, "weather": 2, "chat": 1, "plan": 2}
+ROUTED_CALLS = {"flight": 2, "hotel": 2, "weather": 0, "chat": 1}
+
+
+def cross_validate(examples, folds, seed):
+    """Route every query with a router trained on the other folds; return (label, route) pairs."""
+    shuffled = examples[:]
+    random.Random(seed).shuffle(shuffled)
+    decisions = []
+    for k in range(folds):
+        train = [e for i, e in enumerate(shuffled) if i % folds != k]
+        test = [e for i, e in enumerate(shuffled) if i % folds == k]
+        router = IntentRouter(NaiveBayes().fit(train))
+        decisions += [(label, router.route(text)) for label, text in test]
+    return decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    examples = load_corpus(args.corpus)
+    decisions = cross_validate(examples, args.folds, args.seed)
+
+    exact = sum(route.intent == label for label, route in decisions)
+    routed = [(label, route) for label, route in decisions if not route.is_fallback]
+    misrouted = [(label, route) for label, route in routed if route.intent != label]
+    print(f"corpus: {len(examples)} queries, {args.folds}-fold cross-validation")
+    print(f"exact accuracy: {exact / len(decisions):.1%}")
+    print(
+        f"routed past the planner: {len(routed)}/{len(decisions)} ({len(routed) / len(decisions):.0%}), "
+        f"misrouted: {len(misrouted)}"
+    )
+    for label, route in misrouted:
+        print(f"  misrouted {label} -> {route.intent} ({route.confidence:.2f}, {route.source})")
+
+    print("\nper intent (routed / total):")
+    totals = Counter(label for label, _ in decisions)
+    hits = Counter(label for label, route in routed if route.intent == label)
+    for intent in INTENTS:
+        if intent != FALLBACK_INTENT:
+            print(f"  {intent:8} {hits[intent]:3}/{totals[intent]}")
+
+    baseline = sum(PLANNER_CALLS[label] for label, _ in decisions)
+    with_router = sum(
+        PLANNER_CALLS[label] if route.is_fallback else ROUTED_CALLS[route.intent] for label, route in decisions
+    )
+    print(
+        f"\nLLM calls: {baseline} through the planner, {with_router} with the router "
+        f"({baseline - with_router} saved, {(baseline - with_router) / baseline:.0%})"
+    )
+
+    router = IntentRouter(NaiveBayes().fit(examples))
+    texts = [text for _, text in examples]
+    samples = []
+    for _ in range(20):
+        for text in texts:
+            started = time.perf_counter()
+            router.route(text)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+    print(
+        f"decision time: p50 {samples[len(samples) // 2] * 1e6:.0f} us, "
+        f"p95 {samples[int(len(samples) * 0.95)] * 1e6:.0f} us, mean {statistics.mean(samples) * 1e6:.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare asyncio.run per turn with the persistent AgentRuntime loop.
+
+Each "turn" makes a few HTTP requests, the way an agent turn calls the model and tools. With
+asyncio.run the pooled connections die with the loop, so every turn reconnects; with the
+runtime one client stays warm. Runs against the local weather stub by default:
+
+    python -m benchmarks.runtime --turns 50
+    python -m benchmarks.runtime --url https://api.openai.com/v1/models   # include real TLS setup
+    python -m benchmarks.runtime --agent --turns 5                        # real agent turns (needs OPENAI_API_KEY)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.weather import start_stub_server
+from runtime import AgentRuntime
+
+
+async def turn(client: httpx.AsyncClient, url: str, requests_per_turn: int):
+    for _ in range(requests_per_turn):
+        await client.get(url)
+
+
+async def cold_turn(url: str, requests_per_turn: int):
+    async with httpx.AsyncClient() as client:
+        await turn(client, url, requests_per_turn)
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{label:28s} mean {statistics.mean(samples) * 1e3:7.1f} ms   p95 {p95 * 1e3:7.1f} ms")
+
+
+def bench_http(url: str, turns: int, requests_per_turn: int):
+    before = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        asyncio.run(cold_turn(url, requests_per_turn))
+        before.append(time.perf_counter() - started)
+
+    runtime = AgentRuntime()
+    client = runtime.run(_make_client())
+    runtime.run(turn(client, url, 1))  # warm the pool once, as the first real turn would
+    after = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        runtime.run(turn(client, url, requests_per_turn))
+        after.append(time.perf_counter() - started)
+    runtime.run(client.aclose())
+    runtime.close()
+
+    report("asyncio.run per turn", before)
+    report("persistent runtime", after)
+
+
+async def _make_client():
+    return httpx.AsyncClient()
+
+
+def bench_agent(turns: int):
+    from agents import Runner
+    from output import conversational_agent
+
+    prompt = "Reply with one word: hello"
+    before = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        asyncio.run(Runner.run(conversational_agent, prompt))
+        before.append(time.perf_counter() - started)
+
+    runtime = AgentRuntime()
+    runtime.run(Runner.run(conversational_agent, prompt))
+    after = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        runtime.run(Runner.run(conversational_agent, prompt))
+        after.append(time.perf_counter() - started)
+    runtime.close()
+
+    report("agent: asyncio.run per turn", before)
+    report("agent: persistent runtime", after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--requests-per-turn", type=int, default=3)
+    parser.add_argument("--url", help="Endpoint to hit instead of the local stub")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server latency per request")
+    parser.add_argument("--agent", action="store_true", help="Time real agent turns instead of raw HTTP")
+    args = parser.parse_args()
+
+    if args.agent:
+        if not os.getenv("OPENAI_API_KEY"):
+            parser.error("--agent needs OPENAI_API_KEY")
+        bench_agent(args.turns)
+        return
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_stub_server(args.latency)
+        url = f"http://127.0.0.1:{server.server_address[1]}/data/2.5/weather"
+    bench_http(url, args.turns, args.requests_per_turn)
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
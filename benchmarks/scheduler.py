@@ -0,0 +1,162 @@
+"""Benchmark admission control under a burst of sessions against a rate-limited provider.
+
+The model is the replay model (replay.py) behind a simulated provider that answers 429 when
+its per-minute limits are exceeded, quantized to one-second slices. Like the OpenAI client it
+retries a 429 twice with a backoff before the call fails. The same burst is run twice:
+every run straight away, as home.py did before, and through the AdmissionScheduler with the
+RateLimiter set a little under the provider's limits. One "heavy" user sends several
+questions at once among many users with one question each.
+
+Run from the repository root:
+
+    python -m benchmarks.scheduler --users 40 --heavy-queries 8 --rpm 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+
+import logging  # noqa: E402
+
+logging.getLogger("openai.agents").setLevel(logging.ERROR)
+
+from agents.models.interface import Model  # noqa: E402
+
+from batch import run_query  # noqa: E402
+from context import UserContext  # noqa: E402
+from output import agent_graph, travel_agent  # noqa: E402
+from replay import DEFAULT_RECORDING, Latency, Recording, use_replay_model  # noqa: E402
+from scheduler import (  # noqa: E402
+    AdmissionScheduler,
+    RateLimiter,
+    SchedulerBusy,
+    TokenBucket,
+    _estimate_call_tokens,
+    use_rate_limiter,
+)
+
+RETRIES = 2
+RETRY_BACKOFF = 0.5
+
+
+class ProviderRateLimitError(Exception):
+    pass
+
+
+class SimulatedProvider(Model):
+    """Wraps a model with the provider's RPM/TPM enforcement and the client's 429 retries.
+
+    Like OpenAI's, the provider counts a call's prompt plus its output allowance up front.
+    """
+
+    def __init__(self, model: Model, requests: TokenBucket, tokens: TokenBucket, stats: dict):
+        self.model = model
+        self.requests = requests
+        self.tokens = tokens
+        self.stats = stats
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing):
+        cost = _estimate_call_tokens(system_instructions, input, model_settings)
+        for attempt in range(RETRIES + 1):
+            if self.requests.delay(1) == 0 and self.tokens.delay(cost) == 0:
+                self.requests.take(1)
+                self.tokens.take(cost)
+                self.stats["calls"] += 1
+                return await self.model.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing)
+            self.stats["429s"] += 1
+            if attempt < RETRIES:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+        raise ProviderRateLimitError("429 Too Many Requests")
+
+    def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing):
+        raise NotImplementedError
+
+
+def setup(args, scheduled: bool, stats: dict):
+    recording = Recording.from_jsonl(DEFAULT_RECORDING)
+    agents = use_replay_model(agent_graph, recording, Latency(args.latency, jitter=0.25, seed=1))
+    requests, tokens = TokenBucket(args.rpm), TokenBucket(args.tpm)
+    for agent in agents:
+        agent.model = SimulatedProvider(agent.model, requests, tokens, stats)
+    if scheduled:
+        use_rate_limiter(agents, RateLimiter(args.rpm * args.headroom, args.tpm * args.headroom))
+    return recording.queries()
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+async def burst(args, scheduled: bool):
+    stats = {"calls": 0, "429s": 0}
+    queries = setup(args, scheduled, stats)
+    scheduler = AdmissionScheduler(args.max_running, args.max_queued, args.max_queued_per_user, args.max_running_per_user)
+    rng = random.Random(7)
+    arrivals = [("heavy", 0.0)] * args.heavy_queries + [(f"user-{i}", rng.uniform(0, args.ramp)) for i in range(args.users)]
+    outcomes = {"ok": 0, "failed": 0, "shed": 0}
+    latencies = {"heavy": [], "light": []}
+
+    async def session(i, user_id, delay):
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        context = UserContext(user_id=user_id)
+        query = queries[i % len(queries)]
+        try:
+            if scheduled:
+                async with scheduler.slot(user_id):
+                    result = await run_query(travel_agent, i, query, context=context)
+            else:
+                result = await run_query(travel_agent, i, query, context=context)
+        except SchedulerBusy:
+            outcomes["shed"] += 1
+            return
+        if result.error:
+            outcomes["failed"] += 1
+            return
+        outcomes["ok"] += 1
+        latencies["heavy" if user_id == "heavy" else "light"].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i, user_id, delay) for i, (user_id, delay) in enumerate(arrivals)))
+    wall = time.perf_counter() - started
+
+    print(f"\n{'scheduled' if scheduled else 'unscheduled'}: {len(arrivals)} runs in {wall:.1f} s")
+    print(f"  ok {outcomes['ok']}, failed {outcomes['failed']}, shed as busy {outcomes['shed']}")
+    print(f"  provider: {stats['calls']} model calls, {stats['429s']} answered 429")
+    for kind, values in latencies.items():
+        print(f"  {kind:<6} users: p50 {percentile(values, 50):6.2f} s  p95 {percentile(values, 95):6.2f} s  ({len(values)} ok)")
+
+
+async def main_async(args):
+    print(
+        f"{args.users} users with one question over {args.ramp:.0f} s, one user with {args.heavy_queries} at once; "
+        f"provider {args.rpm:.0f} RPM / {args.tpm:,.0f} TPM, model latency {args.latency * 1e3:.0f} ms"
+    )
+    await burst(args, scheduled=False)
+    await burst(args, scheduled=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--heavy-queries", type=int, default=8)
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which the users arrive")
+    parser.add_argument("--rpm", type=float, default=300)
+    parser.add_argument("--tpm", type=float, default=600_000)
+    parser.add_argument("--headroom", type=float, default=0.9, help="Limiter rates as a fraction of the provider's")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per model call")
+    parser.add_argument("--max-running", type=int, default=8)
+    parser.add_argument("--max-queued", type=int, default=32)
+    parser.add_argument("--max-queued-per-user", type=int, default=2)
+    parser.add_argument("--max-running-per-user", type=int, default=2)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark the session store with 100k stored sessions: batched writes, rehydration and the LRU.
+
+Synthetic conversations (a few turns with rendered HTML and structured outputs, like home.py
+keeps) are saved through a SessionStore over a fresh SQLite file. Batched write-behind saves
+are compared with committing every save on its own. A second store on the same file then
+plays a restarted server or another replica: sessions are rehydrated from disk, served
+again from its LRU, updated on the first store and picked up as newer versions. Memory
+stays bounded: only the LRU's sessions are held, and idle ones leave it.
+
+Run from the repository root:
+
+    python -m benchmarks.sessions --sessions 100000 --cache-size 1024
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from context import UserContext
+from sessions import Session, SessionStore, SQLiteSessionBackend
+
+AIRLINES = ["SkyWays", "OceanAir", "Delta", "United", "Emirates"]
+CITIES = ["Miami", "Tokyo", "Paris", "London", "Dubai", "New York"]
+
+
+def make_session(rng: random.Random, turns: int) -> Session:
+    user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    context = UserContext(user_id= user_id, preferred_airlines= rng.sample(AIRLINES, 2), budget_level= "mid-range")
+    history = []
+    for _ in range(turns):
+        city = rng.choice(CITIES)
+        history.append({"role": "user", "content": f"Find me a hotel in {city} for 3 nights", "timestamp": "10:42 AM"})
+        output = {
+            "name": f"{city} Grand", "location": "Downtown", "price_per_night": round(rng.uniform(80, 400), 2),
+            "amenities": ["WiFi", "Pool", "Gym"], "recommendation_reason": "Close to the sights and within budget.",
+        }
+        content = (
+            f"<h3>Hotel Recommendation: {output['name']}</h3><p><strong>Location:</strong> Downtown</p>"
+            f"<p><strong>Price per night:</strong> ${output['price_per_night']}</p><h4>Amenities:</h4>"
+            "<ul><li>WiFi</li><li>Pool</li><li>Gym</li></ul><p><strong>Why this hotel:</strong> "
+            f"{output['recommendation_reason']}</p>"
+        )
+        history.append({"role": "assistant", "content": content, "output": output, "timestamp": "10:42 AM"})
+    return Session(user_id, str(uuid.UUID(int=rng.getrandbits(128))), context, history)
+
+
+def timed_us(func, items):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=3, help="User/assistant exchanges per session")
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--unbatched", type=int, default=2000, help="Saves timed with one commit each")
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    sessions = [make_session(rng, args.turns) for _ in range(args.sessions)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.sqlite3")
+
+        # -- Writes --
+        writer = SessionStore(SQLiteSessionBackend(path), maxsize= args.cache_size)
+        started = time.perf_counter()
+        for session in sessions:
+            writer.save(session)
+        writer.backend.flush()
+        batched = time.perf_counter() - started
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(path)
+        print(f"{args.sessions:,} sessions ({args.turns * 2} messages each), {size / 2**20:.0f} MiB on disk")
+        print(f"batched writes:    {args.sessions / batched:9,.0f} saves/s  ({batched:.2f}s in all)")
+
+        sample = sessions[: args.unbatched]
+        started = time.perf_counter()
+        for session in sample:
+            writer.save(session)
+            writer.backend.flush()
+        single = time.perf_counter() - started
+        print(f"commit per save:   {len(sample) / single:9,.0f} saves/s  ({args.sessions / batched / (len(sample) / single):.1f}x slower)")
+        print(f"sessions in memory after the writes: {len(writer):,} of {args.sessions:,}")
+
+        # -- Reads on a second store: a restarted server or another replica --
+        replica = SessionStore(SQLiteSessionBackend(path), maxsize= args.cache_size)
+        picks = rng.sample(sessions, args.lookups)
+        keys = [(s.user_id, s.thread_id) for s in picks]
+        p50, p99 = timed_us(lambda key: replica.get(*key), keys[: args.cache_size])
+        print(f"rehydrate from disk:       p50 {p50:7.1f} us   p99 {p99:7.1f} us")
+        p50, p99 = timed_us(lambda key: replica.get(*key), keys[: args.cache_size])
+        print(f"LRU hit (version checked): p50 {p50:7.1f} us   p99 {p99:7.1f} us")
+
+        changed = keys[: 100]
+        for user_id, thread_id in changed:
+            session = writer.get(user_id, thread_id)
+            session.chat_history.append({"role": "user", "content": "And a flight there?", "timestamp": "10:45 AM"})
+            writer.save(session)
+        writer.backend.flush()
+        seen = sum(len(replica.get(*key).chat_history) == args.turns * 2 + 1 for key in changed)
+        print(f"updates from the other store seen: {seen}/{len(changed)} ({replica.stats.stale} stale copies replaced)")
+
+        p50, p99 = timed_us(lambda user: replica.open(user), [key[0] for key in keys[args.cache_size:]])
+        print(f"open latest thread by user: p50 {p50:6.1f} us   p99 {p99:7.1f} us")
+
+        # -- Idle eviction --
+        idle = SessionStore(replica.backend, maxsize= args.cache_size, idle_ttl= 0.2)
+        for key in keys[: args.cache_size]:
+            idle.get(*key)
+        held = len(idle)
+        time.sleep(0.3)
+        print(f"idle eviction: {held:,} sessions in memory, {len(idle):,} after 0.3 s idle")
+
+        print(f"stored sessions: {len(replica.backend):,}")
+        writer.backend.close()
+        replica.backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Measure prompt tokens saved by the compact tool output and check the picks it leads to.
+
+Every recorded tool call in data/tool_output_fixtures.jsonl is replayed in the JSON and in the
+compact table format. Token counts use tiktoken when it is installed (and its encoding can be
+loaded); otherwise a word/number/punctuation split that tracks BPE counts closely enough to
+compare formats. Each output is parsed back and the choices the specialist agents make from
+it (cheapest, fastest, best amenity match...) are compared with the recorded picks.
+
+Run from the repository root:
+
+    python -m benchmarks.tool_output
+    python -m benchmarks.tool_output --record   # re-record the fixture picks from JSON output
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+
+from agents import RunContextWrapper
+
+from context import UserContext
+from hotel_inventory import get_hotel_inventory
+from tools import get_weather_forecast, search_fare_calendar, search_flights, search_hotels
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tool_output_fixtures.jsonl")
+
+TOOLS = {tool.name: tool for tool in (search_flights, search_hotels, search_fare_calendar, get_weather_forecast)}
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+    TOKENIZER = "tiktoken o200k_base"
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+except Exception:
+    TOKENIZER = "approximate"
+    _TOKEN = re.compile(r"[A-Za-z]+|\d{1,3}|\s?[^\sA-Za-z\d]|\s+")
+
+    def count_tokens(text: str) -> int:
+        return len(_TOKEN.findall(text))
+
+
+# -- Recorded calls --
+
+FLIGHT_CONTEXTS = [{}, {"preferred_airlines": ["United", "SkyWays"]}, {"preferred_airlines": ["Emirates"]}]
+HOTEL_CONTEXTS = [
+    {},
+    {"hotel_amenities": ["Pool", "WiFi"], "budget_level": "luxury"},
+    {"hotel_amenities": ["Gym"], "budget_level": "budget"},
+    {"hotel_amenities": ["Spa", "Fine Dining"], "budget_level": "mid-range"},
+]
+PLACES = ["New York", "Chicago", "Los Angeles", "Miami", "London", "Paris", "Tokyo", "Dubai"]
+
+
+def fixture_calls():
+    """The tool calls recorded in the fixture file."""
+    calls = []
+    for origin in PLACES:
+        for destination in PLACES:
+            if origin != destination:
+                for context in FLIGHT_CONTEXTS:
+                    args = {"origin": origin, "destination": destination, "date": "today+1"}
+                    calls.append({"tool": "search_flights", "args": args, "context": context})
+                args = {"origin": origin, "destination": destination, "start": "today+1", "end": "today+14"}
+                calls.append({"tool": "search_fare_calendar", "args": args, "context": {}})
+    for city in get_hotel_inventory().cities:
+        for context in HOTEL_CONTEXTS:
+            args = {"city": city, "check_in": "today+1", "check_out": "today+4", "max_price": None}
+            calls.append({"tool": "search_hotels", "args": args, "context": context})
+    # Offline forecasts are climate normals, so a fixed date keeps their picks from drifting with the season
+    for city in PLACES:
+        calls.append({"tool": "get_weather_forecast", "args": {"city": city, "date": "2025-07-15"}, "context": {}})
+    return calls
+
+
+def _resolve(value):
+    """Dates are recorded relative to the day of the run, as 'today+N'."""
+    if isinstance(value, str) and value.startswith("today+"):
+        return (date.today() + timedelta(days=int(value[len("today+"):]))).isoformat()
+    return value
+
+
+async def invoke(call: dict) -> str:
+    args = {name: _resolve(value) for name, value in call["args"].items()}
+    wrapper = RunContextWrapper(UserContext(user_id="benchmark", **call["context"]))
+    return await TOOLS[call["tool"]].on_invoke_tool(wrapper, json.dumps(args))
+
+
+# -- Parsing and picks --
+
+def _minutes(duration: str) -> int:
+    hours, minutes = duration.rstrip("m").split("h")
+    return int(hours) * 60 + int(minutes)
+
+
+def parse(tool: str, text: str) -> list:
+    """Read either format back into uniform dicts."""
+    if tool == "get_weather_forecast":
+        match = re.search(r"forecasted to be (\w+) with temperatures around ([\d-]+)", text)
+        if match:
+            return [{"id": f"{match.group(1)} {match.group(2)}"}]
+        lines = text.splitlines()
+        if len(lines) == 2:
+            row = dict(zip(lines[0].split("|"), lines[1].split("|")))
+            return [{"id": f"{row['condition']} {row['temp_c']}"}]
+        return []
+    if text.startswith("["):
+        rows = json.loads(text)
+    elif text == "no results":
+        rows = []
+    else:
+        header, *lines = text.splitlines()
+        rows = [dict(zip(header.split("|"), line.split("|"))) for line in lines]
+
+    items = []
+    for row in rows:
+        if tool == "search_flights":
+            departure = row.get("departure_time", row.get("depart"))
+            arrival = row.get("arrival_time", row.get("arrive"))
+            stops = row.get("stops", 0 if row.get("direct") else 1)
+            items.append({
+                "id": f"{row['airline']} {departure}-{arrival}",
+                "price": float(row.get("price", row.get("price_usd"))),
+                "stops": int(str(stops).rstrip("+")),
+                "minutes": _minutes(row["duration"]),
+                "preferred": row.get("preferred") in (True, "yes"),
+            })
+        elif tool == "search_hotels":
+            matching = row.get("matching_amenities", row.get("matching", ""))
+            if isinstance(matching, str):
+                matching = [m for m in matching.split(", ") if m]
+            amenities = row["amenities"]
+            if isinstance(amenities, str):
+                amenities = [a for a in amenities.split(", ") if a]
+            items.append({
+                "id": row["name"],
+                "price": float(row.get("price_per_night", row.get("price_usd"))),
+                "matching": len(matching),
+                "amenities": len(amenities),
+            })
+        else:
+            items.append({
+                "id": len(items),  # day offset from the start of the range
+                "price": float(row.get("price", row.get("price_usd"))),
+                "cheapest": row.get("cheapest") in (True, "yes"),
+            })
+    return items
+
+
+def _first(items, key):
+    """The item with the lowest key; the earliest listed one on ties, as a reader would take it."""
+    return min(items, key=lambda item: key(item))["id"] if items else None
+
+
+def picks(tool: str, items: list) -> dict:
+    """The choices a specialist makes from a tool result."""
+    if tool == "search_flights":
+        preferred = [item for item in items if item["preferred"]]
+        return {
+            "top": items[0]["id"] if items else None,
+            "cheapest": _first(items, lambda i: i["price"]),
+            "fastest": _first(items, lambda i: i["minutes"]),
+            "fewest_stops": _first(items, lambda i: (i["stops"], i["price"])),
+            "preferred": preferred[0]["id"] if preferred else None,
+        }
+    if tool == "search_hotels":
+        return {
+            "top": items[0]["id"] if items else None,
+            "cheapest": _first(items, lambda i: i["price"]),
+            "best_match": _first(items, lambda i: (-i["matching"], i["price"])),
+            "most_amenities": _first(items, lambda i: (-i["amenities"], i["price"])),
+        }
+    if tool == "search_fare_calendar":
+        flagged = [item for item in items if item["cheapest"]]
+        return {"cheapest_day": flagged[0]["id"] if flagged else None}
+    return {"forecast": items[0]["id"] if items else None}
+
+
+# -- Runs --
+
+def set_format(compact: bool, top_k: int = None):
+    os.environ["TOOL_OUTPUT_FORMAT"] = "compact" if compact else "json"
+    if top_k is not None:
+        os.environ["TOOL_OUTPUT_TOP_K"] = str(top_k)
+
+
+async def run(fixtures: list, compact: bool, top_k: int = None):
+    set_format(compact, top_k)
+    tokens = defaultdict(int)
+    agree = defaultdict(lambda: [0, 0])
+    for fixture in fixtures:
+        text = await invoke(fixture)
+        tokens[fixture["tool"]] += count_tokens(text)
+        for name, pick in picks(fixture["tool"], parse(fixture["tool"], text)).items():
+            counts = agree[f"{fixture['tool']}:{name}"]
+            counts[0] += pick == fixture["picks"][name]
+            counts[1] += 1
+    return tokens, agree
+
+
+async def record():
+    set_format(compact=False)
+    with open(FIXTURES, "w", encoding="utf-8") as f:
+        for call in fixture_calls():
+            call["picks"] = picks(call["tool"], parse(call["tool"], await invoke(call)))
+            f.write(json.dumps(call) + "\n")
+    print(f"recorded {FIXTURES}")
+
+
+async def main_async(args):
+    if args.record:
+        await record()
+        return
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = [json.loads(line) for line in f if line.strip()]
+    print(f"{len(fixtures)} recorded tool calls, tokens counted with {TOKENIZER}")
+
+    json_tokens, json_agree = await run(fixtures, compact=False)
+    drift = sum(total - same for same, total in json_agree.values())
+    print(f"json output: {sum(json_tokens.values()):,} tokens; {drift} picks differ from the recording")
+
+    for top_k in args.top_k:
+        tokens, agree = await run(fixtures, compact=True, top_k=top_k)
+        saved = 1 - sum(tokens.values()) / sum(json_tokens.values())
+        print(f"\ncompact, top {top_k}: {sum(tokens.values()):,} tokens ({saved:.0%} fewer)")
+        for tool in TOOLS:
+            if json_tokens[tool]:
+                print(f"  {tool:<22} {json_tokens[tool]:7,} -> {tokens[tool]:7,} tokens ({1 - tokens[tool] / json_tokens[tool]:.0%} fewer)")
+        for name, (same, total) in sorted(agree.items()):
+            print(f"  {'same pick ' + name:<44} {same:4}/{total}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="Re-record the fixture picks from the JSON output")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, 8, 5, 3])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
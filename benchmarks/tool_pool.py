@@ -0,0 +1,120 @@
+"""Benchmark search_flights throughput in the tool worker pool against inline, by worker count.
+
+A synthetic fare inventory (benchmarks/connections.py) is saved to a temporary .npz file
+and loaded as FLIGHT_INVENTORY_PATH, so the connection searches are heavy enough to matter.
+The same distinct queries go through the unchanged search_flights tool, a fixed number at a
+time, first inline on the event loop and then with TOOL_WORKERS worker processes attached
+to the shared-memory route graph (tool_pool.py). A heartbeat task on the same loop measures
+how late it wakes up: the stall other conversations would see. Pooled answers are checked
+against the inline ones. Scaling stops at the machine's core count.
+
+Run from the repository root:
+
+    python -m benchmarks.tool_pool --legs-per-day 20000 --queries 400 --workers 0,1,2,4,8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+logging.getLogger("openai.agents").setLevel(logging.ERROR)
+
+from agents import RunContextWrapper  # noqa: E402
+
+from benchmarks.connections import build_schedule  # noqa: E402
+from cache import clear_tool_caches  # noqa: E402
+from context import UserContext  # noqa: E402
+from tool_pool import close_tool_pool, get_tool_pool  # noqa: E402
+from tools import search_flights  # noqa: E402
+
+HEARTBEAT = 0.005  # seconds between heartbeat wake-ups
+
+
+def default_workers() -> str:
+    counts, n = [0], 1
+    while n <= (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return ",".join(map(str, counts))
+
+
+async def heartbeat(lags: list, stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + HEARTBEAT
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(loop.time() - expected)
+
+
+async def run_queries(queries, concurrency: int):
+    wrapper = RunContextWrapper(context=UserContext(user_id="benchmark", preferred_airlines=["SkyWays"]))
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(origin, destination):
+        async with gate:
+            args = {"origin": origin, "destination": destination, "date": "tomorrow"}
+            return await search_flights.on_invoke_tool(wrapper, json.dumps(args))
+
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    started = time.perf_counter()
+    outputs = await asyncio.gather(*(one(*query) for query in queries))
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return outputs, wall, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", type=int, default=300)
+    parser.add_argument("--legs-per-day", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32, help="Searches in flight at once")
+    parser.add_argument("--workers", default=default_workers(), help="Comma-separated worker counts; 0 runs inline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "flights.npz")
+        inventory = build_schedule(args.places, args.legs_per_day, args.days)
+        inventory.save_npz(path)
+        os.environ["FLIGHT_INVENTORY_PATH"] = path
+        print(f"{len(inventory):,} fares over {args.places} places, {os.cpu_count()} cores")
+
+        rng = random.Random(3)
+        pairs = [(o, d) for o in inventory.places for d in inventory.places if o != d]
+        queries = rng.sample(pairs, min(args.queries, len(pairs)))
+
+        baseline, expected = None, None
+        for workers in [int(n) for n in args.workers.split(",")]:
+            os.environ["TOOL_WORKERS"] = str(workers)
+            close_tool_pool()
+            clear_tool_caches()
+            pool = get_tool_pool()
+            if pool is not None:
+                started = time.perf_counter()
+                pool.start()
+                print(f"  {workers} workers attached to {pool.shared_bytes / 2**20:.1f} MiB of shared columns in {time.perf_counter() - started:.2f}s")
+
+            outputs, wall, lags = asyncio.run(run_queries(queries, args.concurrency))
+            expected = expected or outputs
+            throughput = len(queries) / wall
+            baseline = baseline or throughput
+            label = f"{workers} workers" if workers else "inline"
+            print(
+                f"{label:<12} {throughput:8.1f} searches/s  x{throughput / baseline:4.1f}   "
+                f"loop stall p50 {statistics.median(lags) * 1e3:6.1f} ms  max {max(lags) * 1e3:7.1f} ms   "
+                f"same answers: {outputs == expected}"
+            )
+        close_tool_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark transcript rendering per Streamlit rerun: one markdown block per message against cached pages.
+
+A synthetic conversation (questions, structured recommendations as format_agent_response
+renders them, and plain-text replies) is drawn the way home.py used to, one st.markdown
+element per message with dicebear avatar URLs, and the way it does now, through the
+TranscriptRenderer (transcript.py): cached HTML per message and per full page, the latest
+pages only, st.html elements and avatars from assets/. Both run as Streamlit scripts under
+AppTest, so a rerun includes building and queueing the elements. Reported per rerun: median
+script time, elements and HTML sent, and avatar images fetched from outside.
+
+Run from the repository root:
+
+    python -m benchmarks.transcript --messages 20,200,1000 --reruns 20
+"""
+import argparse
+import logging
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from streamlit.testing.v1 import AppTest
+
+from transcript import chat_message, get_transcript_renderer
+
+CITIES = ["Miami", "Tokyo", "Paris", "London", "Dubai", "New York"]
+
+
+def make_transcript(rng: random.Random, count: int) -> List[dict]:
+    messages = []
+    while len(messages) < count:
+        city = rng.choice(CITIES)
+        messages.append(chat_message("user", f"Find me a hotel in {city} for 3 nights"))
+        if rng.random() < 0.7:
+            output = {"name": f"{city} Grand", "location": "Downtown", "price_per_night": round(rng.uniform(80, 400), 2), "amenities": ["WiFi", "Pool", "Gym"]}
+            content = f"""
+            <h3>Hotel Recommendation: {output['name']}</h3>
+            <p><strong>Location:</strong> Downtown</p>
+            <p><strong>Price per night:</strong> ${output['price_per_night']}</p>
+
+            <h4>Amenities:</h4>
+            <ul>
+            <li>WiFi</li><li>Pool</li><li>Gym</li></ul><p><strong>Why this hotel:</strong> Close to the sights and within budget.</p>"""
+            messages.append(chat_message("assistant", content, output= output))
+        else:
+            reply = f"{city} is lovely in spring. A few tips:\n\n1. Book early\n2. Use the metro\n3. Try the **local food**"
+            messages.append(chat_message("assistant", reply, output= reply))
+    return messages[:count]
+
+
+def per_message_app(messages):
+    # home.py's loop before transcript.py, unchanged
+    import streamlit as st
+
+    for message in messages:
+        with st.container():
+            if message["role"] == "user":
+                st.markdown(f"""
+                <div class="chat-message user">
+                    <div class="content">
+                        <img src="https://api.dicebear.com/7.x/avataaars/svg?seed=benchmark" class="avatar" />
+                        <div class="message">
+                            {message["content"]}
+                            <div class="timestamp">{message["timestamp"]}</div>
+                        </div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.markdown(f"""
+                <div class="chat-message assistant">
+                    <div class="content">
+                        <img src="https://api.dicebear.com/7.x/bottts/svg?seed=travel-agent" class="avatar" />
+                        <div class="message">
+                            {message["content"]}
+                            <div class="timestamp">{message["timestamp"]}</div>
+                        </div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+
+
+def paged_app(messages):
+    import streamlit as st
+
+    from transcript import avatar_css, get_transcript_renderer
+
+    st.markdown(f"<style>{avatar_css()}</style>", unsafe_allow_html=True)
+    transcript = get_transcript_renderer()
+    pages = transcript.visible_pages(messages, earlier= 1)
+    if pages.start > 0:
+        st.button(f"Show earlier messages ({pages.start * transcript.page_size} more)")
+    for page in pages:
+        st.html(transcript.page_html(messages, page))
+
+
+def measure(app: Callable, messages: List[dict], reruns: int):
+    at = AppTest.from_function(app, kwargs={"messages": messages}, default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - started
+    samples = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - started)
+    bodies = [element.proto.body for element in [*at.markdown, *at.get("html")]]
+    sent = sum(len(body) for body in bodies)
+    external = sum(body.count("https://api.dicebear.com") for body in bodies)
+    return first, statistics.median(samples), len(bodies), sent, external
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", default="20,200,1000", help="Comma-separated transcript lengths")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    rng = random.Random(5)
+    print(f"page size {get_transcript_renderer().page_size}; times are per rerun, median of {args.reruns}")
+    for count in [int(n) for n in args.messages.split(",")]:
+        messages = make_transcript(rng, count)
+        for label, app in (("per message", per_message_app), ("cached pages", paged_app)):
+            first, rerun, elements, sent, external = measure(app, messages, args.reruns)
+            print(
+                f"{count:5d} messages  {label:<13} first {first * 1e3:7.1f} ms  rerun {rerun * 1e3:7.1f} ms  "
+                f"{elements:5d} elements  {sent / 1024:8.1f} KiB HTML  {external:5d} external avatars"
+            )
+
+
+if __name__ == "__main__":
+    main()
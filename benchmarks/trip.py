@@ -0,0 +1,91 @@
+"""Benchmark whole-trip planning: the concurrent trip step against the current handoff chain.
+
+Model calls are answered from recorded responses (replay.py) after a seeded artificial latency.
+Without the orchestrator, a traveler gets a plan, a flight and a hotel by asking three times,
+and each request runs through the Travel Planner: the weather tool turn and the plan, then a
+handoff, a search and an answer for the flight, and the same for the hotel. With the intent
+router the handoff turns go away. The trip step (trip.py) asks once; the searches are local
+and the three agents take one model turn each, side by side.
+
+Run from the repository root:
+
+    python -m benchmarks.trip --latency 0.5 --repeat 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+logging.getLogger("openai.agents").setLevel(logging.ERROR)
+
+from context import UserContext  # noqa: E402
+from output import agent_graph, fast_routes, travel_agent, trip_planner  # noqa: E402
+from replay import DEFAULT_RECORDING, Latency, Recording, use_replay_model  # noqa: E402
+from router import run_routed  # noqa: E402
+from speculative import run_speculative  # noqa: E402
+
+# A whole-trip request and the follow-ups the handoff chain needs for the same answer
+TRIPS = [
+    (
+        "Plan my whole trip from New York to Miami for 5 days with a budget of $3000: flights, hotel and things to do",
+        ["I need a flight from New York to Miami tomorrow", "Find me a hotel in Miami for 5 nights"],
+    ),
+    (
+        "Book flights and a hotel for a week in Tokyo from Los Angeles with a budget of $6000",
+        ["Are there any flights from Los Angeles to Tokyo tomorrow?", "I need a hotel in Tokyo for next week"],
+    ),
+]
+
+
+async def chain(query, follow_ups, context, routed):
+    """The three requests one after the other, as the app runs them; returns the model calls made."""
+    calls = 0
+    for text in [query, *follow_ups]:
+        if routed:
+            result = await run_routed(travel_agent, fast_routes, text, context=context, runner=run_speculative)
+        else:
+            result = await run_speculative(travel_agent, text, context=context)
+        calls += len(result.raw_responses)
+    return calls
+
+
+async def orchestrated(query, follow_ups, context, routed):
+    result = await trip_planner.run(query, context=context)
+    return len(result.raw_responses)
+
+
+async def measure(label, run, args, context):
+    walls, calls = [], 0
+    for _ in range(args.repeat):
+        for query, follow_ups in TRIPS:
+            started = time.perf_counter()
+            calls = await run(query, follow_ups, context, args.routed)
+            walls.append(time.perf_counter() - started)
+    print(f"{label:<30} {calls:2} model calls   p50 {statistics.median(walls):6.2f} s   max {max(walls):6.2f} s")
+    return statistics.median(walls)
+
+
+async def main_async(args):
+    use_replay_model(agent_graph, Recording.from_jsonl(DEFAULT_RECORDING), Latency(args.latency, jitter=args.jitter, seed=3))
+    context = UserContext(user_id="benchmark", preferred_airlines=["SkyWays", "OceanAir"], hotel_amenities=["WiFi", "Pool"])
+    print(f"model latency {args.latency * 1e3:.0f} ms per call (jitter {args.jitter}), {len(TRIPS)} trips x {args.repeat}")
+    label = "routed requests" if args.routed else "handoff chain"
+    baseline = await measure(f"{label} (3 requests)", chain, args, context)
+    trip = await measure("trip step (1 request)", orchestrated, args, context)
+    print(f"wall-clock gain: {baseline / trip:.1f}x ({baseline - trip:.2f} s saved per trip)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per model call")
+    parser.add_argument("--jitter", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--routed", action="store_true", help="Send the follow-ups through the intent router")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
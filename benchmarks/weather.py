@@ -0,0 +1,110 @@
+"""Benchmark the pooled async weather client against sequential blocking requests.
+
+Both paths talk to a local stub of the OpenWeatherMap API with artificial latency, so the
+benchmark runs offline:
+
+    python -m benchmarks.weather --cities 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from weather import GeocodeCache, WeatherClient
+
+
+def make_stub_handler(latency: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, Nagle + delayed ACK add ~40 ms
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/geo/1.0/direct":
+                body = [{"name": query["q"][0], "lat": 35.68, "lon": 139.76}]
+            elif url.path in ("/data/2.5/weather", "/data/2.5/forecast"):
+                body = {"main": {"temp": 21.5, "temp_min": 18.0, "temp_max": 24.0}, "weather": [{"main": "Clear"}], "list": []}
+            else:
+                self.send_error(404)
+                return
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops bursts of concurrent connects and adds 1s SYN retries
+    request_queue_size = 128
+
+
+def start_stub_server(latency: float) -> ThreadingHTTPServer:
+    server = StubServer(("127.0.0.1", 0), make_stub_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def blocking_fetch(base_url: str, city: str) -> float:
+    """What test.py used to do: two sequential requests.get calls, no session, no timeout."""
+    geo = requests.get(f"{base_url}/geo/1.0/direct", params={"q": city, "limit": 1, "appid": "stub"}).json()
+    weather = requests.get(
+        f"{base_url}/data/2.5/weather",
+        params={"lat": geo[0]["lat"], "lon": geo[0]["lon"], "units": "metric", "appid": "stub"},
+    ).json()
+    return weather["main"]["temp"]
+
+
+async def pooled_fetch(base_url: str, cities, rounds: int) -> float:
+    client = WeatherClient(api_key="stub", base_url=base_url, geocode_cache=GeocodeCache())
+    try:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await client.current_many(cities)
+        return time.perf_counter() - started
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3, help="Repeated batches (geocodes are cached after the first)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency per request, in seconds")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    cities = [f"City {i}" for i in range(args.cities)]
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for city in cities:
+            blocking_fetch(base_url, city)
+    blocking = time.perf_counter() - started
+
+    pooled = asyncio.run(pooled_fetch(base_url, cities, args.rounds))
+    server.shutdown()
+
+    print(f"{args.cities} cities x {args.rounds} rounds, {args.latency * 1e3:.0f} ms stub latency")
+    print(f"sequential requests.get: {blocking:6.2f}s")
+    print(f"pooled async client:     {pooled:6.2f}s ({blocking / pooled:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import csv
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# -- Guardrail output --
+
+class BudgetAnalysis(BaseModel):
+    is_realistic: bool
+    reasoning: str
+    suggested_budget: Optional[float] = None
+
+# -- Budget signal extraction --
+
+# Cheap regex pass over the user's message that pulls out currency amounts and trip durations.
+# The budget guardrail uses it to skip the LLM entirely when no budget is mentioned.
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+_SCALE = r"(?:\s?(?P<scale>k|K|thousand|grand))?"
+
+_CURRENCY_BEFORE = re.compile(rf"(?P<currency>[$€£¥]|usd|eur|gbp|aed)\s?(?P<amount>{_NUMBER}){_SCALE}", re.IGNORECASE)
+_CURRENCY_AFTER = re.compile(
+    rf"(?P<amount>{_NUMBER}){_SCALE}\s?(?P<currency>usd|dollars?|bucks|eur|euros?|gbp|pounds?|quid|yen|aed|dirhams?)\b",
+    re.IGNORECASE,
+)
+# The cost table is in US dollars; amounts in any other currency are not converted
+_USD = {"$", "usd", "dollar", "dollars", "bucks"}
+_BUDGET_KEYWORD = re.compile(
+    rf"\b(?:budget|spend|spending|afford|under|below|max(?:imum)?|only have|only)\b\D{{0,15}}?(?P<amount>{_NUMBER}){_SCALE}",
+    re.IGNORECASE,
+)
+# A keyword followed by a count of something else: "spend 5 days", "max 1 stop", "under 4 stars"
+_NOT_MONEY = re.compile(
+    r"[\s-]*(?:days?|nights?|weeks?|fortnights?|months?|years?|hours?|hrs?|stars?|stops?|people|persons?|"
+    r"adults?|kids?|child(?:ren)?|travell?ers?|guests?|rooms?|beds?|bags?|km|miles?|minutes?|mins?|am|pm)\b",
+    re.IGNORECASE,
+)
+
+_WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14,
+}
+_UNIT_DAYS = {"day": 1, "night": 1, "week": 7, "fortnight": 14, "month": 30}
+_DURATION = re.compile(
+    r"\b(?P<count>\d+|" + "|".join(_WORD_NUMBERS) + r")[\s-]+(?P<unit>day|night|week|fortnight|month)s?\b",
+    re.IGNORECASE,
+)
+_WEEKEND = re.compile(r"\bweekend\b", re.IGNORECASE)
+# Right before "a night", "a day"...: an amount, making it a rate ("$200 a night") and not a duration
+_RATE_AMOUNT = re.compile(
+    r"\d(?:\s?(?:k|thousand|grand))?(?:\s?(?:usd|dollars?|bucks|eur|euros?|gbp|pounds?|quid|yen|aed|dirhams?))?\s*$",
+    re.IGNORECASE,
+)
+# Matched right after an amount (re.match anchors at the given position)
+_PER_NIGHT = re.compile(r"\s*(?:(?:per|a|/|each)\s?night|nightly)", re.IGNORECASE)
+
+
+@dataclass
+class BudgetSignals:
+    amounts: List[float] = field(default_factory=list)
+    nightly_amounts: List[float] = field(default_factory=list)
+    days: Optional[int] = None
+    # False when every amount is a bare number after a keyword ("only 300"): no currency or
+    # scale says it is money, so the guardrail leaves the verdict to the LLM
+    certain: bool = True
+    # True when an amount is in a currency other than US dollars (€, £, ¥, yen...)
+    foreign: bool = False
+
+    @property
+    def mentions_budget(self) -> bool:
+        return bool(self.amounts or self.nightly_amounts)
+
+    @property
+    def budget(self) -> Optional[float]:
+        """The largest amount mentioned, taken as the trip budget."""
+        return max(self.amounts) if self.amounts else None
+
+
+def _to_amount(match: re.Match) -> float:
+    amount = float(match.group("amount").replace(",", ""))
+    if match.group("scale"):
+        amount *= 1000
+    return amount
+
+
+def extract_budget_signals(text: str) -> BudgetSignals:
+    """Find currency amounts and the trip duration (in days) mentioned in free text."""
+    signals = BudgetSignals()
+    seen = set()
+    bare = marked = 0
+    for pattern in (_CURRENCY_BEFORE, _CURRENCY_AFTER, _BUDGET_KEYWORD):
+        for match in pattern.finditer(text):
+            # Several patterns can hit the same number; count it once
+            if match.start("amount") in seen:
+                continue
+            seen.add(match.start("amount"))
+            if pattern is _BUDGET_KEYWORD and not match.group("scale"):
+                if _NOT_MONEY.match(text, match.end()):
+                    continue
+                bare += 1
+            else:
+                marked += 1
+                if "currency" in pattern.groupindex and match.group("currency").lower() not in _USD:
+                    signals.foreign = True
+            if _PER_NIGHT.match(text, match.end()):
+                signals.nightly_amounts.append(_to_amount(match))
+            else:
+                signals.amounts.append(_to_amount(match))
+    signals.certain = marked > 0 or not bare
+
+    # An explicit count ("5 days") wins over "a week"; "$200 a night" is a rate, not a stay
+    durations = [
+        m for m in _DURATION.finditer(text)
+        if m.group("count").lower() not in ("a", "an") or not _RATE_AMOUNT.search(text, 0, m.start())
+    ]
+    explicit = [m for m in durations if m.group("count").lower() not in ("a", "an")]
+    duration = (explicit or durations or [None])[0]
+    if duration:
+        count = duration.group("count").lower()
+        count = int(count) if count.isdigit() else _WORD_NUMBERS[count]
+        signals.days = count * _UNIT_DAYS[duration.group("unit").lower()]
+    elif _WEEKEND.search(text):
+        signals.days = 2
+    return signals
+
+
+# -- Local cost model --
+
+# Deterministic stand-in for the Budget Analyzer agent. Daily costs per city come from
+# data/city_costs.csv; the trip estimate is days * (hotel + food + transport) plus one
+# return flight, left out when the message says flights are not part of the budget. Like
+# the agent's instructions, it is lenient: only a budget under a quarter of the estimate is
+# judged unrealistic here, one covering half or more is realistic, and anything between is
+# left to the LLM.
+
+DEFAULT_COST_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "city_costs.csv")
+
+# A budget below this share of the estimate is unrealistic; from REALISTIC_SHARE up it is
+# realistic. In between the LLM decides.
+ABSURD_SHARE = 0.25
+REALISTIC_SHARE = 0.5
+
+# Below this parse confidence the guardrail falls back to the LLM
+MIN_CONFIDENCE = 0.75
+
+# Confidence when the only amounts are bare numbers after a budget keyword, when an amount is
+# not in US dollars, and for a budget between ABSURD_SHARE and REALISTIC_SHARE of the estimate
+BARE_AMOUNT_CONFIDENCE = 0.5
+FOREIGN_CURRENCY_CONFIDENCE = 0.5
+BORDERLINE_CONFIDENCE = 0.5
+
+_DESTINATION_CUE = re.compile(r"\b(?:to|in|visit|visiting|at|around|explore)\s+$", re.IGNORECASE)
+_ORIGIN_CUE = re.compile(r"\b(?:from|leaving|departing)\s+$", re.IGNORECASE)
+_FLIGHTS = r"(?:flights?|airfares?|air\s?fares?|plane\s+tickets?)"
+_EXCLUDES_FLIGHTS = re.compile(
+    rf"\b(?:excluding|excl\.?|not\s+including|without(?:\s+the)?|except(?:\s+for)?|besides|apart\s+from|"
+    rf"plus|on\s+top\s+of)\s+(?:the\s+|my\s+|our\s+)?{_FLIGHTS}"
+    rf"|\b{_FLIGHTS}\s+(?:are\s+|is\s+)?(?:already\s+)?(?:booked|paid|covered|sorted|not\s+included|excluded|extra)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class CityCosts:
+    city: str
+    hotel: float
+    food: float
+    transport: float
+    flight: float
+
+    @property
+    def daily(self) -> float:
+        return self.hotel + self.food + self.transport
+
+    def trip_estimate(self, days: int, flight: bool = True) -> float:
+        return days * self.daily + (self.flight if flight else 0.0)
+
+
+class CostTable:
+    """Per-city daily costs with a single regex that spots any known city in free text."""
+
+    def __init__(self, costs: List[CityCosts], aliases: Optional[Dict[str, str]] = None):
+        self.costs = {c.city.casefold(): c for c in costs}
+        self._names = {c.city.casefold(): c.city.casefold() for c in costs}
+        for alias, city in (aliases or {}).items():
+            self._names[alias.casefold()] = city.casefold()
+        names = sorted(self._names, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + "|".join(re.escape(n) for n in names) + r")\b", re.IGNORECASE)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "CostTable":
+        costs, aliases = [], {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                costs.append(CityCosts(
+                    row["city"], float(row["hotel"]), float(row["food"]),
+                    float(row["transport"]), float(row["flight"]),
+                ))
+                for alias in filter(None, row["aliases"].split("|")):
+                    aliases[alias] = row["city"]
+        return cls(costs, aliases)
+
+    def find_destination(self, text: str) -> Optional[CityCosts]:
+        """Pick the mentioned city, preferring one introduced by 'to', 'in', 'visit'..."""
+        matches = list(self._pattern.finditer(text))
+        if not matches:
+            return None
+        cued = [m for m in matches if _DESTINATION_CUE.search(text, 0, m.start())]
+        match = (cued or matches)[-1]
+        return self.costs[self._names[match.group(1).casefold()]]
+
+    def find_origin(self, text: str) -> Optional[CityCosts]:
+        """The mentioned city introduced by 'from', 'leaving'...; None when there is none."""
+        for match in self._pattern.finditer(text):
+            if _ORIGIN_CUE.search(text, 0, match.start()):
+                return self.costs[self._names[match.group(1).casefold()]]
+        return None
+
+    def find_cities(self, text: str) -> List[str]:
+        """Every known city mentioned, by canonical name, in order of mention."""
+        return [self.costs[self._names[m.group(1).casefold()]].city for m in self._pattern.finditer(text)]
+
+
+@lru_cache(maxsize=1)
+def get_cost_table() -> CostTable:
+    return CostTable.from_csv(os.getenv("CITY_COSTS_PATH", DEFAULT_COST_TABLE))
+
+
+@dataclass
+class BudgetAssessment:
+    analysis: BudgetAnalysis
+    confidence: float
+    destination: Optional[str] = None
+    days: Optional[int] = None
+    budget: Optional[float] = None
+    estimate: Optional[float] = None
+
+
+def _round_up(amount: float, step: int = 100) -> float:
+    return float(-(-amount // step) * step)
+
+
+def _judge(amount: float, estimate: float) -> Tuple[bool, float]:
+    """Verdict and confidence for an amount against its estimate; borderline reads as realistic."""
+    if amount < ABSURD_SHARE * estimate:
+        return False, 1.0
+    return True, 1.0 if amount >= REALISTIC_SHARE * estimate else BORDERLINE_CONFIDENCE
+
+
+def assess_budget(text: str, table: Optional[CostTable] = None) -> BudgetAssessment:
+    """Judge a budget from the numbers in the message, with a confidence for the parse."""
+    table = table or get_cost_table()
+    signals = extract_budget_signals(text)
+    if not signals.mentions_budget:
+        return BudgetAssessment(BudgetAnalysis(is_realistic=True, reasoning="No budget was mentioned."), 1.0)
+
+    # Bare keyword amounts and other currencies are judged too, but the LLM has the final say
+    ceiling = 1.0 if signals.certain else BARE_AMOUNT_CONFIDENCE
+    if signals.foreign:
+        ceiling = min(ceiling, FOREIGN_CURRENCY_CONFIDENCE)
+
+    city = table.find_destination(text)
+    if city is None:
+        return BudgetAssessment(
+            BudgetAnalysis(is_realistic=True, reasoning="Destination not in the local cost table."), 0.2,
+            budget=signals.budget, days=signals.days,
+        )
+
+    if signals.budget is None:
+        # Only a nightly rate was given; compare it to a typical hotel night
+        nightly = max(signals.nightly_amounts)
+        realistic, confidence = _judge(nightly, city.hotel)
+        reasoning = (
+            f"${nightly:,.0f} per night against a typical ${city.hotel:,.0f} hotel night in {city.city}."
+        )
+        return BudgetAssessment(
+            BudgetAnalysis(
+                is_realistic=realistic, reasoning=reasoning,
+                suggested_budget=None if realistic else _round_up(city.hotel, 10),
+            ),
+            min(0.9, confidence, ceiling), destination=city.city, budget=nightly, estimate=city.hotel,
+        )
+
+    if signals.days is None:
+        return BudgetAssessment(
+            BudgetAnalysis(is_realistic=True, reasoning="Trip length not mentioned."), 0.5,
+            destination=city.city, budget=signals.budget,
+        )
+
+    flight = not _EXCLUDES_FLIGHTS.search(text)
+    estimate = city.trip_estimate(signals.days, flight)
+    realistic, confidence = _judge(signals.budget, estimate)
+    costs = f"${city.daily:,.0f}/day for hotel, food and transport"
+    if flight:
+        costs += f" plus ${city.flight:,.0f} for flights"
+    reasoning = (
+        f"A {signals.days}-day trip to {city.city} typically costs about ${estimate:,.0f} "
+        f"({costs}); the budget is ${signals.budget:,.0f}."
+    )
+    return BudgetAssessment(
+        BudgetAnalysis(
+            is_realistic=realistic, reasoning=reasoning,
+            suggested_budget=None if realistic else _round_up(estimate),
+        ),
+        min(confidence, ceiling), destination=city.city, days=signals.days, budget=signals.budget,
+        estimate=estimate,
+    )
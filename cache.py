@@ -0,0 +1,315 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+
+from agents import RunContextWrapper
+from cachetools import TTLCache
+
+from metrics import observe, register_collector
+
+# -- Tool result cache --
+
+# `cached_tool` sits underneath `@function_tool` and memoizes a tool's string output:
+#
+#     @function_tool
+#     @cached_tool(ttl=300, context_fields=("preferred_airlines",))
+#     def search_flights(wrapper: RunContextWrapper[UserContext], origin: str, ...) -> str:
+#
+# Keys are built from the normalized call arguments plus the named UserContext fields, so two
+# users with different preferences never share an entry. A `variant` callable adds process-wide
+# settings that change the output (such as the tool output format). Every tool gets its own TTL and LRU
+# bound. Entries live in process memory, or in a SQLite file when TOOL_CACHE_PATH is set so
+# they survive a Streamlit restart.
+
+DEFAULT_MAXSIZE = 1024
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class NotifyingTTLCache(TTLCache):
+    """TTLCache that reports the entries it drops by itself to a callback.
+
+    `on_remove(key, value, expired)` is called for LRU evictions (expired=False) and for
+    expirations (expired=True); explicit deletes and `clear` are not reported.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, on_remove: Callable[[object, object, bool], None]):
+        super().__init__(maxsize, ttl)
+        self._on_remove = on_remove
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired:
+            self._on_remove(key, value, True)
+        return expired
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_remove(key, value, False)
+        return key, value
+
+
+class MemoryBackend:
+    """In-process TTL + LRU store for one tool."""
+
+    def __init__(self, ttl: float, maxsize: int, stats: CacheStats):
+        self._stats = stats
+        self._cache = NotifyingTTLCache(maxsize, ttl, self._count_eviction)
+        self._lock = threading.Lock()
+
+    def _count_eviction(self, key, value, expired: bool):
+        if not expired:
+            self._stats.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._cache.expire()
+            return len(self._cache)
+
+
+class DiskBackend:
+    """SQLite-backed TTL + LRU store for one tool; several tools may share one file."""
+
+    def __init__(self, path: str, namespace: str, ttl: float, maxsize: int, stats: CacheStats):
+        self._namespace = namespace
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._stats = stats
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS tool_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM tool_cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self._namespace, key, now),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE tool_cache SET last_used = ? WHERE namespace = ? AND key = ?",
+                    (now, self._namespace, key),
+                )
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?, ?, ?)",
+                (self._namespace, key, value, now + self._ttl, now),
+            )
+            self._conn.execute(
+                "DELETE FROM tool_cache WHERE namespace = ? AND expires_at <= ?", (self._namespace, now)
+            )
+            evicted = self._conn.execute(
+                """DELETE FROM tool_cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM tool_cache WHERE namespace = ?
+                    ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )""",
+                (self._namespace, self._namespace, self._maxsize),
+            ).rowcount
+            self._conn.execute("COMMIT")
+        self._stats.evictions += max(evicted, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache WHERE namespace = ?", (self._namespace,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM tool_cache WHERE namespace = ? AND expires_at > ?",
+                (self._namespace, time.time()),
+            ).fetchone()
+        return count
+
+
+class ToolCache:
+    """Cache for one tool: key builder, backend and counters."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int, context_fields: Sequence[str], path: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.context_fields = tuple(context_fields)
+        self.stats = CacheStats()
+        if path:
+            self.backend = DiskBackend(path, name, ttl, maxsize, self.stats)
+        else:
+            self.backend = MemoryBackend(ttl, maxsize, self.stats)
+
+    def make_key(self, arguments: dict, context, variant=None) -> str:
+        """Hash the normalized arguments, the selected context fields and any output variant."""
+        fields = {name: _normalize(getattr(context, name, None)) for name in self.context_fields}
+        parts = [self.name, {k: _normalize(v) for k, v in arguments.items()}, fields]
+        if variant is not None:
+            parts.append(variant)
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.backend.set(key, value)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def _normalize(value):
+    """Canonical form of an argument so trivially different calls share a key."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted(_normalize(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+# Every cache created by `cached_tool`, by tool name.
+_registry: Dict[str, ToolCache] = {}
+
+
+def cached_tool(
+    ttl: float,
+    maxsize: int = DEFAULT_MAXSIZE,
+    context_fields: Sequence[str] = (),
+    name: Optional[str] = None,
+    variant: Optional[Callable[[], object]] = None,
+):
+    """Memoize a tool function's output. Apply it below `@function_tool`."""
+
+    def decorator(func):
+        cache = ToolCache(name or func.__name__, ttl, maxsize, context_fields, os.getenv("TOOL_CACHE_PATH"))
+        _registry[cache.name] = cache
+        signature = inspect.signature(func)
+
+        def key_for(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            context = None
+            arguments = {}
+            for param, value in bound.arguments.items():
+                if isinstance(value, RunContextWrapper):
+                    context = value.context
+                else:
+                    arguments[param] = value
+            return cache.make_key(arguments, context, variant() if variant else None)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                key = key_for(args, kwargs)
+                result = cache.get(key)
+                if result is None:
+                    result = await func(*args, **kwargs)
+                    cache.set(key, result)
+                else:
+                    observe("tool_cache_hit", cache.name, time.perf_counter() - started)
+                return result
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                key = key_for(args, kwargs)
+                result = cache.get(key)
+                if result is None:
+                    result = func(*args, **kwargs)
+                    cache.set(key, result)
+                else:
+                    observe("tool_cache_hit", cache.name, time.perf_counter() - started)
+                return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def get_tool_cache(name: str) -> ToolCache:
+    return _registry[name]
+
+
+def clear_tool_caches() -> None:
+    for cache in _registry.values():
+        cache.clear()
+
+
+def cache_metrics() -> Dict[str, dict]:
+    """Snapshot of every tool cache's counters."""
+    return {
+        name: {
+            "hits": cache.stats.hits,
+            "misses": cache.stats.misses,
+            "evictions": cache.stats.evictions,
+            "size": len(cache.backend),
+            "ttl_seconds": cache.ttl,
+        }
+        for name, cache in _registry.items()
+    }
+
+
+def render_prometheus() -> str:
+    """Render the cache counters in the Prometheus text exposition format."""
+    lines = []
+    metrics = cache_metrics()
+    for metric, kind, help_text in (
+        ("hits", "counter", "Tool cache hits"),
+        ("misses", "counter", "Tool cache misses"),
+        ("evictions", "counter", "Tool cache LRU evictions"),
+        ("size", "gauge", "Live entries in the tool cache"),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        lines.append(f"# HELP tool_cache_{metric}{suffix} {help_text}")
+        lines.append(f"# TYPE tool_cache_{metric}{suffix} {kind}")
+        for tool, values in metrics.items():
+            lines.append(f'tool_cache_{metric}{suffix}{{tool="{tool}"}} {values[metric]}')
+    return "\n".join(lines) + "\n"
+
+
+# Served next to the stage latencies on METRICS_PORT (metrics.py)
+register_collector(render_prometheus)
@@ -0,0 +1,323 @@
+import argparse
+import csv
+import os
+import sys
+import unicodedata
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from records import WeatherRecord
+
+# -- Climatology store --
+
+# Daily climate normals per city: for every day of a 366-day year, the chance of a sunny, cloudy
+# or rainy day and the mean low and high. The store is compiled once from monthly normals
+# (data/climate_normals.csv, or any source in that layout) into plain .npy files. Opening it with
+# mmap_mode="r" only maps the files: a lookup reads one row, the OS pages it in on first touch,
+# and every worker process on the host shares the same page-cache copy.
+#
+# City names resolve through a sorted array of normalized names and aliases (exact match, then
+# the most populous city sharing the prefix, both by binary search) and, for misspellings, a
+# trigram inverted index in CSR layout ranked by Jaccard similarity.
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "climate_normals.csv")
+
+CONDITIONS = ("sunny", "cloudy", "rainy")
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+NORMALS = ("tmin", "tmax", "wet_days", "sunshine")
+
+# Days are indexed on a leap year so 29 February has its own row
+DAYS_IN_YEAR = 366
+_MONTH_LENGTHS = np.array([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_YEAR_START = date(2000, 1, 1).toordinal()
+
+# Shortest name that is matched as a prefix, and the trigram similarity a misspelt name needs
+MIN_PREFIX = 3
+MIN_SIMILARITY = 0.3
+
+# Arrays written by `save` and mapped back by `open`, one .npy file each
+STORE_ARRAYS = (
+    "names", "countries", "population", "temperature", "probability", "condition",
+    "keys", "key_city", "key_trigrams", "trigrams", "trigram_offsets", "trigram_postings",
+)
+
+
+def normalize_city(name: str) -> str:
+    """Fold case and accents and drop punctuation, so 'Zürich' and 'zurich' share a key."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c if c.isalnum() else " " for c in text if not unicodedata.combining(c))
+    return " ".join(text.split()).casefold()
+
+
+def day_of_year(day: date) -> int:
+    """Row of `day` in the 366-day year."""
+    return date(2000, day.month, day.day).toordinal() - _YEAR_START
+
+
+def trigram_codes(key: str) -> np.ndarray:
+    """Distinct trigrams of a normalized name, padded like pg_trgm, packed 21 bits per character."""
+    padded = f"  {key} "
+    codes = {ord(a) << 42 | ord(b) << 21 | ord(c) for a, b, c in zip(padded, padded[1:], padded[2:])}
+    return np.array(sorted(codes), dtype=np.int64)
+
+
+def _monthly_to_daily() -> np.ndarray:
+    """(12, 366) weights that interpolate mid-month values linearly, wrapping December to January."""
+    mid_month = np.cumsum(_MONTH_LENGTHS) - _MONTH_LENGTHS / 2
+    days = np.arange(DAYS_IN_YEAR) + 0.5
+    return np.stack([np.interp(days, mid_month, row, period=DAYS_IN_YEAR) for row in np.eye(12)])
+
+
+class Climatology:
+    """Per-city, per-day condition probabilities and temperature normals with a city-name index."""
+
+    def __init__(self, **arrays: np.ndarray):
+        missing = [name for name in STORE_ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f"Climatology store is missing {', '.join(missing)}")
+        for name in STORE_ARRAYS:
+            setattr(self, name, arrays[name])
+        # Repeated names (every turn asks about the same few cities) skip the index entirely
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # -- Building --
+
+    @classmethod
+    def from_monthly(
+        cls,
+        names: Sequence[str],
+        countries: Sequence[str],
+        population: Sequence[int],
+        aliases: Sequence[Sequence[str]],
+        normals: Dict[str, np.ndarray],
+    ) -> "Climatology":
+        """Compile monthly normals, one (cities, 12) array per NORMALS entry, into daily rows.
+
+        `wet_days` counts days with at least 1 mm of rain per month and `sunshine` is the
+        percentage of possible sunshine hours; temperatures are in °C.
+        """
+        weights = _monthly_to_daily()
+        tmin = np.asarray(normals["tmin"], dtype=np.float64) @ weights
+        tmax = np.asarray(normals["tmax"], dtype=np.float64) @ weights
+        rainy = np.clip((np.asarray(normals["wet_days"], dtype=np.float64) / _MONTH_LENGTHS) @ weights, 0, 1)
+        # Sunshine mostly falls on dry days, so it caps the sunny share of what is left
+        sunny = np.minimum(np.asarray(normals["sunshine"], dtype=np.float64) @ weights / 100, 1 - rainy)
+        probability = np.stack([sunny, 1 - rainy - sunny, rainy], axis=-1)
+
+        population = np.asarray(population, dtype=np.int64)
+        arrays = {
+            "names": np.array(names, dtype=str),
+            "countries": np.array(countries, dtype=str),
+            "population": population,
+            "temperature": np.clip(np.rint(np.stack([tmin, tmax], axis=-1)), -128, 127).astype(np.int8),
+            "probability": np.rint(probability * 100).astype(np.uint8),
+            "condition": np.argmax(probability, axis=-1).astype(np.uint8),
+        }
+        arrays.update(cls._build_index(names, aliases, population))
+        return cls(**arrays)
+
+    @staticmethod
+    def _build_index(names: Sequence[str], aliases: Sequence[Sequence[str]], population: np.ndarray) -> Dict[str, np.ndarray]:
+        # One key per distinct (name, city); a name shared by several cities lists the most populous first
+        pairs = {
+            (key, city)
+            for city, city_names in enumerate(zip(names, aliases))
+            for key in (normalize_city(name) for name in [city_names[0], *city_names[1]])
+            if key
+        }
+        pairs = sorted(pairs, key=lambda pair: (pair[0], -population[pair[1]]))
+        keys = np.array([key for key, _ in pairs], dtype=str)
+        key_city = np.array([city for _, city in pairs], dtype=np.int32)
+
+        grams = [trigram_codes(key) for key, _ in pairs]
+        lengths = np.array([len(codes) for codes in grams], dtype=np.int16)
+        codes = np.concatenate(grams) if grams else np.zeros(0, dtype=np.int64)
+        owners = np.repeat(np.arange(len(pairs), dtype=np.int32), lengths)
+        order = np.lexsort((owners, codes))
+        trigrams, starts = np.unique(codes[order], return_index=True)
+        return {
+            "keys": keys,
+            "key_city": key_city,
+            "key_trigrams": lengths,
+            "trigrams": trigrams,
+            "trigram_offsets": np.append(starts, len(order)).astype(np.int64),
+            "trigram_postings": owners[order],
+        }
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Climatology":
+        """Compile a normals CSV with one row per city and normal (see data/climate_normals.csv)."""
+        cities: Dict[str, dict] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                city = cities.setdefault(row["city"], {
+                    "country": row["country"],
+                    "population": int(row["population"] or 0),
+                    "aliases": [alias for alias in row["aliases"].split("|") if alias],
+                    "normals": {},
+                })
+                city["normals"][row["normal"]] = [float(row[month]) for month in MONTHS]
+
+        for name, city in cities.items():
+            missing = [normal for normal in NORMALS if normal not in city["normals"]]
+            if missing:
+                raise ValueError(f"{path}: {name} has no {', '.join(missing)} normals")
+        return cls.from_monthly(
+            list(cities),
+            [city["country"] for city in cities.values()],
+            [city["population"] for city in cities.values()],
+            [city["aliases"] for city in cities.values()],
+            {normal: np.array([city["normals"][normal] for city in cities.values()]) for normal in NORMALS},
+        )
+
+    # -- Store files --
+
+    def save(self, directory: str) -> None:
+        """Write every array as an uncompressed .npy file, ready to be memory-mapped."""
+        os.makedirs(directory, exist_ok=True)
+        for name in STORE_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name), allow_pickle=False)
+
+    @classmethod
+    def open(cls, directory: str) -> "Climatology":
+        """Map a store written with `save`; nothing is read until a lookup touches it."""
+        # Plain ndarray views of the maps: slicing an np.memmap costs more than the lookup itself
+        return cls(**{
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False).view(np.ndarray)
+            for name in STORE_ARRAYS
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "Climatology":
+        """Open a compiled store directory, or compile a normals CSV in memory."""
+        if os.path.isdir(path):
+            return cls.open(path)
+        return cls.from_csv(path)
+
+    # -- City names --
+
+    def _resolve(self, name: str) -> Optional[int]:
+        """Index of the city `name` refers to, or None when nothing is close enough."""
+        # 'Paris, France' is looked up as 'Paris'
+        key = normalize_city(name.split(",")[0])
+        if not key:
+            return None
+        city = self._exact(key)
+        if city is None:
+            city = self._prefix(key)
+        if city is None:
+            city = self._similar(key)
+        return city
+
+    def _exact(self, key: str) -> Optional[int]:
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return int(self.key_city[i])
+        return None
+
+    def _prefix(self, key: str) -> Optional[int]:
+        if len(key) < MIN_PREFIX:
+            return None
+        start = int(np.searchsorted(self.keys, key, side="left"))
+        stop = int(np.searchsorted(self.keys, key + chr(sys.maxunicode), side="left"))
+        if start == stop:
+            return None
+        cities = self.key_city[start:stop]
+        return int(cities[np.argmax(self.population[cities])])
+
+    def _similar(self, key: str) -> Optional[int]:
+        # Misspellings rarely change the first letter, and those keys are one contiguous range
+        first = int(np.searchsorted(self.keys, key[0], side="left"))
+        last = int(np.searchsorted(self.keys, key[0] + chr(sys.maxunicode), side="left"))
+        grams = trigram_codes(key)
+        slots = np.minimum(np.searchsorted(self.trigrams, grams), len(self.trigrams) - 1)
+        slots = slots[self.trigrams[slots] == grams]
+        if first == last or not len(slots):
+            return None
+        hits = np.concatenate([
+            self.trigram_postings[start:stop]
+            for start, stop in zip(self.trigram_offsets[slots].tolist(), self.trigram_offsets[slots + 1].tolist())
+        ])
+        hits = hits[(hits >= first) & (hits < last)]
+        # Shared trigrams per key of the range; keys with none cannot match
+        shared = np.bincount(hits - first, minlength=last - first)
+        candidates = np.flatnonzero(shared)
+        if not len(candidates):
+            return None
+        shared = shared[candidates]
+        similarity = shared / (len(grams) + self.key_trigrams[candidates + first] - shared)
+        if similarity.max() < MIN_SIMILARITY:
+            return None
+        cities = self.key_city[candidates[similarity == similarity.max()] + first]
+        return int(cities[np.argmax(self.population[cities])])
+
+    # -- Lookups --
+
+    def normals(self, city: int, day: date) -> Dict[str, object]:
+        """Condition probabilities (percent) and mean low/high (°C) of a city on a day."""
+        row = day_of_year(day)
+        low, high = self.temperature[city, row].tolist()
+        return {
+            "city": str(self.names[city]),
+            "condition": CONDITIONS[self.condition[city, row]],
+            "probability": dict(zip(CONDITIONS, self.probability[city, row].tolist())),
+            "temp_min": low,
+            "temp_max": high,
+        }
+
+    def forecast(self, city: str, day: date) -> Optional[WeatherRecord]:
+        """The most likely condition and the normal temperature range, under the city's canonical name."""
+        index = self.resolve(city)
+        if index is None:
+            return None
+        row = day_of_year(day)
+        low, high = self.temperature[index, row].tolist()
+        return WeatherRecord(
+            str(self.names[index]),
+            day.isoformat(),
+            CONDITIONS[self.condition[index, row]],
+            f"{low}-{high}",
+        )
+
+
+@lru_cache(maxsize=1)
+def get_climatology() -> Climatology:
+    """Load the process-wide store from CLIMATOLOGY_PATH or compile the bundled normals."""
+    return Climatology.load(os.getenv("CLIMATOLOGY_PATH", DEFAULT_SOURCE))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile climate normals into a memory-mapped store, or query one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Compile a normals CSV into a store directory")
+    build.add_argument("source", nargs="?", default=DEFAULT_SOURCE)
+    build.add_argument("directory")
+    lookup = commands.add_parser("lookup", help="Show the normals for a city on a date (YYYY-MM-DD)")
+    lookup.add_argument("city")
+    lookup.add_argument("date")
+    lookup.add_argument("--store", default=os.getenv("CLIMATOLOGY_PATH", DEFAULT_SOURCE))
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        climatology = Climatology.from_csv(args.source)
+        climatology.save(args.directory)
+        print(f"{len(climatology)} cities, {len(climatology.keys)} names -> {args.directory}")
+        return 0
+
+    climatology = Climatology.load(args.store)
+    city = climatology.resolve(args.city)
+    if city is None:
+        print(f"no city matches '{args.city}'")
+        return 1
+    print(climatology.normals(city, date.fromisoformat(args.date)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+import csv
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from flight_inventory import MINUTES_PER_DAY, FlightInventory, format_clock, get_flight_inventory, normalize_place
+from records import FlightLeg, FlightRecord
+
+# -- Connection search --
+
+# Builds itineraries of up to three legs over the fare inventory. Fixture times are local, so
+# every leg is first placed on a UTC timeline using the time zones in data/places.csv (places
+# without one are treated as UTC). Legs are then sorted by (origin, UTC departure): each
+# airport's departures form one contiguous, time-ordered slice, the departure nodes of a
+# time-expanded graph whose waiting edges are implicit in that order. The search runs in
+# rounds, one per leg, like RAPTOR: each round extends every partial itinerary at once, with
+# one batched binary search for the window of departures between the minimum connection
+# time and the arrival deadline at each hub. Partial itineraries waiting at a hub are pruned to a Pareto set on departure
+# and arrival time, price, stops and preferred airline, and results are ranked on the Pareto front of
+# price, duration and stops. Long layovers are not cut off; they only survive when they buy
+# a lower fare. That keeps the hub pruning exact: an earlier arrival at a hub can make every
+# connection a later one can, up to the common arrival deadline of the search.
+
+DEFAULT_PLACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "places.csv")
+
+DEFAULT_MIN_CONNECTION = 60      # minutes
+MAX_TRIP_DAYS = 2                # itineraries must arrive within this many days after the travel date
+MAX_LEGS = 3                     # up to two connections
+
+
+@dataclass
+class Place:
+    name: str
+    timezone: Optional[str] = None
+    min_connection: int = DEFAULT_MIN_CONNECTION
+
+
+def load_places(path: str = DEFAULT_PLACES) -> Dict[str, Place]:
+    """Read place,timezone,min_connection rows, keyed by normalized place name."""
+    places = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            places[normalize_place(row["place"])] = Place(
+                row["place"], row["timezone"] or None, int(row["min_connection"] or DEFAULT_MIN_CONNECTION)
+            )
+    return places
+
+
+def format_duration(minutes: int) -> str:
+    return f"{minutes // 60}h{minutes % 60:02d}m"
+
+
+@dataclass
+class Itinerary:
+    legs: Tuple[int, ...]  # row ids in the RouteGraph
+    price: float
+    departure: int         # UTC minutes
+    arrival: int           # UTC minutes
+    stops: int
+    preferred: bool = False
+
+    @property
+    def duration(self) -> int:
+        return self.arrival - self.departure
+
+
+class RouteGraph:
+    """Time-expanded view of a FlightInventory for multi-leg searches."""
+
+    def __init__(
+        self,
+        inventory: FlightInventory,
+        places: Optional[Dict[str, Place]] = None,
+        default_min_connection: int = DEFAULT_MIN_CONNECTION,
+    ):
+        places = places or {}
+        self.inventory = inventory
+        self.place_names = inventory.places
+        self.airlines = inventory.airlines
+        n_places = len(self.place_names)
+        self._zones = [
+            ZoneInfo(places[normalize_place(name)].timezone)
+            if normalize_place(name) in places and places[normalize_place(name)].timezone else None
+            for name in self.place_names
+        ]
+        self.min_connection = np.array([
+            places[normalize_place(name)].min_connection if normalize_place(name) in places else default_min_connection
+            for name in self.place_names
+        ], dtype=np.int64)
+
+        day = inventory.day.astype(np.int64)
+        departure = inventory.departure.astype(np.int64)
+        origin_offset = self._offsets(inventory.origin, day)
+        destination_offset = self._offsets(inventory.destination, day)
+        # Block time from local clocks; legs are assumed to be shorter than a day
+        elapsed = inventory.arrival.astype(np.int64) - departure - (destination_offset - origin_offset)
+        elapsed = (elapsed - 1) % MINUTES_PER_DAY + 1
+        dep_utc = day * MINUTES_PER_DAY + departure - origin_offset
+
+        order = np.lexsort((dep_utc, inventory.origin))
+        self.rows = order                                   # graph row -> inventory row
+        self._graph_rows = np.empty_like(order)             # inventory row -> graph row
+        self._graph_rows[order] = np.arange(len(order))
+        self.origin = inventory.origin[order].astype(np.int64)
+        self.destination = inventory.destination[order].astype(np.int64)
+        self.day = inventory.day[order]
+        self.dep_utc = dep_utc[order]
+        self.arr_utc = (dep_utc + elapsed)[order]
+        self.price = inventory.price[order].astype(np.float64)
+        self.stops = inventory.stops[order].astype(np.int64)
+        self.airline = inventory.airline[order]
+        self.origin_offset = origin_offset[order]
+        self.destination_offset = destination_offset[order]
+        bounds = np.searchsorted(self.origin, np.arange(n_places + 1))
+        self._slices = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        # (origin, UTC departure) packed into one sorted key for binary searches across all hubs
+        self._keys = (self.origin << 32) + self.dep_utc
+        # Distinct (origin, destination) routes, for pruning hubs that cannot reach the destination
+        routes = np.unique(np.stack([self.origin, self.destination], axis=1), axis=0)
+        self._route_origin, self._route_destination = routes[:, 0], routes[:, 1]
+        inventory.subscribe(self._on_prices_changed)
+
+    def _on_prices_changed(self, rows: np.ndarray, prices: np.ndarray) -> None:
+        self.price[self._graph_rows[rows]] = prices
+
+    def _reachability(self, destination_id: int, max_legs: int) -> List[np.ndarray]:
+        """reach[r][p] is True when place p can get to the destination in at most r legs."""
+        reach = np.zeros(len(self.place_names), dtype=bool)
+        reach[destination_id] = True
+        levels = [reach]
+        for _ in range(max_legs - 1):
+            reach = reach.copy()
+            reach[self._route_origin[levels[-1][self._route_destination]]] = True
+            levels.append(reach)
+        return levels
+
+    def _offsets(self, place: np.ndarray, day: np.ndarray) -> np.ndarray:
+        """UTC offset in minutes of each (place, local day), DST included."""
+        offsets = np.zeros(len(place), dtype=np.int64)
+        zoned = np.array([zone is not None for zone in self._zones], dtype=bool)
+        if not zoned.any():
+            return offsets
+        mask = zoned[place]
+        keys = place[mask].astype(np.int64) * 10_000_000 + day[mask]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        values = np.empty(len(unique), dtype=np.int64)
+        for i, key in enumerate(unique.tolist()):
+            zone = self._zones[key // 10_000_000]
+            noon = datetime.combine(date.fromordinal(key % 10_000_000), datetime.min.time()) + timedelta(hours=12)
+            values[i] = int(zone.utcoffset(noon).total_seconds() // 60)
+        offsets[mask] = values[inverse]
+        return offsets
+
+    # -- Search --
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        day: date,
+        preferred_airlines: Optional[Sequence[str]] = None,
+        max_legs: int = MAX_LEGS,
+        max_trip_days: int = MAX_TRIP_DAYS,
+        limit: Optional[int] = None,
+    ) -> List[Itinerary]:
+        """Pareto-optimal itineraries departing `origin` on the local date `day`."""
+        origin_id, destination_id = self.inventory.place_id(origin), self.inventory.place_id(destination)
+        if origin_id is None or destination_id is None or origin_id == destination_id:
+            return []
+        preferred_mask = self.inventory.airline_mask(preferred_airlines or [])
+        reach = self._reachability(destination_id, max_legs)
+        # Latest arrival, in UTC minutes (the end of the last allowed day, ignoring time zones)
+        deadline = (day.toordinal() + 1 + max_trip_days) * MINUTES_PER_DAY
+        # Departures that land at the destination, for the last leg
+        final_rows = np.flatnonzero(self.destination == destination_id)
+
+        start, stop = self._slices[origin_id]
+        first = np.flatnonzero(
+            (self.day[start:stop] == day.toordinal())
+            & reach[max_legs - 1][self.destination[start:stop]]
+            & (self.arr_utc[start:stop] <= deadline)
+        ) + start
+        labels = _Labels(
+            first[:, None], self.dep_utc[first], self.arr_utc[first], self.price[first],
+            self.stops[first], preferred_mask[self.airline[first]],
+        )
+        found = []
+        for n_legs in range(1, max_legs + 1):
+            arrived = self.destination[labels.legs[:, -1]] == destination_id
+            found.append(labels.take(arrived))
+            if n_legs == max_legs:
+                break
+            waiting = self._prune(labels.take(~arrived))
+            rows = final_rows if n_legs == max_legs - 1 else None
+            labels = self._extend(waiting, origin_id, deadline, reach[max_legs - n_legs - 1], preferred_mask, rows)
+
+        itineraries = []
+        for batch in found:
+            duration = batch.arrival - batch.departure
+            stops = batch.stops + batch.legs.shape[1] - 1
+            # Only the candidates rank_itineraries could keep become objects
+            keep = _pareto_mask(batch.price, duration, stops)
+            keep |= batch.preferred & _pareto_mask(batch.price, duration, stops, ~batch.preferred)
+            for i in np.flatnonzero(keep).tolist():
+                itineraries.append(Itinerary(
+                    tuple(batch.legs[i].tolist()), float(batch.price[i]), int(batch.departure[i]),
+                    int(batch.arrival[i]), int(stops[i]), bool(batch.preferred[i]),
+                ))
+        return rank_itineraries(itineraries, limit)
+
+    def _prune(self, labels: "_Labels") -> "_Labels":
+        """Keep, per hub, the partial itineraries no other one dominates: left no earlier,
+        arrived no later, and no worse on price, stops and preferred airlines."""
+        if len(labels) < 2:
+            return labels
+        hubs = self.destination[labels.legs[:, -1]]
+        order = np.argsort(hubs, kind="stable")
+        bounds = np.flatnonzero(np.diff(hubs[order])) + 1
+        keep = np.zeros(len(labels), dtype=bool)
+        for group in np.split(order, bounds):
+            keep[group[_pareto_mask(
+                -labels.departure[group], labels.arrival[group], labels.price[group],
+                labels.stops[group], ~labels.preferred[group],
+            )]] = True
+        return labels.take(keep)
+
+    def _extend(self, labels, origin_id, deadline, reach, preferred_mask, rows=None) -> "_Labels":
+        """Extend every partial itinerary with each feasible next leg, all hubs at once.
+
+        Candidate legs leave the hub at least the minimum connection time after arrival and
+        land, by the deadline, at a place in `reach`; `rows` narrows them down further.
+        """
+        if rows is None:
+            rows = np.arange(len(self.price))
+        keys = self._keys[rows]
+        hubs = self.destination[labels.legs[:, -1]]
+        lo = np.searchsorted(keys, (hubs << 32) + labels.arrival + self.min_connection[hubs], side="left")
+        hi = np.searchsorted(keys, (hubs << 32) + deadline, side="left")
+        counts = np.maximum(hi - lo, 0)
+        owner = np.repeat(np.arange(len(labels)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        legs = rows[np.repeat(lo, counts) + offsets]
+
+        destinations = self.destination[legs]
+        # With at most two connections the only possible loop is a return to the origin
+        ok = reach[destinations] & (destinations != origin_id) & (self.arr_utc[legs] <= deadline)
+        owner, legs = owner[ok], legs[ok]
+        return _Labels(
+            np.hstack([labels.legs[owner], legs[:, None]]),
+            labels.departure[owner],
+            self.arr_utc[legs],
+            labels.price[owner] + self.price[legs],
+            labels.stops[owner] + self.stops[legs],
+            labels.preferred[owner] & preferred_mask[self.airline[legs]],
+        )
+
+    # -- Output --
+
+    def to_record(self, itinerary: Itinerary) -> FlightRecord:
+        """Tool-output record; times are local to each airport."""
+        legs = itinerary.legs
+        airlines = list(dict.fromkeys(self.airlines[self.airline[leg]] for leg in legs))
+        first, last = legs[0], legs[-1]
+        flight_legs = None
+        if len(legs) > 1:
+            flight_legs = [
+                FlightLeg(
+                    origin= self.place_names[self.origin[leg]],
+                    destination= self.place_names[self.destination[leg]],
+                    airline= self.airlines[self.airline[leg]],
+                    departure_time= self._local_time(self.dep_utc[leg], self.origin_offset[leg], self.day[first]),
+                    arrival_time= self._local_time(self.arr_utc[leg], self.destination_offset[leg], self.day[first]),
+                    layover= format_duration(int(self.dep_utc[leg] - self.arr_utc[prev])) if prev is not None else None,
+                )
+                for prev, leg in zip((None,) + legs[:-1], legs)
+            ]
+        return FlightRecord(
+            airline= " / ".join(airlines),
+            departure_time= self._local_time(self.dep_utc[first], self.origin_offset[first]),
+            arrival_time= self._local_time(self.arr_utc[last], self.destination_offset[last], self.day[first]),
+            price= round(itinerary.price, 2),
+            direct= itinerary.stops == 0,
+            stops= itinerary.stops,
+            duration= format_duration(itinerary.duration),
+            legs= flight_legs,
+            preferred= itinerary.preferred,
+        )
+
+    @staticmethod
+    def _local_time(utc_minutes: int, offset: int, travel_day: Optional[int] = None) -> str:
+        local = int(utc_minutes + offset)
+        text = format_clock(local)
+        if travel_day is not None:
+            days_later = local // MINUTES_PER_DAY - int(travel_day)
+            if days_later:
+                text += f" (+{days_later} day{'s' if days_later > 1 else ''})"
+        return text
+
+
+@dataclass
+class _Labels:
+    """A batch of partial itineraries, one row each; legs has one column per leg so far."""
+    legs: np.ndarray
+    departure: np.ndarray
+    arrival: np.ndarray
+    price: np.ndarray
+    stops: np.ndarray
+    preferred: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def take(self, index) -> "_Labels":
+        return _Labels(
+            self.legs[index], self.departure[index], self.arrival[index],
+            self.price[index], self.stops[index], self.preferred[index],
+        )
+
+
+def _pareto_mask(*columns: np.ndarray) -> np.ndarray:
+    """Mask of the rows no other row dominates, minimizing every column (ties keep one row)."""
+    n = len(columns[0])
+    keep = np.zeros(n, dtype=bool)
+    alive = np.ones(n, dtype=bool)
+    # In lexicographic order a row can only be dominated by one before it
+    for i in np.lexsort(columns[::-1]).tolist():
+        if alive[i]:
+            keep[i] = True
+            dominated = np.ones(n, dtype=bool)
+            for column in columns:
+                dominated &= column >= column[i]
+            alive &= ~dominated
+    return keep
+
+
+def rank_itineraries(itineraries: List[Itinerary], limit: Optional[int] = None) -> List[Itinerary]:
+    """Keep the Pareto front on (price, duration, stops), plus the front among itineraries
+    flown entirely on preferred airlines; preferred first, then by price and duration."""
+
+    def front(candidates):
+        candidates = sorted(candidates, key=lambda i: (i.price, i.duration, i.stops))
+        kept: List[Itinerary] = []
+        for it in candidates:
+            if not any(k.price <= it.price and k.duration <= it.duration and k.stops <= it.stops for k in kept):
+                kept.append(it)
+        return kept
+
+    best = front(itineraries)
+    chosen = {id(it) for it in best}
+    best += [it for it in front([it for it in itineraries if it.preferred]) if id(it) not in chosen]
+    best.sort(key=lambda i: (not i.preferred, i.price, i.duration))
+    return best[:limit] if limit is not None else best
+
+
+@lru_cache(maxsize=1)
+def get_route_graph() -> RouteGraph:
+    """The RouteGraph over the shared inventory, with places from PLACES_PATH or the bundled file."""
+    return RouteGraph(get_flight_inventory(), load_places(os.getenv("PLACES_PATH", DEFAULT_PLACES)))
@@ -0,0 +1,97 @@
+from datetime import date
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+from flight_inventory import FlightInventory, format_clock, get_flight_inventory
+from records import FareDay
+
+# -- Fare calendar --
+
+# Cheapest fare per (route, day), precomputed over the whole inventory so a flexible-date
+# question is answered with one slice of a dense [route, day] table instead of one search per
+# date. Inventory rows are sorted by (origin, destination, day), so every calendar cell is a
+# contiguous run of rows. The table follows `FlightInventory.update_prices`: a cheaper fare
+# replaces its cell's minimum directly, and only a price rise on the current cheapest fare
+# rescans that one cell's rows.
+
+
+class FareCalendar:
+    """Per-route, per-day minimum fares over a FlightInventory, kept current as fares change."""
+
+    def __init__(self, inventory: FlightInventory):
+        self.inventory = inventory
+        n_places = len(inventory.places)
+        self.first_day = int(inventory.day.min()) if len(inventory) else 0
+        self.n_days = int(inventory.day.max()) - self.first_day + 1 if len(inventory) else 0
+
+        keys = inventory.origin.astype(np.int64) * n_places + inventory.destination
+        route_keys, route_of_row = np.unique(keys, return_inverse=True)
+        self._routes = {
+            (key // n_places, key % n_places): route for route, key in enumerate(route_keys.tolist())
+        }
+        # Calendar cell of every inventory row; non-decreasing, since rows are sorted by route then day
+        self._cell = route_of_row.astype(np.int64) * self.n_days + (inventory.day - self.first_day)
+
+        n_cells = len(route_keys) * self.n_days
+        self.min_price = np.full(n_cells, np.inf, dtype=np.float32)
+        self.min_row = np.full(n_cells, -1, dtype=np.int64)
+        if len(inventory):
+            # Cheapest row first within each cell
+            order = np.lexsort((inventory.price, self._cell))
+            first = order[np.concatenate(([True], np.diff(self._cell[order]) != 0))]
+            self.min_price[self._cell[first]] = inventory.price[first]
+            self.min_row[self._cell[first]] = first
+        inventory.subscribe(self._on_prices_changed)
+
+    def _on_prices_changed(self, rows: np.ndarray, prices: np.ndarray) -> None:
+        for row, cell, price in zip(rows.tolist(), self._cell[rows].tolist(), prices.tolist()):
+            if price < self.min_price[cell]:
+                self.min_price[cell], self.min_row[cell] = price, row
+            elif row == self.min_row[cell]:
+                self._rescan(cell)
+
+    def _rescan(self, cell: int) -> None:
+        start = int(np.searchsorted(self._cell, cell, side="left"))
+        stop = int(np.searchsorted(self._cell, cell, side="right"))
+        row = start + int(np.argmin(self.inventory.price[start:stop]))
+        self.min_price[cell], self.min_row[cell] = self.inventory.price[row], row
+
+    def lookup(self, origin: str, destination: str, start: date, end: date) -> List[FareDay]:
+        """Cheapest fare on each day from `start` to `end` inclusive; days without fares are left out."""
+        origin_id, destination_id = self.inventory.place_id(origin), self.inventory.place_id(destination)
+        route = self._routes.get((origin_id, destination_id))
+        if route is None:
+            return []
+        first = max(start.toordinal() - self.first_day, 0)
+        last = min(end.toordinal() - self.first_day, self.n_days - 1)
+        if last < first:
+            return []
+
+        base = route * self.n_days
+        prices = self.min_price[base + first:base + last + 1]
+        rows = self.min_row[base + first:base + last + 1]
+        offered = np.flatnonzero(np.isfinite(prices))
+        if not len(offered):
+            return []
+        cheapest = prices[offered].min()
+        inventory = self.inventory
+        days = []
+        for offset in offered.tolist():
+            row = int(rows[offset])
+            days.append(FareDay(
+                date= date.fromordinal(self.first_day + first + offset).isoformat(),
+                price= round(float(prices[offset]), 2),
+                airline= inventory.airlines[inventory.airline[row]],
+                departure_time= format_clock(inventory.departure[row]),
+                direct= bool(inventory.stops[row] == 0),
+                cheapest= bool(prices[offset] == cheapest),
+            ))
+        return days
+
+
+@lru_cache(maxsize=1)
+def get_fare_calendar() -> FareCalendar:
+    """The FareCalendar over the shared flight inventory."""
+    return FareCalendar(get_flight_inventory())
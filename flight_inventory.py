@@ -0,0 +1,363 @@
+import csv
+import os
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from records import FlightRecord
+
+# -- Flight inventory --
+
+# Fares are held column-wise in NumPy arrays sorted by (origin, destination, day, departure),
+# so every (origin, destination, day) group is one contiguous slice. A dict maps each key to
+# its slice, which makes a lookup one hash probe plus vectorized filtering on array views.
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "flights.csv")
+
+# The airlines offered in the Streamlit sidebar come first so their ids stay stable.
+AIRLINES = [
+    "SkyWays", "OceanAir", "MountainJet", "Delta", "United",
+    "American", "Southwest", "Etihad", "Emirates", "Qatar Airways",
+]
+
+# Daily-service rows in a CSV fixture (empty date column) are expanded over this many days.
+DEFAULT_HORIZON_DAYS = 60
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def normalize_place(name: str) -> str:
+    """Normalize a city or airport name for index lookups."""
+    return " ".join(name.split()).casefold()
+
+
+def parse_travel_date(value: str, today: Optional[date] = None) -> date:
+    """Parse a travel date given as YYYY-MM-DD, 'today' or 'tomorrow'."""
+    today = today or date.today()
+    text = value.strip().lower()
+    if text == "today":
+        return today
+    if text == "tomorrow":
+        return today + timedelta(days=1)
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Unrecognised date '{value}'. Please use the YYYY-MM-DD format.") from None
+
+
+# -- Dates in free text --
+
+# Chat messages name dates in many ways. The ones that pin down a single day are resolved
+# here; anything naming a month, a season or a span ("in March", "next week") is refused
+# rather than guessed, so callers can leave the request to the model.
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_COUNTS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "ten": 10}
+
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_DAY_AFTER_TOMORROW = re.compile(r"\bday after tomorrow\b", re.IGNORECASE)
+_TOMORROW = re.compile(r"\btomorrow\b", re.IGNORECASE)
+_TODAY = re.compile(r"\b(?:today|tonight)\b", re.IGNORECASE)
+_IN_DAYS = re.compile(r"\bin\s+(?P<count>\d+|" + "|".join(_COUNTS) + r")\s+(?P<unit>day|week)s?\b", re.IGNORECASE)
+_WEEKEND = re.compile(r"\b(?:(?P<next>next)\s+)?weekend\b", re.IGNORECASE)
+_WEEKDAY = re.compile(r"\b(?:(?P<next>next)\s+)?(?P<day>" + "|".join(_WEEKDAYS) + r")\b", re.IGNORECASE)
+_VAGUE_DATE = re.compile(
+    r"\b(?:january|february|march|april|june|july|august|september|october|november|december"
+    r"|jan|feb|mar|apr|jun|jul|aug|sept?|oct|nov|dec|spring|summer|autumn|winter|christmas|easter"
+    r"|(?:next|this|coming)\s+(?:week|month|year)|in\s+(?:a|\d+|" + "|".join(_COUNTS) + r")\s+(?:month|year)s?"
+    r"|\d{1,2}(?:st|nd|rd|th)|\d{1,2}/\d{1,2}(?:/\d{2,4})?)\b|\b(?-i:May)\b",
+    re.IGNORECASE,
+)
+
+
+def _on_or_after(today: date, weekday: int, skip_today: bool = False) -> date:
+    ahead = (weekday - today.weekday()) % 7
+    return today + timedelta(days=ahead or (7 if skip_today else 0))
+
+
+def find_travel_date(text: str, today: Optional[date] = None) -> Optional[date]:
+    """The single day a message refers to, or None when it names no date at all.
+
+    Raises ValueError when the message has a date it cannot pin to one day, such as a month
+    ("in March"), a span ("next week") or a day of the month without its month.
+    """
+    today = today or date.today()
+    iso = _ISO_DATE.search(text)
+    if iso:
+        return parse_travel_date(iso.group(0), today)
+    if _VAGUE_DATE.search(text):
+        raise ValueError(f"Cannot pin the date in '{text}' to a single day.")
+    if _DAY_AFTER_TOMORROW.search(text):
+        return today + timedelta(days=2)
+    if _TOMORROW.search(text):
+        return today + timedelta(days=1)
+    match = _IN_DAYS.search(text)
+    if match:
+        count = match.group("count").lower()
+        count = int(count) if count.isdigit() else _COUNTS[count]
+        return today + timedelta(days=count * (7 if match.group("unit").lower() == "week" else 1))
+    match = _WEEKDAY.search(text)
+    if match:
+        return _on_or_after(today, _WEEKDAYS.index(match.group("day").lower()), skip_today= bool(match.group("next")))
+    match = _WEEKEND.search(text)
+    if match:
+        if today.weekday() >= 5 and not match.group("next"):
+            return today
+        return _on_or_after(today, 5, skip_today= True)
+    if _TODAY.search(text):
+        return today
+    return None
+
+
+def parse_clock(value: str) -> int:
+    """Convert an 'HH:MM' string into minutes after midnight."""
+    hours, minutes = value.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+# Every 'HH:MM' label, built once so results share the strings instead of formatting per fare
+_CLOCK_LABELS = [f"{minutes // 60:02d}:{minutes % 60:02d}" for minutes in range(MINUTES_PER_DAY)]
+
+
+def format_clock(minutes: int) -> str:
+    """Convert minutes after midnight (possibly past 24h) back into 'HH:MM'."""
+    return _CLOCK_LABELS[int(minutes) % MINUTES_PER_DAY]
+
+
+class FlightInventory:
+    """Column-oriented fare store with a hash index on (origin, destination, day)."""
+
+    def __init__(
+        self,
+        origin: np.ndarray,
+        destination: np.ndarray,
+        day: np.ndarray,
+        departure: np.ndarray,
+        arrival: np.ndarray,
+        price: np.ndarray,
+        stops: np.ndarray,
+        airline: np.ndarray,
+        places: List[str],
+        airlines: List[str],
+        presorted: bool = False,
+    ):
+        if not presorted:
+            order = np.lexsort((departure, day, destination, origin))
+            origin, destination, day = origin[order], destination[order], day[order]
+            departure, arrival, price = departure[order], arrival[order], price[order]
+            stops, airline = stops[order], airline[order]
+
+        self.origin = np.ascontiguousarray(origin, dtype=np.int32)
+        self.destination = np.ascontiguousarray(destination, dtype=np.int32)
+        self.day = np.ascontiguousarray(day, dtype=np.int32)              # date.toordinal()
+        self.departure = np.ascontiguousarray(departure, dtype=np.int16)  # minutes after midnight
+        self.arrival = np.ascontiguousarray(arrival, dtype=np.int16)      # may exceed 24h for overnight legs
+        self.price = np.ascontiguousarray(price, dtype=np.float32)
+        self.stops = np.ascontiguousarray(stops, dtype=np.int8)
+        self.airline = np.ascontiguousarray(airline, dtype=np.int16)
+
+        self.places = list(places)
+        self.airlines = list(airlines)
+        self._place_ids = {normalize_place(name): i for i, name in enumerate(self.places)}
+        self._airline_ids = {name: i for i, name in enumerate(self.airlines)}
+        self._index = self._build_index()
+        self._listeners: List[Callable[[np.ndarray, np.ndarray], None]] = []
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def __getstate__(self) -> dict:
+        # Price listeners belong to the process that subscribed them (tool_pool.py pickles inventories)
+        return {**self.__dict__, "_listeners": []}
+
+    def _build_index(self) -> Dict[Tuple[int, int, int], Tuple[int, int]]:
+        """Map every (origin, destination, day) key to its [start, stop) row slice."""
+        n = len(self.price)
+        if n == 0:
+            return {}
+        changed = (
+            (self.origin[1:] != self.origin[:-1])
+            | (self.destination[1:] != self.destination[:-1])
+            | (self.day[1:] != self.day[:-1])
+        )
+        starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+        stops = np.append(starts[1:], n)
+        keys = zip(self.origin[starts].tolist(), self.destination[starts].tolist(), self.day[starts].tolist())
+        return dict(zip(keys, zip(starts.tolist(), stops.tolist())))
+
+    # -- Construction --
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Tuple[str, str, date, str, int, int, float, int]],
+        airlines: Optional[List[str]] = None,
+    ) -> "FlightInventory":
+        """Build an inventory from (origin, destination, day, airline, dep_min, arr_min, price, stops) rows."""
+        place_ids: Dict[str, int] = {}
+        places: List[str] = []
+        airlines = list(airlines or AIRLINES)
+        airline_ids = {name: i for i, name in enumerate(airlines)}
+        columns: List[List] = [[] for _ in range(8)]
+
+        for origin, destination, day, airline, departure, arrival, price, stops in records:
+            for name in (origin, destination):
+                key = normalize_place(name)
+                if key not in place_ids:
+                    place_ids[key] = len(places)
+                    places.append(name)
+            if airline not in airline_ids:
+                airline_ids[airline] = len(airlines)
+                airlines.append(airline)
+            if arrival < departure:
+                arrival += MINUTES_PER_DAY
+            row = (
+                place_ids[normalize_place(origin)], place_ids[normalize_place(destination)], day.toordinal(),
+                departure, arrival, price, stops, airline_ids[airline],
+            )
+            for column, value in zip(columns, row):
+                column.append(value)
+
+        origin, destination, day, departure, arrival, price, stops, airline = (np.array(c) for c in columns)
+        return cls(origin, destination, day, departure, arrival, price, stops, airline, places, airlines)
+
+    @classmethod
+    def from_csv(cls, path: str, start: Optional[date] = None, horizon_days: int = DEFAULT_HORIZON_DAYS) -> "FlightInventory":
+        """Load a CSV fixture. Rows with an empty date are daily services expanded from `start`."""
+        start = start or date.today()
+        window = [start + timedelta(days=i) for i in range(horizon_days)]
+
+        def rows():
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    fields = (
+                        row["airline"], parse_clock(row["departure"]), parse_clock(row["arrival"]),
+                        float(row["price"]), int(row["stops"]),
+                    )
+                    days = [date.fromisoformat(row["date"])] if row["date"] else window
+                    for day in days:
+                        yield (row["origin"], row["destination"], day, *fields)
+
+        return cls.from_records(rows())
+
+    @classmethod
+    def from_npz(cls, path: str) -> "FlightInventory":
+        """Load an inventory previously written with `save_npz`."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["origin"], data["destination"], data["day"], data["departure"], data["arrival"],
+                data["price"], data["stops"], data["airline"],
+                places=data["places"].tolist(), airlines=data["airlines"].tolist(), presorted=True,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "FlightInventory":
+        """Load a fixture file, picking the reader from its extension."""
+        if path.endswith(".npz"):
+            return cls.from_npz(path)
+        return cls.from_csv(path)
+
+    def save_npz(self, path: str) -> None:
+        """Write the sorted columns to an uncompressed .npz file for fast reloads."""
+        np.savez(
+            path,
+            origin=self.origin, destination=self.destination, day=self.day,
+            departure=self.departure, arrival=self.arrival, price=self.price,
+            stops=self.stops, airline=self.airline,
+            places=np.array(self.places), airlines=np.array(self.airlines),
+        )
+
+    # -- Fare changes --
+
+    def subscribe(self, callback: Callable[[np.ndarray, np.ndarray], None]) -> None:
+        """Call `callback(rows, prices)` after every price update, to keep derived views in step."""
+        self._listeners.append(callback)
+
+    def update_prices(self, rows: Iterable[int], prices: Iterable[float]) -> None:
+        """Reprice fares in place; `rows` are row ids as returned by `lookup`."""
+        rows = np.asarray(rows, dtype=np.intp)
+        prices = np.asarray(prices, dtype=np.float32)
+        self.price[rows] = prices
+        for callback in self._listeners:
+            callback(rows, prices)
+
+    # -- Queries --
+
+    def place_id(self, name: str) -> Optional[int]:
+        return self._place_ids.get(normalize_place(name))
+
+    def airline_mask(self, names: Iterable[str]) -> np.ndarray:
+        """Boolean lookup table over airline ids, True for the given airline names."""
+        mask = np.zeros(len(self.airlines), dtype=bool)
+        for name in names:
+            airline_id = self._airline_ids.get(name)
+            if airline_id is not None:
+                mask[airline_id] = True
+        return mask
+
+    def lookup(
+        self,
+        origin: str,
+        destination: str,
+        day: date,
+        max_price: Optional[float] = None,
+        max_stops: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return the row ids of matching fares, ordered by departure time."""
+        origin_id, destination_id = self.place_id(origin), self.place_id(destination)
+        if origin_id is None or destination_id is None:
+            return np.empty(0, dtype=np.intp)
+        span = self._index.get((origin_id, destination_id, day.toordinal()))
+        if span is None:
+            return np.empty(0, dtype=np.intp)
+
+        start, stop = span
+        keep = np.ones(stop - start, dtype=bool)
+        if max_price is not None:
+            keep &= self.price[start:stop] <= max_price
+        if max_stops is not None:
+            keep &= self.stops[start:stop] <= max_stops
+        return np.flatnonzero(keep) + start
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        day: date,
+        preferred_airlines: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        max_price: Optional[float] = None,
+        max_stops: Optional[int] = None,
+    ) -> List[FlightRecord]:
+        """Find fares and return them as tool-output records, preferred airlines first."""
+        rows = self.lookup(origin, destination, day, max_price=max_price, max_stops=max_stops)
+        preferred = np.zeros(len(rows), dtype=bool)
+        if preferred_airlines and len(rows):
+            preferred = self.airline_mask(preferred_airlines)[self.airline[rows]]
+            # Stable sort keeps departure order within the preferred and other groups
+            order = np.argsort(~preferred, kind="stable")
+            rows, preferred = rows[order], preferred[order]
+        if limit is not None:
+            rows, preferred = rows[:limit], preferred[:limit]
+        return self._to_records(rows, preferred)
+
+    def _to_records(self, rows: np.ndarray, preferred: np.ndarray) -> List[FlightRecord]:
+        # Columns are gathered and converted once, rather than indexed scalar by scalar per record
+        airlines = self.airlines
+        columns = zip(
+            self.airline[rows].tolist(), self.departure[rows].tolist(), self.arrival[rows].tolist(),
+            self.price[rows].tolist(), self.stops[rows].tolist(), preferred.tolist(),
+        )
+        return [
+            FlightRecord(airlines[airline], format_clock(departure), format_clock(arrival), round(price, 2), stops == 0, preferred= is_preferred)
+            for airline, departure, arrival, price, stops, is_preferred in columns
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_flight_inventory() -> FlightInventory:
+    """Load the process-wide inventory from FLIGHT_INVENTORY_PATH or the bundled fixture."""
+    return FlightInventory.load(os.getenv("FLIGHT_INVENTORY_PATH", DEFAULT_FIXTURE))
@@ -1,9 +1,10 @@
 import asyncio
 from typing import List
 from pydantic import BaseModel, Field
-from agents import Agent, Runner
+from agents import Agent
 from dotenv import load_dotenv
 from tools import get_weather_forecast, search_flights, search_hotels
+from batch import run_batch
 import os
 
 load_dotenv()
@@ -103,11 +104,16 @@ async def main():
         "Find me a hotel in Paris with a pool for under $300 per night"
     ]
     
-    for query in queries:
+    # Run every query concurrently; results come back in the order of the list
+    results = await run_batch(travel_agent, queries)
+    
+    for result in results:
         print("\n" + "="*50)
-        print(f"QUERY: {query}")
+        print(f"QUERY: {result.query}")
         
-        result = await Runner.run(travel_agent, query)
+        if result.error:
+            print(f"\n⚠️ ERROR: {result.error}")
+            continue
         
         print("\nFINAL RESPONSE:")
         
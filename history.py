@@ -0,0 +1,128 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+# -- Conversation history --
+
+# Builds the model input for a chat turn from a token-budgeted window of recent messages plus a
+# rolling summary of everything older. Assistant messages are sent as their structured output
+# (compact JSON) instead of the HTML the UI renders. The summary is extractive and updated
+# incrementally: each message is folded in once, when it leaves the window, without a model call.
+
+DEFAULT_TOKEN_BUDGET = 1500
+SUMMARY_TOKEN_BUDGET = 300
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def output_for_history(output: Any) -> Any:
+    """What to keep of an agent's final output: the structured fields, or the plain text."""
+    if hasattr(output, "model_dump"):
+        return output.model_dump()
+    return output if isinstance(output, (str, dict)) else str(output)
+
+
+def message_for_model(message: Dict[str, Any]) -> str:
+    """The text sent to the model for a chat_history entry."""
+    output = message.get("output")
+    if message["role"] == "assistant" and output is not None:
+        return output if isinstance(output, str) else json.dumps(output, separators=(",", ":"))
+    return message["content"]
+
+
+def _clip(text: str, limit: int = SUMMARY_LINE_CHARS) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def summarize_message(message: Dict[str, Any]) -> str:
+    """One summary line per message, keeping the facts later turns tend to refer back to."""
+    output = message.get("output")
+    if message["role"] == "user":
+        return f"User asked: {_clip(message['content'])}"
+    if isinstance(output, dict):
+        if "destination" in output:
+            return _clip(
+                f"Assistant planned {output.get('duration_days')} days in {output.get('destination')} "
+                f"for ${output.get('budget')}: {', '.join(output.get('activities', [])[:3])}"
+            )
+        if "airline" in output:
+            return _clip(
+                f"Assistant recommended {output.get('airline')} flight {output.get('departure_time')}-"
+                f"{output.get('arrival_time')} at ${output.get('price')}"
+            )
+        if "name" in output:
+            return _clip(f"Assistant recommended {output.get('name')} ({output.get('location')}) at ${output.get('price_per_night')}/night")
+    return f"Assistant replied: {_clip(message_for_model(message))}"
+
+
+@dataclass
+class HistoryStats:
+    tokens_sent: int
+    tokens_full: int
+    messages_in_window: int
+    messages_summarized: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.tokens_full - self.tokens_sent, 0)
+
+
+class ConversationHistory:
+    """Token-budgeted window over chat_history with an incrementally updated summary."""
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, summary_budget: int = SUMMARY_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.summary_lines: List[str] = []
+        self.folded = 0  # messages before this index live only in the summary
+        self.last_stats: HistoryStats = None
+
+    def reset(self) -> None:
+        self.summary_lines = []
+        self.folded = 0
+        self.last_stats = None
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def _fold(self, messages: List[Dict[str, Any]]) -> None:
+        self.summary_lines.extend(summarize_message(m) for m in messages)
+        # Keep the summary bounded by dropping its oldest lines
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary) > self.summary_budget:
+            self.summary_lines.pop(0)
+
+    def build(self, messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], HistoryStats]:
+        """Return the input list for Runner.run and the token accounting for this turn."""
+        texts = [message_for_model(m) for m in messages]
+        budget = self.token_budget
+        start = len(messages)
+        # Walk back from the newest message; the latest one is always sent
+        while start > self.folded:
+            cost = estimate_tokens(texts[start - 1])
+            if start < len(messages) and cost > budget:
+                break
+            budget -= cost
+            start -= 1
+
+        if start > self.folded:
+            self._fold(messages[self.folded:start])
+            self.folded = start
+
+        input_list = []
+        if self.summary_lines:
+            input_list.append({"role": "system", "content": "Summary of the earlier conversation:\n" + self.summary})
+        input_list.extend({"role": m["role"], "content": text} for m, text in zip(messages[start:], texts[start:]))
+
+        self.last_stats = HistoryStats(
+            tokens_sent=sum(estimate_tokens(item["content"]) for item in input_list),
+            tokens_full=sum(estimate_tokens(m["content"]) for m in messages),
+            messages_in_window=len(messages) - start,
+            messages_summarized=start,
+        )
+        return input_list, self.last_stats
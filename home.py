@@ -1,14 +1,17 @@
 import streamlit as st
 import uuid
-import json
-from typing import List, Dict, Any
-import os
-import asyncio
-from datetime import datetime
 
-from output import travel_agent, TravelPlan, FlightRecommendation, HotelRecommendation
-from context import UserContext
-from agents import Runner
+from hotel_inventory import AMENITIES
+from runtime import AgentRuntime
+from history import ConversationHistory, output_for_history
+from metrics import instrumented, observe
+from sessions import get_session_store
+from transcript import avatar_css, chat_message, get_transcript_renderer
+import time
+
+# The first render only needs the sidebar and the stored conversation. The agents, the Agents
+# SDK and telemetry (output.py) and the modules that run them are imported with the first
+# message, further down.
 
 # Page Configuration
 st.set_page_config(
@@ -43,8 +46,9 @@ st.markdown("""
     .avatar {
         width: 40px;
         height: 40px;
+        flex-shrink: 0;
         border-radius: 50%;
-        object-fit: cover;
+        background-size: cover;
         margin-right: 1rem;
     }
     .message {
@@ -59,24 +63,44 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Avatars from assets/ (transcript.py), sent once with the styles rather than fetched per message
+st.markdown(f"<style>{avatar_css()}</style>", unsafe_allow_html=True)
 
-# initialize session state for chat history
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
 
-if 'thread_id' not in st.session_state:
-    st.session_state.thread_id = str(uuid.uuid4())
+# One event loop thread per server process, shared by every session, so the OpenAI and
+# weather HTTP connection pools stay warm across turns
+@st.cache_resource
+def get_runtime():
+    return AgentRuntime()
 
-if "user_context" not in st.session_state:
-    st.session_state.user_context = UserContext(
-        user_id=str(uuid.uuid4())
-    )
+runtime = get_runtime()
+
+# Conversations live in the session store (sessions.py), not in st.session_state, so they
+# survive a restart and any replica can serve them. The user and thread ids ride in the URL;
+# a returning user without a thread id gets their latest conversation back.
+sessions = get_session_store()
+
+if "user_id" not in st.session_state:
+    st.session_state.user_id = st.query_params.get("user") or str(uuid.uuid4())
+    st.session_state.thread_id = sessions.open(st.session_state.user_id, st.query_params.get("thread")).thread_id
+    st.query_params.update(user= st.session_state.user_id, thread= st.session_state.thread_id)
+
+session = sessions.open(st.session_state.user_id, st.session_state.thread_id)
 
 if "processing_message" not in st.session_state:
     st.session_state.processing_message = None
 
+# Token-budgeted window plus rolling summary of older turns
+if "history" not in st.session_state:
+    st.session_state.history = ConversationHistory()
+
+# Full transcript pages shown above the latest one; older pages wait behind a button
+if "earlier_pages" not in st.session_state:
+    st.session_state.earlier_pages = 1
+
 
 # Function to format agent response
+@instrumented("ui")
 def format_agent_response(output):
     # Check if output is a Pydantic model and convert to dict
     if hasattr(output, "model_dump"):
@@ -84,7 +108,21 @@ def format_agent_response(output):
     
     if isinstance(output, dict):
         # Handle structured outputs
-        if "destination" in output:  # TravelPlan
+        if "plan" in output:  # TripPlan: the plan, flight and hotel rendered as usual, plus the weather
+            html = f"""
+            <h3>Your Trip to {output.get('destination', 'Your Destination')}</h3>
+            <p><strong>Dates:</strong> {output.get('start_date', 'N/A')} to {output.get('end_date', 'N/A')}</p>
+            """
+            for part in ("flight", "hotel"):
+                if output.get(part):
+                    html += format_agent_response(output[part])
+            html += "<h4>Weather:</h4><ul>"
+            for forecast in output.get('weather', []):
+                html += f"<li>{forecast}</li>"
+            html += "</ul>"
+            html += format_agent_response(output['plan'])
+            return html
+        elif "destination" in output:  # TravelPlan
             html = f"""
             <h3>Travel Plan for {output.get('destination', 'Your Trip')}</h3>
             <p><strong>Duration:</strong> {output.get('duration_days', 'N/A')} days</p>
@@ -129,15 +167,55 @@ def format_agent_response(output):
     # Default: return as string
     return str(output)
 
+# Function to stream the agent's response into the page as it is generated
+def stream_response(input_list, agent):
+    status_box = st.status("Thinking...", expanded=False)
+    body = st.empty()
+    final_output = last_agent = None
+    
+    # The run happens on the shared runtime loop; updates are rendered here in the script thread
+    for update in runtime.iterate(stream_agent(agent, input_list, context= session.context)):
+        # Show tool calls and handoffs as they happen
+        if update.status:
+            status_box.write(update.status)
+            status_box.update(label= update.status)
+        
+        if update.done:
+            final_output, last_agent = update.final_output, update.agent
+            status_box.update(label= "Done", state= "complete")
+        elif update.partial_output:
+            # Structured outputs fill in field by field
+            body.markdown(format_agent_response(with_all_fields(update.output_type, update.partial_output)), unsafe_allow_html=True)
+        elif update.text:
+            body.markdown(update.text)
+    
+    body.empty()
+    return final_output, last_agent
+
+# Function to wait for an agent run slot, showing the user's place in line meanwhile
+def wait_for_slot():
+    # Raises SchedulerBusy straight away when the queue is full
+    ticket = runtime.call(scheduler.enqueue, session.context.user_id)
+    queue_box = st.empty()
+    try:
+        for place in runtime.iterate(scheduler.wait(ticket)):
+            queue_box.info(f"⏳ Lots of travelers right now, you're number {place} in line...")
+    except BaseException:
+        # e.g. Streamlit stopping the script when the user leaves: give up the place in line
+        runtime.call(scheduler.release, ticket)
+        raise
+    queue_box.empty()
+    return ticket
+
+# Function to reveal one more page of the transcript (runs before the rerun that shows it)
+def show_earlier_messages():
+    st.session_state.earlier_pages += 1
+
 # Function to handle user input
 def handle_user_messages(user_input: str):
     # Add user message to chat history immediately
-    timestamp = datetime.now().strftime("%I:%M %p")
-    st.session_state.chat_history.append({
-        "role": "user",
-        "content": user_input,
-        "timestamp": timestamp
-    })
+    session.chat_history.append(chat_message("user", user_input))
+    sessions.save(session)
     
     # Set the message for processing in the next rerun
     st.session_state.processing_message = user_input
@@ -153,67 +231,69 @@ with st.sidebar:
     preferred_airlines = st.multiselect(
         "Preferred Airlines",
         options=["SkyWays", "OceanAir", "MountainJet", "Delta", "United", "American", "Southwest", "Etihad", "Emirates", "Qatar Airways"],
-        default=st.session_state.user_context.preferred_airlines
+        default=session.context.preferred_airlines
     )
     
     st.subheader("Hotel Preferences")
     preferred_amenities = st.multiselect(
         "Must Have Amenities",
-        options=["WiFi", "Pool", "Gym", "Free Breakfast", "Restaurant", "Spa", "Parking"],
-        default=st.session_state.user_context.hotel_amenities
+        options=AMENITIES,
+        default=session.context.hotel_amenities
     )
     
     st.subheader("Budget Level")
     budget_level = st.select_slider(
         "Budget Level",
         options=["budget", "mid-range", "luxury"],
-        value= st.session_state.user_context.budget_level or "mid-range",
+        value= session.context.budget_level or "mid-range",
     )
     
+    st.subheader("Display")
+    stream_responses = st.toggle("Stream responses", value=True)
+    fast_routing = st.toggle("Fast-path routing", value=True, help="Send obvious flight, hotel, weather and small-talk questions straight to the right specialist")
+    whole_trips = st.toggle("Whole-trip planning", value=True, help="Plan flights, hotel, weather and activities at once when a message asks for the whole trip")
+    
+    history_stats = st.session_state.history.last_stats
+    if history_stats:
+        st.caption(
+            f"Last turn sent {history_stats.tokens_sent:,} context tokens "
+            f"({history_stats.tokens_saved:,} saved, {history_stats.messages_summarized} messages summarized)"
+        )
+    
     if st.button("Save Preferences"):
-        st.session_state.user_context.preferred_airlines = preferred_airlines
-        st.session_state.user_context.hotel_amenities = preferred_amenities
-        st.session_state.user_context.budget_level = budget_level
+        session.context.preferred_airlines = preferred_airlines
+        session.context.hotel_amenities = preferred_amenities
+        session.context.budget_level = budget_level
+        sessions.save(session)
         st.success("Preferences saved!")
     
     st.divider()
     
     if st.button("Start New Conversation"):
-        st.session_state.chat_history = []
-        st.session_state.thread_id = str(uuid.uuid4())
+        session = sessions.new_thread(session)
+        st.session_state.history.reset()
+        st.session_state.earlier_pages = 1
+        st.session_state.thread_id = session.thread_id
+        st.query_params["thread"] = session.thread_id
         st.success("New conversation started!")
         
 # Main chat interface
 st.title("✈️ Travel Planner Assistant")
 st.caption("Ask me about travel destinations, flight options, hotel recommendations, and more!")
 
-# Display chat messages
-for message in st.session_state.chat_history:
-    with st.container():
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="chat-message user">
-                <div class="content">
-                    <img src="https://api.dicebear.com/7.x/avataaars/svg?seed={st.session_state.user_context.user_id}" class="avatar" />
-                    <div class="message">
-                        {message["content"]}
-                        <div class="timestamp">{message["timestamp"]}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message assistant">
-                <div class="content">
-                    <img src="https://api.dicebear.com/7.x/bottts/svg?seed=travel-agent" class="avatar" />
-                    <div class="message">
-                        {message["content"]}
-                        <div class="timestamp">{message["timestamp"]}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+# Display chat messages: each message's HTML is rendered once and cached (transcript.py), and
+# only the latest pages are sent
+transcript = get_transcript_renderer()
+history_started = time.perf_counter()
+pages = transcript.visible_pages(session.chat_history, st.session_state.earlier_pages)
+if pages.start > 0:
+    st.button(
+        f"Show earlier messages ({pages.start * transcript.page_size} more)",
+        on_click= show_earlier_messages,
+    )
+for page in pages:
+    st.html(transcript.page_html(session.chat_history, page))
+observe("ui", "render_history", time.perf_counter() - history_started)
                         
 # User input area
 user_input = st.chat_input("Ask about travel plans, flights, hotels, or anything else!")
@@ -226,45 +306,95 @@ if user_input:
 if st.session_state.processing_message:
     user_input = st.session_state.processing_message
     st.session_state.processing_message = None
+    turn_started = time.perf_counter()
+    ticket = None
+    
+    # Imported here rather than at the top: the first page render doesn't wait for them, and
+    # after the first message they are already loaded
+    from output import travel_agent, fast_routes, response_cache, trip_planner
+    from speculative import run_speculative
+    from streaming import stream_agent, with_all_fields
+    from router import get_router, run_routed, select_agent
+    from response_cache import fetch_cached
+    from scheduler import SchedulerBusy, get_scheduler
+    
+    # Agent runs from every session take a slot here first (state lives on the runtime loop)
+    scheduler = get_scheduler()
     
     # Process the message asynchronously
-    with st.spinner("Processing..."):
-        try:
-            # Prepare the input for the agent using chat history
-            if len(st.session_state.chat_history) > 1:
-                input_list = []
-                for msg in st.session_state.chat_history:
-                    input_list.append({"role": msg["role"], "content": msg["content"]})
-            else: 
-                input_list = user_input
+    try:
+        # Prepare the input for the agent: recent messages within the token budget, older
+        # ones folded into a summary, assistant turns as structured output rather than HTML
+        if len(session.chat_history) > 1:
+            input_list, _ = st.session_state.history.build(session.chat_history)
+        else: 
+            input_list = user_input
 
-            # Run the agent with the user input
-            result = asyncio.run(Runner.run(
-                travel_agent,
-                context= st.session_state.user_context,
-                input= input_list,  
-            ))
-            
-            # handle the agentresponse with the function created before.
-            response = format_agent_response(result.final_output)
-            
-            # add the assistant response to the chat history
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": response,
-                "timestamp": datetime.now().strftime("%I:%M %p")
-            })
-            
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": f"An error occurred: {e}",
-                "timestamp": datetime.now().strftime("%I:%M %p")
-            })
+        # The intent router picks the specialist locally; anything unclear goes to the planner
+        route = get_router().route(user_input) if fast_routing else None
+        agent = select_agent(route, travel_agent, fast_routes) if route else travel_agent
+        # Whole-trip requests get flights, hotel, weather and activities in one concurrent step
+        trip_request = trip_planner.parse(user_input) if whole_trips else None
+
+        # Opening questions may already be answered in the response cache (opt-in); the budget
+        # guardrail still runs on a hit. Later turns depend on the conversation, so they are not cached
+        cached = None
+        if response_cache is not None and isinstance(input_list, str):
+            cached = runtime.run(fetch_cached(response_cache, travel_agent, input_list, context= session.context))
+
+        if cached is not None:
+            final_output, last_agent = cached.final_output, cached.last_agent.name
+        elif route and route.intent == "weather":
+            # Answered straight from the weather tool, no model call needed
+            result = runtime.run(run_routed(travel_agent, fast_routes, input_list, context= session.context))
+            final_output, last_agent = result.final_output, result.last_agent.name
+        elif trip_request is not None:
+            ticket = wait_for_slot()
+            with st.spinner("Planning your whole trip..."):
+                result = runtime.run(trip_planner.run(input_list, context= session.context, request= trip_request))
+            final_output, last_agent = result.final_output, result.last_agent.name
+        elif stream_responses:
+            ticket = wait_for_slot()
+            # Render partial text, tool calls and handoffs while the agents work
+            final_output, last_agent = stream_response(input_list, agent)
+        else:
+            ticket = wait_for_slot()
+            with st.spinner("Processing..."):
+                # The budget guardrail runs alongside the agent instead of ahead of it
+                result = runtime.run(run_speculative(
+                    agent,
+                    context= session.context,
+                    input= input_list,  
+                ))
+            final_output, last_agent = result.final_output, result.last_agent.name
+        
+        if response_cache is not None and cached is None and isinstance(input_list, str):
+            response_cache.store(input_list, session.context, final_output, last_agent)
+        
+        # handle the agentresponse with the function created before.
+        response = format_agent_response(final_output)
+        
+        # add the assistant response to the chat history
+        session.chat_history.append(chat_message("assistant", response, output= output_for_history(final_output)))
+        
+    except SchedulerBusy:
+        # Shed under load: a quick answer beats queueing behind a backlog
+        busy = "We're helping a lot of travelers right now. Please try again in a minute."
+        session.chat_history.append(chat_message("assistant", busy, output= busy))
+        
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+        session.chat_history.append(chat_message("assistant", f"An error occurred: {e}", output= f"An error occurred: {e}"))
+    
+    finally:
+        if ticket is not None:
+            runtime.call(scheduler.release, ticket)
+        sessions.save(session)
 
-        # force a rerun to update the chat history
-        st.rerun()
+    observe("request", "chat_turn", time.perf_counter() - turn_started)
+
+    # force a rerun to update the chat history
+    st.rerun()
         
 # Footer
 st.divider()
@@ -0,0 +1,181 @@
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from flight_inventory import normalize_place
+from records import HotelRecord
+
+# -- Hotel inventory --
+
+# Each hotel's amenities are stored as one integer bitmask over a fixed vocabulary, so matching a
+# user's preferences is a bitwise AND plus a popcount over the whole city at once. Hotels are
+# sorted by city and a dict maps each city to its contiguous row slice.
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "hotels.csv")
+
+# Amenity vocabulary, in bit order. The Streamlit sidebar offers exactly this list.
+AMENITIES = ["WiFi", "Pool", "Gym", "Free Breakfast", "Restaurant", "Spa", "Parking", "Fine Dining", "Concierge"]
+
+AMENITY_BITS = {name: 1 << i for i, name in enumerate(AMENITIES)}
+
+
+def amenity_mask(amenities: Iterable[str]) -> int:
+    """Encode amenity names as a bitmask; names outside the vocabulary are ignored."""
+    mask = 0
+    for name in amenities:
+        mask |= AMENITY_BITS.get(name, 0)
+    return mask
+
+
+def amenity_names(mask: int) -> List[str]:
+    """Decode a bitmask back into amenity names, in vocabulary order."""
+    return [name for name, bit in AMENITY_BITS.items() if mask & bit]
+
+
+# Decoded names for every possible mask, shared by all result records
+_AMENITY_TUPLES = [tuple(amenity_names(mask)) for mask in range(1 << len(AMENITIES))]
+
+
+class HotelInventory:
+    """Column-oriented hotel store indexed by city."""
+
+    def __init__(
+        self,
+        city: np.ndarray,
+        price: np.ndarray,
+        amenities: np.ndarray,
+        names: List[str],
+        locations: List[str],
+        cities: List[str],
+    ):
+        order = np.argsort(city, kind="stable")
+        self.city = np.ascontiguousarray(city[order], dtype=np.int32)
+        self.price = np.ascontiguousarray(price[order], dtype=np.float32)
+        self.amenities = np.ascontiguousarray(amenities[order], dtype=np.uint32)
+        self.names = [names[i] for i in order.tolist()]
+        self.locations = [locations[i] for i in order.tolist()]
+
+        self.cities = list(cities)
+        self._city_ids = {normalize_place(name): i for i, name in enumerate(self.cities)}
+        self._index = self._build_index()
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def _build_index(self) -> Dict[int, Tuple[int, int]]:
+        """Map every city id to its [start, stop) row slice."""
+        n = len(self.price)
+        if n == 0:
+            return {}
+        starts = np.concatenate(([0], np.flatnonzero(self.city[1:] != self.city[:-1]) + 1))
+        stops = np.append(starts[1:], n)
+        return dict(zip(self.city[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+
+    # -- Construction --
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str, str, float, List[str]]]) -> "HotelInventory":
+        """Build an inventory from (city, name, location, price_per_night, amenities) rows."""
+        city_ids: Dict[str, int] = {}
+        cities: List[str] = []
+        city, price, amenities, names, locations = [], [], [], [], []
+
+        for city_name, name, location, price_per_night, hotel_amenities in records:
+            key = normalize_place(city_name)
+            if key not in city_ids:
+                city_ids[key] = len(cities)
+                cities.append(city_name)
+            city.append(city_ids[key])
+            price.append(price_per_night)
+            amenities.append(amenity_mask(hotel_amenities))
+            names.append(name)
+            locations.append(location)
+
+        return cls(
+            np.array(city, dtype=np.int32), np.array(price, dtype=np.float32),
+            np.array(amenities, dtype=np.uint32), names, locations, cities,
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "HotelInventory":
+        """Load a CSV fixture whose amenities column is '|'-separated."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_records(
+                (row["city"], row["name"], row["location"], float(row["price_per_night"]),
+                 [a for a in row["amenities"].split("|") if a])
+                for row in csv.DictReader(f)
+            )
+
+    # -- Queries --
+
+    def rank(
+        self,
+        city: str,
+        preferred_amenities: Optional[List[str]] = None,
+        budget_level: Optional[str] = None,
+        max_price: Optional[float] = None,
+        limit: int = 5,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, preference scores) of the top `limit` hotels in a city.
+
+        Hotels are ordered by preference score (descending), then by price: cheapest first
+        unless the budget level is "luxury".
+        """
+        span = self._index.get(self._city_ids.get(normalize_place(city)))
+        if span is None or limit <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+
+        start, stop = span
+        price = self.price[start:stop]
+        rows = np.arange(start, stop)
+        if max_price is not None:
+            keep = price <= max_price
+            rows, price = rows[keep], price[keep]
+
+        scores = np.bitwise_count(self.amenities[rows] & amenity_mask(preferred_amenities or [])).astype(np.int64)
+
+        # Fold (score desc, price) into one sort key; scores are small integers and prices
+        # stay far below the multiplier, so the key orders lexicographically.
+        direction = -1.0 if budget_level == "luxury" else 1.0
+        key = -scores * 1e7 + direction * price.astype(np.float64)
+
+        if len(rows) > limit:
+            top = np.argpartition(key, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(key[top], kind="stable")]
+        return rows[top], scores[top]
+
+    def search(
+        self,
+        city: str,
+        preferred_amenities: Optional[List[str]] = None,
+        budget_level: Optional[str] = None,
+        max_price: Optional[float] = None,
+        limit: int = 5,
+    ) -> List[HotelRecord]:
+        """Rank hotels and return the top `limit` as tool-output records."""
+        rows, scores = self.rank(city, preferred_amenities, budget_level, max_price, limit)
+        preference_mask = amenity_mask(preferred_amenities) if preferred_amenities else None
+        return self._to_records(rows, scores, preference_mask)
+
+    def _to_records(self, rows: np.ndarray, scores: np.ndarray, preference_mask: Optional[int] = None) -> List[HotelRecord]:
+        # Columns are gathered and converted once, rather than indexed scalar by scalar per record
+        hotels = []
+        columns = zip(rows.tolist(), self.price[rows].tolist(), self.amenities[rows].tolist(), scores.tolist())
+        for row, price, amenities, score in columns:
+            hotel = HotelRecord(self.names[row], self.locations[row], round(price, 2), _AMENITY_TUPLES[amenities])
+            if preference_mask is not None:
+                hotel.matching_amenities = _AMENITY_TUPLES[amenities & preference_mask]
+                hotel.preference_score = score
+            hotels.append(hotel)
+        return hotels
+
+
+@lru_cache(maxsize=1)
+def get_hotel_inventory() -> HotelInventory:
+    """Load the process-wide inventory from HOTEL_INVENTORY_PATH or the bundled fixture."""
+    return HotelInventory.from_csv(os.getenv("HOTEL_INVENTORY_PATH", DEFAULT_FIXTURE))
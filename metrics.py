@@ -0,0 +1,367 @@
+import argparse
+import bisect
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# -- Stage latency metrics --
+
+# Logfire only ships spans when a token is present, so offline deployments would see nothing.
+# Every pipeline stage also lands in an in-process latency histogram keyed by (stage, name):
+#
+#     guardrail           budget_guardrail                    output.py
+#     agent               Travel Planner                      whole agent run, from SDK spans
+#     model_turn          Flight Specialist                   one model call of that agent
+#     tool                search_flights                      tool call, from SDK spans
+#     handoff             Travel Planner -> Hotel Specialist  from SDK spans
+#     tool_cache_hit      search_flights                      cache.py
+#     tool_worker         rank_flights                        queue and run time in the worker pool, tool_pool.py
+#     response_cache_hit  Travel Planner                      response_cache.py
+#     route               intent_router                       router.py
+#     request             Flight Specialist                   one batch query by final agent, or a chat_turn in home.py
+#     ui                  format_agent_response               home.py, also render_history
+#
+# METRICS_PORT serves the histograms (and the tool cache counters) in the Prometheus text
+# format on 127.0.0.1; METRICS_JSONL_PATH appends every observation to a file that
+# `python -m metrics report FILE` ranks by the slowest stages.
+
+# Histogram upper bounds in seconds, 0.1 ms to 100 s, five per decade so estimated
+# percentiles stay within about 25% of the exact ones
+BUCKETS = tuple(round(m * 10.0 ** e, 6) for e in range(-4, 2) for m in (1, 1.5, 2.5, 4, 6)) + (100.0,)
+REPORT_ORDER = ("p95", "p50", "p99", "mean", "max", "total", "count")
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus exposes it."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket, like histogram_quantile()."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(BUCKETS):
+                    return self.max
+                lower = BUCKETS[i - 1] if i else 0.0
+                return min(lower + (BUCKETS[i] - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+@dataclass
+class StageSummary:
+    stage: str
+    name: str
+    count: int
+    total: float
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_histogram(cls, stage: str, name: str, histogram: Histogram) -> "StageSummary":
+        return cls(
+            stage, name, histogram.count, histogram.sum, histogram.sum / histogram.count,
+            histogram.quantile(0.5), histogram.quantile(0.95), histogram.quantile(0.99), histogram.max,
+        )
+
+    @classmethod
+    def from_samples(cls, stage: str, name: str, samples: Sequence[float]) -> "StageSummary":
+        ordered = sorted(samples)
+
+        def rank(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        total = sum(ordered)
+        return cls(stage, name, len(ordered), total, total / len(ordered), rank(0.5), rank(0.95), rank(0.99), ordered[-1])
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class StageMetrics:
+    """Latency histograms per (stage, name), plus an optional JSONL log of every observation."""
+
+    def __init__(self, jsonl_path: Optional[str] = None):
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+        self._log = open(jsonl_path, "a", encoding="utf-8", buffering=1) if jsonl_path else None
+
+    def observe(self, stage: str, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get((stage, name))
+            if histogram is None:
+                histogram = self._histograms[(stage, name)] = Histogram()
+            histogram.observe(seconds)
+            if self._log is not None:
+                self._log.write(json.dumps({"time": round(time.time(), 3), "stage": stage, "name": name, "seconds": round(seconds, 6)}) + "\n")
+
+    def summaries(self) -> List[StageSummary]:
+        with self._lock:
+            return [StageSummary.from_histogram(stage, name, h) for (stage, name), h in self._histograms.items()]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Render the histograms in the Prometheus text exposition format."""
+        lines = [
+            "# HELP stage_latency_seconds Latency of each agent pipeline stage",
+            "# TYPE stage_latency_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, name), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{_label(stage)}",name="{_label(name)}"'
+                cumulative = 0
+                for bound, n in zip((*BUCKETS, "+Inf"), histogram.counts):
+                    cumulative += n
+                    lines.append(f'stage_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"stage_latency_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"stage_latency_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        if self._log is not None:
+            self._log.flush()
+
+
+@lru_cache(maxsize=1)
+def get_metrics() -> StageMetrics:
+    return StageMetrics(os.getenv("METRICS_JSONL_PATH"))
+
+
+def observe(stage: str, name: str, seconds: float) -> None:
+    get_metrics().observe(stage, name, seconds)
+
+
+@contextmanager
+def timed(stage: str, name: str, span: bool = False):
+    """Record the enclosed block as one observation; with `span`, also as a logfire span."""
+    started = time.perf_counter()
+    try:
+        if span:
+            import logfire
+
+            with logfire.span("{stage} {name}", stage=stage, name=name):
+                yield
+        else:
+            yield
+    finally:
+        observe(stage, name, time.perf_counter() - started)
+
+
+def instrumented(stage: str, name: Optional[str] = None, span: bool = False):
+    """Decorator form of `timed` for plain and async functions; `name` defaults to the function's."""
+
+    def decorator(func):
+        label = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with timed(stage, label, span):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with timed(stage, label, span):
+                    return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# -- Agents SDK spans --
+
+# StageProcessor implements the SDK's TracingProcessor interface without subclassing it and
+# tells spans apart by their data's `type`, so importing this module does not import the SDK.
+
+class StageProcessor:
+    """Times agent runs, model turns, tool calls and handoffs from the Agents SDK trace spans.
+
+    Guardrail spans are skipped: the speculative, routed and cached paths run guardrails
+    outside Runner, so guardrails are timed where they are defined instead.
+    """
+
+    def __init__(self, metrics: StageMetrics):
+        self._metrics = metrics
+        self._started: Dict[str, float] = {}
+        self._agents: Dict[str, str] = {}  # open agent span id -> agent name
+
+    def on_trace_start(self, trace) -> None:
+        pass
+
+    def on_trace_end(self, trace) -> None:
+        pass
+
+    def on_span_start(self, span) -> None:
+        self._started[span.span_id] = time.perf_counter()
+        if span.span_data.type == "agent":
+            self._agents[span.span_id] = span.span_data.name
+
+    def on_span_end(self, span) -> None:
+        started = self._started.pop(span.span_id, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        data = span.span_data
+        if data.type == "agent":
+            self._agents.pop(span.span_id, None)
+            self._metrics.observe("agent", data.name, elapsed)
+        elif data.type in ("response", "generation"):
+            self._metrics.observe("model_turn", self._agents.get(span.parent_id, "unknown"), elapsed)
+        elif data.type == "function":
+            self._metrics.observe("tool", data.name, elapsed)
+        elif data.type == "handoff":
+            self._metrics.observe("handoff", f"{data.from_agent} -> {data.to_agent}", elapsed)
+
+    def shutdown(self) -> None:
+        self._metrics.flush()
+
+    def force_flush(self) -> None:
+        self._metrics.flush()
+
+
+# -- Export --
+
+# Other modules' Prometheus text (e.g. the tool cache counters), appended to the endpoint
+_collectors: List[Callable[[], str]] = []
+
+
+def register_collector(render: Callable[[], str]) -> None:
+    _collectors.append(render)
+
+
+def render_metrics() -> str:
+    """Everything the metrics endpoint serves."""
+    return "".join([get_metrics().render_prometheus(), *(render() for render in _collectors)])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+@lru_cache(maxsize=1)
+def install_metrics() -> StageMetrics:
+    """Feed the SDK spans into the stage histograms, and serve them when METRICS_PORT is set."""
+    from agents import add_trace_processor
+
+    metrics = get_metrics()
+    add_trace_processor(StageProcessor(metrics))
+    port = os.getenv("METRICS_PORT")
+    if port:
+        serve_metrics(int(port))
+    return metrics
+
+
+@lru_cache(maxsize=1)
+def install_telemetry() -> StageMetrics:
+    """Configure logfire (spans ship only with a token) and the local stage metrics, once.
+
+    Called when the agents are first built (output.py), so processes that never run an
+    agent, or a page rendered before the first question, skip the OpenTelemetry setup.
+    """
+    import logfire
+
+    logfire.configure(send_to_logfire= "if-token-present")
+    logfire.instrument_openai_agents()
+    # Stage latencies are also kept locally, with or without a logfire token
+    return install_metrics()
+
+
+# -- Report --
+
+def format_report(summaries: Sequence[StageSummary], by: str = "p95", limit: Optional[int] = None) -> str:
+    """A table of stages, slowest first."""
+    ranked = sorted(summaries, key=lambda s: getattr(s, by), reverse=True)[:limit]
+    lines = [f"{'stage':<19} {'name':<38} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total s':>9}"]
+    for s in ranked:
+        lines.append(
+            f"{s.stage:<19} {s.name[:38]:<38} {s.count:7d} {s.p50 * 1e3:9.2f} {s.p95 * 1e3:9.2f} "
+            f"{s.p99 * 1e3:9.2f} {s.max * 1e3:9.2f} {s.total:9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def load_jsonl(path: str) -> List[StageSummary]:
+    """Exact per-stage summaries from a METRICS_JSONL_PATH file."""
+    samples: Dict[Tuple[str, str], List[float]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.setdefault((record["stage"], record["name"]), []).append(record["seconds"])
+    return [StageSummary.from_samples(stage, name, values) for (stage, name), values in samples.items()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rank the slowest pipeline stages in a METRICS_JSONL_PATH file.")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("path", nargs="?", default=os.getenv("METRICS_JSONL_PATH"), help="Defaults to METRICS_JSONL_PATH")
+    parser.add_argument("--by", choices=REPORT_ORDER, default="p95", help="Column to rank by")
+    parser.add_argument("-n", "--limit", type=int, default=20)
+    parser.add_argument("--stage", action="append", help="Only these stages (repeatable)")
+    args = parser.parse_args(argv)
+    if not args.path:
+        parser.error("no file given and METRICS_JSONL_PATH is not set")
+
+    summaries = load_jsonl(args.path)
+    if args.stage:
+        summaries = [s for s in summaries if s.stage in args.stage]
+    if not summaries:
+        print("no observations")
+        return 1
+    print(format_report(summaries, args.by, args.limit))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
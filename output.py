@@ -1,22 +1,28 @@
 import asyncio
+import os
 from typing import Optional, List
-from pydantic import BaseModel, Field
-from agents import Agent, RunContextWrapper, Runner, function_tool, ModelSettings, InputGuardrail, GuardrailFunctionOutput, InputGuardrailTripwireTriggered
-from dotenv import load_dotenv
 
+# logfire registers a pydantic plugin, which imports all of logfire when the first model class
+# is defined. Nothing here turns on logfire's pydantic instrumentation, so skip the plugin and
+# leave logfire to install_telemetry (set PYDANTIC_DISABLE_PLUGINS= to load it anyway).
+os.environ.setdefault("PYDANTIC_DISABLE_PLUGINS", "logfire-plugin")
 
-import logfire
+from pydantic import BaseModel, Field
+from dotenv import load_dotenv
 
-from tools import get_weather_forecast, search_flights, search_hotels
 from context import UserContext
-
-import os
+from budget import BudgetAnalysis, MIN_CONFIDENCE, assess_budget
+from metrics import install_telemetry, instrumented
+from registry import get, register
 
 load_dotenv()
 
-# setting up logging using logfire
-logfire.configure(send_to_logfire= "if-token-present")
-logfire.instrument_openai_agents()
+# -- Startup --
+
+# Importing this module is cheap: the structured-output models below only need pydantic. The
+# agents are registered as factories (registry.py) and built the first time one is asked
+# for, `from output import travel_agent` included. Building them imports the Agents SDK and
+# the tools, and sets up logfire and the local stage metrics (metrics.install_telemetry).
 
 model = "gpt-4o-mini"
 
@@ -44,19 +50,24 @@ class TravelPlan(BaseModel):
     activities: List[str] = Field(description="List of recommended activities")
     notes: str = Field(description="Additional notes or recommendations")
     
+class TripPlan(BaseModel):
+    origin: Optional[str] = None
+    destination: str
+    start_date: str
+    end_date: str
+    plan: TravelPlan
+    flight: Optional[FlightRecommendation] = None
+    hotel: Optional[HotelRecommendation] = None
+    weather: List[str] = Field(default_factory=list, description="Forecast for each day of the stay")
+    
 # -- Guardrails Agent output --
 
-class BudgetAnalysis(BaseModel):
-    is_realistic: bool
-    reasoning: str
-    suggested_budget: Optional[float] = None
+# BudgetAnalysis lives in budget.py so the local cost model can produce it too
 
 
-# --- Guardrail Agent ---
+# --- Agent instructions ---
 
-budget_analysis_agent = Agent(
-    name="Budget Analyzer",
-    instructions="""
+BUDGET_ANALYZER_INSTRUCTIONS = """
     You analyze travel budgets to determine if they are realistic for the destination and duration.
     Consider factors like:
     - Average hotel costs in the destination
@@ -68,20 +79,77 @@ budget_analysis_agent = Agent(
     If the budget is not realistic, suggest a more appropriate budget.
     Don't be harsh at all, lean towards it being realistic unless it's really crazy.
     If no budget was mentioned, just assume it is realistic.
-    """,
-    output_type=BudgetAnalysis,
-    model=model
-) 
+    """
+
+FLIGHT_SPECIALIST_INSTRUCTIONS = """
+    You are a flight specialist who helps users find the best flights for their trips.
+    
+    Use the search_flights tool to find flight options, and then provide personalized recommendations
+    based on the user's preferences (price, time, direct vs. connecting).
+    When the user's dates are flexible (e.g. "the cheapest day next week"), call search_fare_calendar
+    once for the whole date range instead of searching each date, then search_flights for the chosen day.
+    Connecting options include their legs and layovers; mention the connection city when you recommend one.
+    
+    Always explain the reasoning behind your recommendations.
+    
+    Format your response in a clear, organized way with flight details and prices.
+    """
+
+HOTEL_SPECIALIST_INSTRUCTIONS = """
+    You are a hotel specialist who helps users find the best accommodations for their trips.
+    
+    Use the search_hotels tool to find hotel options, and then provide personalized recommendations
+    based on the user's preferences (location, price, amenities).
+    
+    Always explain the reasoning behind your recommendations.
+    
+    Format your response in a clear, organized way with hotel details, amenities, and prices.
+    """
+
+TRAVEL_PLANNER_INSTRUCTIONS = """
+    You are a comprehensive travel planning assistant that helps users plan their perfect trip.
+    
+    You can create personalized travel itineraries based on the user's interests and preferences.
+    
+    Always be helpful, informative, and enthusiastic about travel. Provide specific recommendations
+    based on the user's interests and preferences.
+    
+    When creating travel plans, consider:
+    - Local attractions and activities
+    - Budget constraints
+    - Travel duration
+    """
+
+CONVERSATION_INSTRUCTIONS = """
+    You are a trip planning expert who answers basic user questions about their trip and offers any suggestions.
+    Act as a helpful assistant and be helpful in any way you can be.
+    """
 
 # -- Guardrail --
 
+# Its own logfire span too: the speculative, routed and cached paths run it outside Runner's tracing
+@instrumented("guardrail", span=True)
 async def budget_guardrail(ctx, agent, input_data):
     """Check if the user's travel budget is realistic."""
-    # Parse the input to extract destination, duration and budget
+    from agents import GuardrailFunctionOutput, Runner
+    from router import last_user_text
+    
+    # Parse the input to extract destination, duration and budget. Only the latest message
+    # is judged: a budget refused in an earlier turn must not keep blocking the conversation
+    text = last_user_text(input_data)
+    
+    # Judge the budget locally from the numbers in the message (this also covers messages
+    # with no budget at all); only ask the LLM when the local parse is unsure
+    assessment = assess_budget(text)
+    if assessment.confidence >= MIN_CONFIDENCE:
+        return GuardrailFunctionOutput(
+            output_info= assessment.analysis,
+            tripwire_triggered= not assessment.analysis.is_realistic
+        )
     
     try:
-        analysis_prompt = f"The user is planning a trip and said: {input_data}.\nAnalyze if their budget is realistic for a trip to their destination for the length they mentioned."
-        result = await Runner.run(budget_analysis_agent, analysis_prompt, context= ctx.context)
+        analysis_prompt = f"The user is planning a trip and said: {text}.\nAnalyze if their budget is realistic for a trip to their destination for the length they mentioned."
+        result = await Runner.run(get("budget_analysis_agent"), analysis_prompt, context= ctx.context)
         final_output = result.final_output_as(BudgetAnalysis)
         
         if not final_output.is_realistic:
@@ -99,81 +167,144 @@ async def budget_guardrail(ctx, agent, input_data):
             tripwire_triggered= False
         )       
 
-# -- Main agents ---
+# --- Guardrail Agent ---
 
-flight_agent = Agent[UserContext](
-    name= "Flight Specialist",
-    handoff_description= "Specialist agent for finding and recommending flights.",
-    instructions="""
-    You are a flight specialist who helps users find the best flights for their trips.
+@register("budget_analysis_agent")
+def build_budget_analysis_agent():
+    from agents import Agent
     
-    Use the search_flights tool to find flight options, and then provide personalized recommendations
-    based on the user's preferences (price, time, direct vs. connecting).
+    return Agent(
+        name="Budget Analyzer",
+        instructions=BUDGET_ANALYZER_INSTRUCTIONS,
+        output_type=BudgetAnalysis,
+        model=model
+    )
+
+# -- Main agents ---
+
+@register("flight_agent")
+def build_flight_agent():
+    from agents import Agent
+    from tools import search_fare_calendar, search_flights
     
-    Always explain the reasoning behind your recommendations.
+    return Agent[UserContext](
+        name= "Flight Specialist",
+        handoff_description= "Specialist agent for finding and recommending flights.",
+        instructions= FLIGHT_SPECIALIST_INSTRUCTIONS,
+        model= model,
+        tools= [search_flights, search_fare_calendar],
+        output_type= FlightRecommendation
+    )
+
+@register("hotel_agent")
+def build_hotel_agent():
+    from agents import Agent
+    from tools import search_hotels
     
-    Format your response in a clear, organized way with flight details and prices.
-    """,
-    model= model,
-    tools= [search_flights],
-    output_type= FlightRecommendation
-)
+    return Agent[UserContext](
+        name="Hotel Specialist",
+        handoff_description="Specialist agent for finding and recommending hotels and accommodations",
+        instructions=HOTEL_SPECIALIST_INSTRUCTIONS,
+        model=model,
+        tools=[search_hotels],
+        output_type=HotelRecommendation
+    )
 
-hotel_agent = Agent[UserContext](
-    name="Hotel Specialist",
-    handoff_description="Specialist agent for finding and recommending hotels and accommodations",
-    instructions="""
-    You are a hotel specialist who helps users find the best accommodations for their trips.
+@register("travel_agent")
+def build_travel_agent():
+    from agents import Agent, InputGuardrail
+    from tools import get_weather_forecast
     
-    Use the search_hotels tool to find hotel options, and then provide personalized recommendations
-    based on the user's preferences (location, price, amenities).
+    return Agent[UserContext](
+        name= "Travel Planner",
+        instructions= TRAVEL_PLANNER_INSTRUCTIONS,
+        model= model,
+        tools= [get_weather_forecast],
+        handoffs= [get("flight_agent"), get("hotel_agent")],
+        input_guardrails= [InputGuardrail(guardrail_function=budget_guardrail)],
+        output_type= TravelPlan
+    )
+
+@register("conversational_agent")
+def build_conversational_agent():
+    from agents import Agent
     
-    Always explain the reasoning behind your recommendations.
+    return Agent[UserContext](
+        name="General Conversation Specialist",
+        handoff_description="Specialist agent for giving basic responses to the user to carry out a normal conversation as opposed to structured output.",
+        instructions=CONVERSATION_INSTRUCTIONS,
+        model=model
+    )
+
+# -- Fast-path routes --
+
+# Agents the intent router (router.py) may send a query to directly instead of through the
+# Travel Planner. They keep the planner's input guardrails so a routed query is checked the same way.
+@register("fast_routes")
+def build_fast_routes():
+    guardrails = get("travel_agent").input_guardrails
+    return {
+        "flight": get("flight_agent").clone(input_guardrails= guardrails),
+        "hotel": get("hotel_agent").clone(input_guardrails= guardrails),
+        "chat": get("conversational_agent").clone(input_guardrails= guardrails),
+    }
+
+# Whole-trip requests: flights, hotel, weather and activities planned in one concurrent step (trip.py)
+@register("trip_planner")
+def build_trip_planner():
+    from trip import TripOrchestrator
     
-    Format your response in a clear, organized way with hotel details, amenities, and prices.
-    """,
-    model=model,
-    tools=[search_hotels],
-    output_type=HotelRecommendation
-)
+    return TripOrchestrator(get("travel_agent"), get("flight_agent"), get("hotel_agent"), output_type= TripPlan)
 
-travel_agent = Agent[UserContext](
-    name= "Travel Planner",
-    instructions="""
-    You are a comprehensive travel planning assistant that helps users plan their perfect trip.
+@register("agent_graph")
+def build_agent_graph():
+    from replay import replay_from_env
+    from scheduler import rate_limit_from_env
     
-    You can create personalized travel itineraries based on the user's interests and preferences.
+    install_telemetry()
+    fast_routes, trip_planner = get("fast_routes"), get("trip_planner")
+    agent_graph = [
+        get("travel_agent"), get("budget_analysis_agent"), get("conversational_agent"),
+        *fast_routes.values(), *trip_planner.agents,
+    ]
     
-    Always be helpful, informative, and enthusiastic about travel. Provide specific recommendations
-    based on the user's interests and preferences.
+    # Offline runs: with MODEL_REPLAY_PATH set, every model call is answered from recorded responses
+    replay_from_env(agent_graph)
     
-    When creating travel plans, consider:
-    - Local attractions and activities
-    - Budget constraints
-    - Travel duration
-    """,
-    model= model,
-    tools= [get_weather_forecast],
-    handoffs= [flight_agent, hotel_agent],
-    input_guardrails= [InputGuardrail(guardrail_function=budget_guardrail)],
-    output_type= TravelPlan
-)
+    # Provider rate limits (MODEL_RPM, MODEL_TPM) shared by every model call in the process
+    rate_limit_from_env(agent_graph)
+    return agent_graph
 
-conversational_agent = Agent[UserContext](
-    name="General Conversation Specialist",
-    handoff_description="Specialist agent for giving basic responses to the user to carry out a normal conversation as opposed to structured output.",
-    instructions="""
-    You are a trip planning expert who answers basic user questions about their trip and offers any suggestions.
-    Act as a helpful assistant and be helpful in any way you can be.
-    """,
-    model=model
+AGENT_NAMES = (
+    "budget_analysis_agent", "flight_agent", "hotel_agent", "travel_agent", "conversational_agent",
+    "fast_routes", "trip_planner", "agent_graph",
 )
 
+def load(name: str):
+    """A registered agent (or the routes, trip planner or graph); the first call builds the whole graph."""
+    # Built together, so replay and rate limits cover every agent before any of them runs
+    get("agent_graph")
+    return get(name)
+
+def __getattr__(name: str):
+    # Module attributes on demand: `from output import travel_agent` builds the agents then
+    if name in AGENT_NAMES:
+        return load(name)
+    if name == "response_cache":
+        # Whole-run response cache, opt-in via RESPONSE_CACHE_TTL (None when disabled)
+        from response_cache import get_response_cache
+        return get_response_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- Main Function ---
 
 async def main():
+    from batch import run_batch
+    from response_cache import get_response_cache
+    
+    travel_agent, fast_routes, trip_planner = load("travel_agent"), load("fast_routes"), load("trip_planner")
+    
     # create a user context
     user_context = UserContext(
         user_id = "hp9902",
@@ -189,80 +320,109 @@ async def main():
         "I'm planning a trip to Tokyo for a week, looking to spend under $5,000. Suggestions?",
         "I need a flight from New York to Chicago tomorrow",
         "Find me a hotel in Paris with a pool for under $400 per night",
+        "Plan my whole trip from New York to Miami for 5 days with a budget of $3000: flights, hotel and things to do",
         "I want to go to Dubai for a week with only $300"  # This should trigger the budget guardrail
     ]
     
-    for query in queries:
+    # Run every query concurrently, with the budget guardrail checked alongside each run;
+    # obvious flight and hotel queries skip the planner, whole trips are planned in one step.
+    # Results come back in list order
+    results = await run_batch(
+        travel_agent, queries, context=user_context, speculative=True, routes=fast_routes, cache=get_response_cache(),
+        trip=trip_planner,
+    )
+    
+    for result in results:
         print("\n" + "="*50)
-        print(f"QUERY: {query}")
+        print(f"QUERY: {result.query}")
         print("="*50)
         
-        try:
-            result = await Runner.run(travel_agent, query, context=user_context)
-            
-            print("\nFINAL RESPONSE:")
+        if result.guardrail_triggered:
+            print(f"\n🚨 GUARDRAIL TRIGGERED!!!:\n\n {result.guardrail_output}")
+            continue
+        
+        if result.error:
+            print(f"\n⚠️ ERROR: {result.error}")
+            continue
         
-            # Format the output based on the type of response
-            # Format the output based on the type of response
-            if hasattr(result.final_output, "airline"):  # Flight recommendation
-                flight = result.final_output
-                print("\n✈️ FLIGHT RECOMMENDATION ✈️")
-                print(f"Airline: {flight.airline}")
-                print(f"Departure: {flight.departure_time}")
-                print(f"Arrival: {flight.arrival_time}")
-                print(f"Price: ${flight.price}")
-                print(f"Direct Flight: {'Yes' if flight.direct_flight else 'No'}")
-                print(f"\nWhy this flight: {flight.recommendation_reason}")
-                
-                # Show user preferences that influenced this recommendation
-                airlines = user_context.preferred_airlines
-                if airlines and flight.airline in airlines:
-                    print(f"\n👤 NOTE: This matches your preferred airline: {flight.airline}")
-                
-            elif hasattr(result.final_output, "name") and hasattr(result.final_output, "amenities"):  # Hotel recommendation
-                hotel = result.final_output
-                print("\n🏨 HOTEL RECOMMENDATION 🏨")
-                print(f"Name: {hotel.name}")
-                print(f"Location: {hotel.location}")
-                print(f"Price per night: ${hotel.price_per_night}")
-                
-                print("\nAmenities:")
-                for i, amenity in enumerate(hotel.amenities, 1):
-                    print(f"  {i}. {amenity}")
-                
-                # Highlight matching amenities from user preferences
-                preferred_amenities = user_context.hotel_amenities
-                if preferred_amenities:
-                    matching = [a for a in hotel.amenities if a in preferred_amenities]
-                    if matching:
-                        print("\n👤 MATCHING PREFERRED AMENITIES:")
-                        for amenity in matching:
-                            print(f"  ✓ {amenity}")
-                
-                print(f"\nWhy this hotel: {hotel.recommendation_reason}")
-                
-            elif hasattr(result.final_output, "destination"):  # Travel plan
-                travel_plan = result.final_output
-                print(f"\n🌍 TRAVEL PLAN FOR {travel_plan.destination.upper()} 🌍")
-                print(f"Duration: {travel_plan.duration_days} days")
-                print(f"Budget: ${travel_plan.budget}")
-                
-                # Show budget level context
-                budget_level = user_context.budget_level
-                if budget_level:
-                    print(f"Budget Category: {budget_level.title()}")
-                
-                print("\n🎯 RECOMMENDED ACTIVITIES:")
-                for i, activity in enumerate(travel_plan.activities, 1):
-                    print(f"  {i}. {activity}")
-                
-                print(f"\n📝 NOTES: {travel_plan.notes}")
+        print("\nFINAL RESPONSE:")
+    
+        # Format the output based on the type of response
+        if hasattr(result.final_output, "plan"):  # Whole trip
+            trip = result.final_output
+            print(f"\n🧳 TRIP TO {trip.destination.upper()}: {trip.start_date} to {trip.end_date} 🧳")
+            if trip.flight:
+                flight = trip.flight
+                print(f"\n✈️ Flight: {flight.airline} {flight.departure_time}-{flight.arrival_time}, ${flight.price}")
+                print(f"   {flight.recommendation_reason}")
+            if trip.hotel:
+                hotel = trip.hotel
+                print(f"\n🏨 Hotel: {hotel.name} ({hotel.location}), ${hotel.price_per_night} per night")
+                print(f"   {hotel.recommendation_reason}")
+            print("\n🌤️ WEATHER:")
+            for forecast in trip.weather:
+                print(f"  - {forecast}")
+            print("\n🎯 RECOMMENDED ACTIVITIES:")
+            for i, activity in enumerate(trip.plan.activities, 1):
+                print(f"  {i}. {activity}")
+            print(f"\n📝 NOTES: {trip.plan.notes}")
+            
+        elif hasattr(result.final_output, "airline"):  # Flight recommendation
+            flight = result.final_output
+            print("\n✈️ FLIGHT RECOMMENDATION ✈️")
+            print(f"Airline: {flight.airline}")
+            print(f"Departure: {flight.departure_time}")
+            print(f"Arrival: {flight.arrival_time}")
+            print(f"Price: ${flight.price}")
+            print(f"Direct Flight: {'Yes' if flight.direct_flight else 'No'}")
+            print(f"\nWhy this flight: {flight.recommendation_reason}")
+            
+            # Show user preferences that influenced this recommendation
+            airlines = user_context.preferred_airlines
+            if airlines and flight.airline in airlines:
+                print(f"\n👤 NOTE: This matches your preferred airline: {flight.airline}")
+            
+        elif hasattr(result.final_output, "name") and hasattr(result.final_output, "amenities"):  # Hotel recommendation
+            hotel = result.final_output
+            print("\n🏨 HOTEL RECOMMENDATION 🏨")
+            print(f"Name: {hotel.name}")
+            print(f"Location: {hotel.location}")
+            print(f"Price per night: ${hotel.price_per_night}")
+            
+            print("\nAmenities:")
+            for i, amenity in enumerate(hotel.amenities, 1):
+                print(f"  {i}. {amenity}")
+            
+            # Highlight matching amenities from user preferences
+            preferred_amenities = user_context.hotel_amenities
+            if preferred_amenities:
+                matching = [a for a in hotel.amenities if a in preferred_amenities]
+                if matching:
+                    print("\n👤 MATCHING PREFERRED AMENITIES:")
+                    for amenity in matching:
+                        print(f"  ✓ {amenity}")
+            
+            print(f"\nWhy this hotel: {hotel.recommendation_reason}")
+            
+        elif hasattr(result.final_output, "destination"):  # Travel plan
+            travel_plan = result.final_output
+            print(f"\n🌍 TRAVEL PLAN FOR {travel_plan.destination.upper()} 🌍")
+            print(f"Duration: {travel_plan.duration_days} days")
+            print(f"Budget: ${travel_plan.budget}")
+            
+            # Show budget level context
+            budget_level = user_context.budget_level
+            if budget_level:
+                print(f"Budget Category: {budget_level.title()}")
+            
+            print("\n🎯 RECOMMENDED ACTIVITIES:")
+            for i, activity in enumerate(travel_plan.activities, 1):
+                print(f"  {i}. {activity}")
             
-            else:  # Generic response
-                print(result.final_output)
+            print(f"\n📝 NOTES: {travel_plan.notes}")
         
-        except InputGuardrailTripwireTriggered as e:
-            print(f"\n🚨 GUARDRAIL TRIGGERED!!!:\n\n {e}")
+        else:  # Generic response
+            print(result.final_output)
         
 if __name__ == "__main__":
     asyncio.run(main())
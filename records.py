@@ -0,0 +1,205 @@
+import os
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii as _str
+from typing import ClassVar, Iterable, List, Optional, Sequence, Tuple
+
+# -- Tool-output records --
+
+# Search results are slotted dataclasses rather than dicts: fixed-size objects without a
+# per-instance __dict__, built once with every field instead of grown key by key. Each class
+# writes its own JSON from a %-template, which skips json.dumps' per-key dispatch. The text
+# is exactly what json.dumps gave for the old dicts; optional fields are left out when unset.
+# Each class also names its TABLE_COLUMNS and renders a row for the compact format below.
+
+
+def _bool(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _str_list(values: Sequence[str]) -> str:
+    return "[" + ", ".join(map(_str, values)) + "]"
+
+
+@dataclass(slots=True)
+class FlightLeg:
+    origin: str
+    destination: str
+    airline: str
+    departure_time: str
+    arrival_time: str
+    layover: Optional[str] = None  # wait before this leg; None on the first
+
+    def to_json(self) -> str:
+        text = '{"from": %s, "to": %s, "airline": %s, "departure_time": %s, "arrival_time": %s' % (
+            _str(self.origin), _str(self.destination), _str(self.airline),
+            _str(self.departure_time), _str(self.arrival_time),
+        )
+        if self.layover is not None:
+            text += ', "layover": %s' % _str(self.layover)
+        return text + "}"
+
+
+@dataclass(slots=True)
+class FlightRecord:
+    airline: str
+    departure_time: str
+    arrival_time: str
+    price: float
+    direct: bool
+    stops: Optional[int] = None
+    duration: Optional[str] = None
+    legs: Optional[List[FlightLeg]] = None  # only for connections
+    preferred: bool = False
+
+    TABLE_COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "airline", "depart", "arrive", "price_usd", "stops", "duration", "via", "preferred",
+    )
+
+    def to_json(self) -> str:
+        text = '{"airline": %s, "departure_time": %s, "arrival_time": %s, "price": %r, "direct": %s' % (
+            _str(self.airline), _str(self.departure_time), _str(self.arrival_time), self.price, _bool(self.direct),
+        )
+        if self.stops is not None:
+            text += ', "stops": %d' % self.stops
+        if self.duration is not None:
+            text += ', "duration": %s' % _str(self.duration)
+        if self.legs is not None:
+            text += ', "legs": ' + dumps(self.legs)
+        if self.preferred:
+            text += ', "preferred": true'
+        return text + "}"
+
+    def to_row(self) -> List[str]:
+        if self.stops is not None:
+            stops = str(self.stops)
+        else:
+            stops = "0" if self.direct else "1+"
+        # Connection cities with the layover there; the airlines are already in the first column
+        via = ", ".join(f"{leg.origin} {leg.layover}" for leg in self.legs[1:]) if self.legs else ""
+        return [
+            self.airline, self.departure_time, self.arrival_time, f"{self.price:.0f}", stops,
+            self.duration or "", via, "yes" if self.preferred else "",
+        ]
+
+
+@dataclass(slots=True)
+class FareDay:
+    date: str
+    price: float
+    airline: str
+    departure_time: str
+    direct: bool
+    cheapest: bool = False
+
+    TABLE_COLUMNS: ClassVar[Tuple[str, ...]] = ("date", "price_usd", "airline", "depart", "direct", "cheapest")
+
+    def to_json(self) -> str:
+        text = '{"date": %s, "price": %r, "airline": %s, "departure_time": %s, "direct": %s' % (
+            _str(self.date), self.price, _str(self.airline), _str(self.departure_time), _bool(self.direct),
+        )
+        if self.cheapest:
+            text += ', "cheapest": true'
+        return text + "}"
+
+    def to_row(self) -> List[str]:
+        return [
+            self.date, f"{self.price:.0f}", self.airline, self.departure_time,
+            "yes" if self.direct else "no", "yes" if self.cheapest else "",
+        ]
+
+
+@dataclass(slots=True)
+class HotelRecord:
+    name: str
+    location: str
+    price_per_night: float
+    amenities: Sequence[str]
+    matching_amenities: Optional[Sequence[str]] = None  # set when the user has amenity preferences
+    preference_score: Optional[int] = None
+
+    # The score is the number of matching amenities, so the compact table leaves it out
+    TABLE_COLUMNS: ClassVar[Tuple[str, ...]] = ("name", "location", "price_usd", "amenities", "matching")
+
+    def to_json(self) -> str:
+        text = '{"name": %s, "location": %s, "price_per_night": %r, "amenities": %s' % (
+            _str(self.name), _str(self.location), self.price_per_night, _str_list(self.amenities),
+        )
+        if self.matching_amenities is not None:
+            text += ', "matching_amenities": %s' % _str_list(self.matching_amenities)
+        if self.preference_score is not None:
+            text += ', "preference_score": %d' % self.preference_score
+        return text + "}"
+
+    def to_row(self) -> List[str]:
+        return [
+            self.name, self.location, f"{self.price_per_night:.0f}", ", ".join(self.amenities),
+            ", ".join(self.matching_amenities or ()),
+        ]
+
+
+@dataclass(slots=True)
+class WeatherRecord:
+    city: str
+    date: str
+    condition: str
+    temperature: str  # Celsius range, e.g. "15-25"
+
+    TABLE_COLUMNS: ClassVar[Tuple[str, ...]] = ("city", "date", "condition", "temp_c")
+
+    def describe(self) -> str:
+        return (
+            f"The weather in {self.city} on {self.date} is forecasted to be {self.condition} "
+            f"with temperatures around {self.temperature}°C."
+        )
+
+    def to_row(self) -> List[str]:
+        return [self.city, self.date, self.condition, self.temperature]
+
+
+def dumps(records: Iterable) -> str:
+    """Serialize a list of records to the tool-output JSON array."""
+    return "[" + ", ".join([record.to_json() for record in records]) + "]"
+
+
+# -- Compact tables --
+
+# With TOOL_OUTPUT_FORMAT=compact the tools answer with a header row and then one
+# pipe-separated row per result instead of JSON: keys are written once, prices are rounded to
+# whole dollars, columns empty in every row are dropped and ranked results are cut to the top
+# TOOL_OUTPUT_TOP_K. Every tool result is part of the next prompt, so this is paid back on
+# each model call that follows.
+
+COMPACT_TOP_K = 8
+
+
+def compact_output() -> bool:
+    return os.getenv("TOOL_OUTPUT_FORMAT", "").strip().lower() == "compact"
+
+
+def compact_top_k() -> int:
+    return int(os.getenv("TOOL_OUTPUT_TOP_K", COMPACT_TOP_K))
+
+
+def output_variant() -> str:
+    """The configured format as a cache-key part, so cached results never mix formats."""
+    return f"compact-{compact_top_k()}" if compact_output() else "json"
+
+
+def dumps_table(records: Iterable, top_k: Optional[int] = None) -> str:
+    """Serialize records of one type as a header row plus one '|'-separated row each."""
+    records = list(records)[:top_k] if top_k is not None else list(records)
+    if not records:
+        return "no results"
+    columns = records[0].TABLE_COLUMNS
+    rows = [record.to_row() for record in records]
+    keep = [i for i in range(len(columns)) if any(row[i] for row in rows)]
+    lines = ["|".join(columns[i] for i in keep)]
+    lines += ["|".join(row[i].replace("|", "/") for i in keep) for row in rows]
+    return "\n".join(lines)
+
+
+def encode(records: Iterable, ranked: bool = True) -> str:
+    """Tool output in the configured format; only `ranked` results are cut to the top k."""
+    if compact_output():
+        return dumps_table(records, compact_top_k() if ranked else None)
+    return dumps(records)
@@ -0,0 +1,49 @@
+import threading
+from typing import Any, Callable, Dict, List
+
+# -- Agent registry --
+
+# Agents, and the objects built around them, are registered as factories and built on first
+# use instead of at import time. Building them takes microseconds; importing what they need
+# (the OpenAI Agents SDK, logfire and OpenTelemetry) takes over a second, which a Streamlit
+# cold start would otherwise pay before the first page render. `get` builds each name once per
+# process; a factory may `get` other names. Modules keep exposing their agents as attributes
+# through a module-level __getattr__ (output.py), so `from output import travel_agent` works
+# as before and simply builds the agents at that point.
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_built: Dict[str, Any] = {}
+# Reentrant: factories get their dependencies while the lock is held
+_lock = threading.RLock()
+
+
+def register(name: str):
+    """Decorator registering a zero-argument factory that builds `name` on first `get`."""
+
+    def decorator(factory: Callable[[], Any]):
+        _factories[name] = factory
+        return factory
+
+    return decorator
+
+
+def get(name: str) -> Any:
+    """The object registered as `name`, built by its factory the first time it is asked for."""
+    try:
+        return _built[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _built:
+            if name not in _factories:
+                raise KeyError(f"Nothing is registered as {name!r}")
+            _built[name] = _factories[name]()
+        return _built[name]
+
+
+def is_built(name: str) -> bool:
+    return name in _built
+
+
+def registered() -> List[str]:
+    return sorted(_factories)
@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import json
+import os
+import random
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.models.interface import Model
+from agents.tracing import response_span
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import OutputTokensDetails
+
+from history import estimate_tokens
+
+# -- Replay model --
+
+# A stand-in for the OpenAI model that answers from recorded responses, so the agent graph in
+# output.py runs offline: guardrails, handoffs, tools and structured outputs all execute for
+# real and only the model calls are replayed. Recordings are JSONL, one model turn per line:
+#
+#     {"agent": "Flight Specialist", "query": "I need a flight from New York to Chicago tomorrow",
+#      "step": 1, "output": [{"type": "message", "output": {"airline": "OceanAir", ...}}]}
+#
+# `query` is the latest user message ("*" matches any) and `step` counts the agent's earlier
+# turns since it took over the conversation, so a specialist's turns match whether the planner
+# handed off to it or the intent router called it directly. Output items are function calls
+# ({"type": "function_call", "name": "search_flights", "arguments": {...}}), handoffs among
+# them ("transfer_to_flight_specialist"), or messages with a plain `text` or a structured
+# `output`. Every turn waits for an artificial latency that stands in for the provider.
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "model_recordings.jsonl")
+
+ANY_QUERY = "*"
+HANDOFF_PREFIX = "transfer_to_"
+# Characters per text delta when streaming a replayed message
+STREAM_CHUNK = 16
+
+_ids = itertools.count(1)
+
+
+class ReplayMissError(Exception):
+    """No recorded turn matches a model call."""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _message_text(item: dict) -> str:
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content or [] if isinstance(part, dict))
+
+
+def turn_position(input: Union[str, list]) -> Tuple[str, int]:
+    """The latest user message, and how many turns the current agent has taken since then.
+
+    A turn is a run of model output items (function calls or assistant messages) ended by a
+    tool result; a handoff's result means a new agent has taken over, so the count restarts.
+    """
+    if isinstance(input, str):
+        return input, 0
+    query, start = "", 0
+    for i, item in enumerate(input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            query, start = _message_text(item), i + 1
+
+    step, in_turn, handoff_calls = 0, False, set()
+    for item in input[start:]:
+        kind = item.get("type", "message")
+        if kind == "function_call" or (kind == "message" and item.get("role") == "assistant"):
+            if not in_turn:
+                step, in_turn = step + 1, True
+            if kind == "function_call" and item.get("name", "").startswith(HANDOFF_PREFIX):
+                handoff_calls.add(item.get("call_id"))
+        elif kind == "function_call_output":
+            in_turn = False
+            if item.get("call_id") in handoff_calls:
+                step = 0
+    return query, step
+
+
+@dataclass
+class Latency:
+    """Artificial model latency: `base` seconds plus `per_token` per output token, with
+    lognormal `jitter` (relative spread) drawn from a seeded generator."""
+    base: float = 0.0
+    per_token: float = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def sample(self, output_tokens: int) -> float:
+        delay = self.base + self.per_token * output_tokens
+        if self.jitter and delay:
+            delay *= self._rng.lognormvariate(0.0, self.jitter)
+        return delay
+
+
+class Recording:
+    """Recorded model turns, keyed by (agent, normalized query, step)."""
+
+    def __init__(self, turns: Iterable[dict]):
+        self._turns: Dict[Tuple[str, str, int], List[dict]] = {}
+        for turn in turns:
+            query = turn.get("query", ANY_QUERY)
+            key = (turn["agent"], query if query == ANY_QUERY else _normalize(query), int(turn.get("step", 0)))
+            self._turns[key] = turn["output"]
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "Recording":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def queries(self) -> List[str]:
+        """The recorded queries, in recording order."""
+        return list(dict.fromkeys(query for _, query, _ in self._turns if query != ANY_QUERY))
+
+    def lookup(self, agent: str, query: str, step: int) -> List[dict]:
+        output = self._turns.get((agent, _normalize(query), step))
+        if output is None:
+            output = self._turns.get((agent, ANY_QUERY, step))
+        if output is None:
+            raise ReplayMissError(f"No recorded turn {step} for {agent!r} on {query!r}")
+        return output
+
+
+def _output_item(item: dict):
+    n = next(_ids)
+    if item["type"] == "function_call":
+        arguments = item.get("arguments", {})
+        return ResponseFunctionToolCall(
+            id=f"fc_replay_{n}", call_id=f"call_replay_{n}", name=item["name"], type="function_call",
+            arguments=arguments if isinstance(arguments, str) else json.dumps(arguments), status="completed",
+        )
+    text = item["text"] if "text" in item else json.dumps(item["output"])
+    return ResponseOutputMessage(
+        id=f"msg_replay_{n}", role="assistant", status="completed", type="message",
+        content=[ResponseOutputText(annotations=[], text=text, type="output_text")],
+    )
+
+
+class ReplayModel(Model):
+    """Model for one agent that answers from a Recording after an artificial latency."""
+
+    def __init__(self, agent_name: str, recording: Recording, latency: Optional[Latency] = None):
+        self.agent_name = agent_name
+        self.recording = recording
+        self.latency = latency or Latency()
+
+    async def _respond(self, system_instructions, input) -> Tuple[list, Usage]:
+        query, step = turn_position(input)
+        output = [_output_item(item) for item in self.recording.lookup(self.agent_name, query, step)]
+        input_tokens = estimate_tokens((system_instructions or "") + json.dumps(input, default=str))
+        output_tokens = sum(estimate_tokens(item.model_dump_json()) for item in output)
+        await asyncio.sleep(self.latency.sample(output_tokens))
+        usage = Usage(requests=1, input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens)
+        return output, usage
+
+    # Turns are wrapped in response spans like the OpenAI model's, so they are traced and timed the same way
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing) -> ModelResponse:
+        with response_span(disabled=tracing.is_disabled()):
+            output, usage = await self._respond(system_instructions, input)
+        return ModelResponse(output=output, usage=usage, referenceable_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing) -> AsyncIterator:
+        with response_span(disabled=tracing.is_disabled()):
+            output, usage = await self._respond(system_instructions, input)
+        response = Response(
+            id=f"resp_replay_{next(_ids)}", created_at=0, model="replay", object="response", output=[],
+            parallel_tool_calls=False, tool_choice="auto", tools=[],
+        )
+        yield ResponseCreatedEvent(response=response, type="response.created")
+        for index, item in enumerate(output):
+            if isinstance(item, ResponseOutputMessage):
+                text = item.content[0].text
+                for start in range(0, len(text), STREAM_CHUNK):
+                    yield ResponseTextDeltaEvent(
+                        content_index=0, delta=text[start:start + STREAM_CHUNK], item_id=item.id,
+                        output_index=index, type="response.output_text.delta",
+                    )
+        response.output = output
+        response.usage = ResponseUsage(
+            input_tokens=usage.input_tokens, output_tokens=usage.output_tokens, total_tokens=usage.total_tokens,
+            output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+        )
+        yield ResponseCompletedEvent(response=response, type="response.completed")
+
+
+def use_replay_model(agents: Iterable[Agent], recording: Recording, latency: Optional[Latency] = None) -> List[Agent]:
+    """Point `agents` and every agent reachable through their handoffs at the recording."""
+    seen: Dict[int, Agent] = {}
+    pending = list(agents)
+    while pending:
+        agent = pending.pop()
+        if id(agent) in seen:
+            continue
+        seen[id(agent)] = agent
+        agent.model = ReplayModel(agent.name, recording, latency)
+        pending.extend(h for h in agent.handoffs if isinstance(h, Agent))
+    return list(seen.values())
+
+
+def replay_from_env(agents: Iterable[Agent]) -> bool:
+    """Replay model calls when MODEL_REPLAY_PATH is set ('default' for the bundled recording)."""
+    path = os.getenv("MODEL_REPLAY_PATH")
+    if not path:
+        return False
+    latency = Latency(
+        base=float(os.getenv("MODEL_REPLAY_LATENCY", 0.0)),
+        jitter=float(os.getenv("MODEL_REPLAY_JITTER", 0.0)),
+    )
+    use_replay_model(agents, Recording.from_jsonl(DEFAULT_RECORDING if path == "default" else path), latency)
+    return True
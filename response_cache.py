@@ -0,0 +1,389 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+import numpy as np
+from agents import Agent, InputGuardrailTripwireTriggered, RunContextWrapper, Runner
+from agents.result import RunResult
+from pydantic import BaseModel
+
+from budget import extract_budget_signals, get_cost_table
+from cache import CacheStats, NotifyingTTLCache
+from flight_inventory import parse_travel_date
+from hotel_inventory import AMENITIES
+from metrics import observe
+from router import get_router
+
+# -- Response cache --
+
+# Opt-in cache of whole agent runs. A query is reduced to a signature of what decides the
+# answer: routed intent, the origin and destination, every city mentioned (in order), the travel date resolved to a
+# calendar day, trip length, budget amounts bucketed on a 10% log scale, counts (party size,
+# stars, nights, rooms, stops), amenities and
+# qualifier words (weekdays, "cheapest", "direct"...), plus the preference fields of
+# UserContext. The remaining content words complete the exact key. With a similarity
+# threshold set, a query whose signature matches a cached one but whose wording differs can
+# still hit, when the two texts' hashed n-gram embeddings are close enough. Similarity never
+# crosses signatures, so a different city or budget is always a miss. Outputs are stored as
+# model_dump() and validated back into their pydantic type on a hit (entries live in process
+# memory, so the class itself is kept). The agent's input guardrails still run on every hit.
+#
+# Only single-turn inputs are cached; answers that depend on earlier turns are not keyed.
+# Enable it with RESPONSE_CACHE_TTL (seconds), and optionally RESPONSE_CACHE_SIZE and
+# RESPONSE_CACHE_SIMILARITY (cosine threshold, e.g. 0.8).
+
+DEFAULT_TTL = 3600
+DEFAULT_MAXSIZE = 2048
+BUCKET_RATIO = 1.1
+EMBEDDING_DIM = 512
+
+PREFERENCE_FIELDS = ("preferred_airlines", "hotel_amenities", "budget_level")
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_RELATIVE_DAY = re.compile(r"\b(today|tonight|tomorrow)\b", re.IGNORECASE)
+# Time and preference words that change the answer; they go in the signature, not the content
+_QUALIFIER_WORDS = {
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "weekend",
+    "morning", "afternoon", "evening", "night", "overnight", "january", "february", "march",
+    "april", "may", "june", "july", "august", "september", "october", "november", "december",
+    "spring", "summer", "autumn", "fall", "winter", "next", "this", "cheap", "cheapest", "luxury",
+    "direct", "nonstop",
+}
+_COUNT_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10,
+}
+_COUNT_UNITS = {
+    "adult": "party", "people": "party", "person": "party", "guest": "party", "traveler": "party",
+    "traveller": "party", "kid": "children", "child": "children", "children": "children",
+    "star": "stars", "night": "nights", "room": "rooms", "stop": "stops",
+}
+_COUNT = re.compile(
+    r"\b(?P<count>\d+|" + "|".join(_COUNT_WORDS) + r")[\s-]*"
+    r"(?P<unit>adult|people|person|guest|travell?er|kid|child(?:ren)?|star|night|room|stop)s?\b",
+    re.IGNORECASE,
+)
+_STOPWORDS = {
+    "a", "an", "the", "i", "i'm", "me", "my", "we", "our", "you", "your", "to", "from", "for", "in",
+    "on", "at", "of", "with", "and", "or", "is", "are", "be", "it", "that", "this", "there", "what",
+    "can", "could", "would", "please", "need", "want", "like", "looking", "some", "any", "do",
+    "should", "get", "find", "show", "give", "help", "about", "under", "budget", "only", "have",
+    "days", "day", "nights", "night", "week", "weeks", "per", "usd", "dollars", "there", "trip",
+    "planning", "plan", "going", "go", "travel", "visit", "suggestions", "ideas", "recommend", "i'd",
+}
+
+
+def _bucket(amount: Optional[float]) -> Optional[int]:
+    return None if not amount else int(round(math.log(amount, BUCKET_RATIO)))
+
+
+@dataclass(frozen=True)
+class QuerySignature:
+    intent: str
+    origin: Optional[str]
+    destination: Optional[str]
+    cities: Tuple[str, ...]
+    date: Optional[str]
+    days: Optional[int]
+    budget: Optional[int]
+    nightly: Optional[int]
+    counts: Tuple[Tuple[str, int], ...]
+    amenities: Tuple[str, ...]
+    qualifiers: Tuple[str, ...]
+    preferences: Tuple[Tuple[str, Any], ...]
+
+    def digest(self) -> str:
+        return hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _counts(text: str) -> Tuple[Tuple[str, int], ...]:
+    """Counts that are not money, summed per kind: ("party", 2), ("stars", 4)..."""
+    counts: Dict[str, int] = {}
+    for match in _COUNT.finditer(text):
+        count = match.group("count").lower()
+        kind = _COUNT_UNITS[match.group("unit").lower()]
+        counts[kind] = counts.get(kind, 0) + (int(count) if count.isdigit() else _COUNT_WORDS[count])
+    return tuple(sorted(counts.items()))
+
+
+def _preferences(context: Any) -> Tuple[Tuple[str, Any], ...]:
+    values = []
+    for name in PREFERENCE_FIELDS:
+        value = getattr(context, name, None)
+        values.append((name, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value))
+    return tuple(values)
+
+
+def canonicalize(text: str, context: Any = None) -> Tuple[QuerySignature, str]:
+    """Reduce a query to its signature and the content words left over."""
+    lowered = text.lower()
+    words = _WORD.findall(lowered)
+    table = get_cost_table()
+    cities = table.find_cities(text)
+    # "from" and "to" are stopwords, so the direction of travel is kept as roles here
+    origin, destination = table.find_origin(text), table.find_destination(text)
+    signals = extract_budget_signals(text)
+
+    date = _ISO_DATE.search(text) or _RELATIVE_DAY.search(text)
+    if date:
+        try:
+            date = parse_travel_date(date.group(0).lower().replace("tonight", "today")).isoformat()
+        except ValueError:
+            date = date.group(0)
+
+    signature = QuerySignature(
+        intent=get_router().route(text).model_intent,
+        origin=origin.city if origin else None,
+        destination=destination.city if destination else None,
+        cities=tuple(cities),
+        date=date,
+        days=signals.days,
+        budget=_bucket(signals.budget),
+        nightly=_bucket(max(signals.nightly_amounts, default=None)),
+        counts=_counts(text),
+        amenities=tuple(a for a in AMENITIES if a.lower() in lowered),
+        qualifiers=tuple(sorted(set(words) & _QUALIFIER_WORDS)),
+        preferences=_preferences(context),
+    )
+    city_words = set(_WORD.findall(" ".join(cities).lower()))
+    content = sorted(set(words) - _STOPWORDS - _QUALIFIER_WORDS - city_words)
+    return signature, " ".join(content)
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Unit-length hashed embedding of a text's words and character trigrams."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.split():
+        vector[zlib.crc32(word.encode("utf-8")) % dim] += 2.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class CacheEntry:
+    """A cached final output and where it came from."""
+    key: str
+    signature: str
+    content: str
+    output_type: Optional[Type[BaseModel]]
+    payload: Any
+    query: str
+    agent: str
+    user_id: Optional[str]
+    created_at: float
+    hits: int = 0
+    embedding: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def provenance(self) -> dict:
+        return {
+            "query": self.query,
+            "agent": self.agent,
+            "user_id": self.user_id,
+            "created_at": self.created_at,
+            "hits": self.hits,
+        }
+
+
+@dataclass
+class CacheHit:
+    entry: CacheEntry
+    similarity: float
+    final_output: Any
+
+
+@dataclass
+class CachedRunResult(RunResult):
+    """A RunResult served from the response cache."""
+    cache_hit: Optional[CacheHit] = None
+
+
+def single_turn_text(input: Union[str, list]) -> Optional[str]:
+    """The query text when `input` is a single user message, otherwise None."""
+    if isinstance(input, str):
+        return input
+    if len(input) == 1 and isinstance(input[0], dict) and input[0].get("role") == "user":
+        content = input[0].get("content")
+        return content if isinstance(content, str) else None
+    return None
+
+
+class ResponseCache:
+    """TTL + LRU cache of final outputs keyed on a canonicalized query and user preferences."""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        maxsize: int = DEFAULT_MAXSIZE,
+        similarity_threshold: Optional[float] = None,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.stats = CacheStats()
+        self._entries = NotifyingTTLCache(maxsize, ttl, self._on_remove)
+        self._by_signature: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _on_remove(self, key: str, entry: CacheEntry, expired: bool):
+        # Runs inside _entries operations, so under self._lock
+        if not expired:
+            self.stats.evictions += 1
+        keys = self._by_signature.get(entry.signature)
+        if keys is not None and key in keys:
+            keys.remove(key)
+            if not keys:
+                del self._by_signature[entry.signature]
+
+    @staticmethod
+    def _restore(entry: CacheEntry) -> Any:
+        if entry.output_type is None:
+            return entry.payload
+        return entry.output_type.model_validate(entry.payload)
+
+    def lookup(self, text: str, context: Any = None) -> Optional[CacheHit]:
+        signature, content = canonicalize(text, context)
+        digest = signature.digest()
+        key = hashlib.sha256(f"{digest}\n{content}".encode("utf-8")).hexdigest()
+        with self._lock:
+            entry, similarity = self._entries.get(key), 1.0
+            if entry is None and self.similarity_threshold is not None:
+                entry, similarity = self._nearest(digest, content)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            entry.hits += 1
+            self.stats.hits += 1
+        return CacheHit(entry, similarity, self._restore(entry))
+
+    def _nearest(self, digest: str, content: str) -> Tuple[Optional[CacheEntry], float]:
+        # Keys leave the index as their entries are evicted or expire (_on_remove); an entry
+        # past its TTL stays in both until the cache next purges, so it is skipped here
+        keys = [k for k in self._by_signature.get(digest, []) if k in self._entries]
+        if not keys:
+            return None, 0.0
+        query = embed(content)
+        best, best_score = None, self.similarity_threshold
+        for k in keys:
+            entry = self._entries[k]
+            score = float(query @ entry.embedding)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best, best_score
+
+    def store(self, text: str, context: Any, final_output: Any, agent: str) -> Optional[CacheEntry]:
+        """Cache a final output; outputs that cannot be rebuilt later are skipped."""
+        if isinstance(final_output, BaseModel):
+            output_type, payload = type(final_output), final_output.model_dump()
+        elif isinstance(final_output, str):
+            output_type, payload = None, final_output
+        else:
+            return None
+        signature, content = canonicalize(text, context)
+        digest = signature.digest()
+        key = hashlib.sha256(f"{digest}\n{content}".encode("utf-8")).hexdigest()
+        entry = CacheEntry(
+            key=key, signature=digest, content=content, output_type=output_type, payload=payload,
+            query=text, agent=agent, user_id=getattr(context, "user_id", None), created_at=time.time(),
+            embedding=embed(content),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            keys = self._by_signature.setdefault(digest, [])
+            if key not in keys:
+                keys.append(key)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_signature.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._entries.expire()
+            return len(self._entries)
+
+
+async def check_input_guardrails(agent: Agent, input: Union[str, list], context: Any = None) -> list:
+    """Run the agent's input guardrails, raising InputGuardrailTripwireTriggered on a trip."""
+    wrapper = RunContextWrapper(context=context)
+    results = []
+    for guardrail in agent.input_guardrails:
+        result = await guardrail.run(agent, input, wrapper)
+        if result.output.tripwire_triggered:
+            raise InputGuardrailTripwireTriggered(result)
+        results.append(result)
+    return results
+
+
+def _find_agent(root: Agent, name: str) -> Agent:
+    seen, stack = set(), [root]
+    while stack:
+        agent = stack.pop()
+        if agent.name == name:
+            return agent
+        seen.add(id(agent))
+        stack.extend(h for h in agent.handoffs if isinstance(h, Agent) and id(h) not in seen)
+    return root
+
+
+async def fetch_cached(cache: ResponseCache, agent: Agent, input: Union[str, list], context: Any = None) -> Optional[CachedRunResult]:
+    """Serve `input` from the cache once the agent's input guardrails pass, or return None."""
+    started = time.perf_counter()
+    text = single_turn_text(input)
+    hit = cache.lookup(text, context) if text is not None else None
+    if hit is None:
+        return None
+    guardrail_results = await check_input_guardrails(agent, input, context)
+    observe("response_cache_hit", agent.name, time.perf_counter() - started)
+    return CachedRunResult(
+        input=input, new_items=[], raw_responses=[], final_output=hit.final_output,
+        input_guardrail_results=guardrail_results, output_guardrail_results=[],
+        _last_agent=_find_agent(agent, hit.entry.agent), cache_hit=hit,
+    )
+
+
+async def run_cached(
+    cache: Optional[ResponseCache],
+    agent: Agent,
+    input: Union[str, list],
+    context: Any = None,
+    runner=Runner.run,
+    **kwargs,
+) -> RunResult:
+    """Serve a single-turn query from the cache, or run it with `runner` and cache the output."""
+    if cache is None:
+        return await runner(agent, input, context=context, **kwargs)
+    cached = await fetch_cached(cache, agent, input, context)
+    if cached is not None:
+        return cached
+    result = await runner(agent, input, context=context, **kwargs)
+    text = single_turn_text(input)
+    if text is not None:
+        cache.store(text, context, result.final_output, result.last_agent.name)
+    return result
+
+
+_shared: Optional[ResponseCache] = None
+
+
+def get_response_cache(force: bool = False) -> Optional[ResponseCache]:
+    """The process-wide response cache; None unless RESPONSE_CACHE_TTL is set or `force`."""
+    global _shared
+    if _shared is None and (force or os.getenv("RESPONSE_CACHE_TTL")):
+        similarity = os.getenv("RESPONSE_CACHE_SIMILARITY")
+        _shared = ResponseCache(
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", DEFAULT_TTL)),
+            maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", DEFAULT_MAXSIZE)),
+            similarity_threshold=float(similarity) if similarity else None,
+        )
+    return _shared
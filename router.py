@@ -0,0 +1,251 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from agents import Agent, InputGuardrailTripwireTriggered, RunContextWrapper, Runner
+from agents.result import RunResult
+
+from budget import get_cost_table
+from flight_inventory import find_travel_date
+from metrics import instrumented
+from tools import weather_forecast
+
+# -- Intent routing --
+
+# The Travel Planner's first LLM turn is often just a decision to hand off to the flight or
+# hotel specialist. This router makes that decision locally: keyword rules plus a multinomial
+# naive Bayes model trained on a labeled corpus (data/intent_queries.tsv) when first used.
+# Confident flight, hotel and chit-chat queries go straight to their agent, weather questions
+# are answered by calling the weather tool directly, and anything else goes to the planner.
+
+INTENTS = ("flight", "hotel", "weather", "chat", "plan")
+FALLBACK_INTENT = "plan"
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_queries.tsv")
+
+# Route away from the planner only at or above this confidence
+ROUTE_THRESHOLD = 0.8
+
+# Confidence when the rules and the model agree
+RULE_AGREEMENT_CONFIDENCE = 0.95
+
+_RULES = {
+    "flight": re.compile(
+        r"\b(?:flights?|fly|flying|airlines?|airfare|plane|nonstop|layovers?|red-eye|departures?)\b", re.IGNORECASE
+    ),
+    "hotel": re.compile(
+        r"\b(?:hotels?|hostels?|motels?|resorts?|accommodation|lodging|rooms?|place to stay|where (?:should|can) i stay|stay in)\b",
+        re.IGNORECASE,
+    ),
+    "weather": re.compile(
+        r"\b(?:weather|forecast|temperature|rain(?:ing|y)?|snow(?:ing)?|sunny|cloudy|humid|windy|storms?|degrees|umbrella)\b",
+        re.IGNORECASE,
+    ),
+    "chat": re.compile(r"^\s*(?:hi|hello|hey|thanks|thank you|good (?:morning|evening)|bye|ok|okay|cool|great|perfect)\b", re.IGNORECASE),
+    "plan": re.compile(
+        r"\b(?:itinerary|plan(?:ning)?|things to do|what should i (?:do|see)|vacation|holiday|getaway|activities)\b",
+        re.IGNORECASE,
+    ),
+}
+
+_TOKEN = re.compile(r"[$€£]?\d[\d,.]*|[a-z]+(?:'[a-z]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words plus bigrams; numbers collapse to <num>, currency amounts to <money>."""
+    words = []
+    for token in _TOKEN.findall(text.lower()):
+        if token[0] in "$€£":
+            words.append("<money>")
+        elif token[0].isdigit():
+            words.append("<num>")
+        else:
+            words.append(token)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes with Laplace smoothing over tokenize() features."""
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.log_prior: Dict[str, float] = {}
+        self.log_likelihood: Dict[str, Dict[str, float]] = {}
+        self.log_unseen: Dict[str, float] = {}
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> "NaiveBayes":
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        labels = Counter()
+        for label, text in examples:
+            labels[label] += 1
+            counts[label].update(tokenize(text))
+        vocabulary = set().union(*counts.values())
+        total = sum(labels.values())
+        for label, n in labels.items():
+            denominator = sum(counts[label].values()) + self.alpha * (len(vocabulary) + 1)
+            self.log_prior[label] = math.log(n / total)
+            self.log_likelihood[label] = {
+                token: math.log((c + self.alpha) / denominator) for token, c in counts[label].items()
+            }
+            self.log_unseen[label] = math.log(self.alpha / denominator)
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        tokens = tokenize(text)
+        scores = {}
+        for label, prior in self.log_prior.items():
+            likelihood, unseen = self.log_likelihood[label], self.log_unseen[label]
+            scores[label] = prior + sum(likelihood.get(t, unseen) for t in tokens)
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        norm = sum(exp.values())
+        return {label: v / norm for label, v in exp.items()}
+
+
+def load_corpus(path: str = DEFAULT_CORPUS) -> List[Tuple[str, str]]:
+    """Read (label, query) pairs from a tab-separated file."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                label, text = line.rstrip("\n").split("\t", 1)
+                examples.append((label, text))
+    return examples
+
+
+@dataclass
+class Route:
+    intent: str
+    confidence: float
+    source: str
+    model_intent: Optional[str] = None
+
+    @property
+    def is_fallback(self) -> bool:
+        return self.intent == FALLBACK_INTENT
+
+
+class IntentRouter:
+    """Combine the keyword rules with the naive Bayes model into one routing decision."""
+
+    def __init__(self, model: NaiveBayes, threshold: float = ROUTE_THRESHOLD):
+        self.model = model
+        self.threshold = threshold
+
+    @instrumented("route", "intent_router")
+    def route(self, text: str) -> Route:
+        probabilities = self.model.predict_proba(text)
+        model_intent = max(probabilities, key=probabilities.get)
+        confidence = probabilities[model_intent]
+        hits = {intent for intent, rule in _RULES.items() if rule.search(text)}
+        specialist_hits = hits - {"chat", FALLBACK_INTENT}
+
+        # Several specialists, or a specialist plus planning cues, is a job for the planner
+        if len(specialist_hits) > 1 or (specialist_hits and FALLBACK_INTENT in hits):
+            return Route(FALLBACK_INTENT, 1.0, "rules", model_intent)
+        if specialist_hits and model_intent not in specialist_hits:
+            return Route(FALLBACK_INTENT, confidence, "disagreement", model_intent)
+
+        source = "model"
+        if model_intent in hits:
+            confidence = max(confidence, RULE_AGREEMENT_CONFIDENCE)
+            source = "rules+model"
+        if model_intent != FALLBACK_INTENT and confidence < self.threshold:
+            return Route(FALLBACK_INTENT, confidence, "low-confidence", model_intent)
+        # Weather answers skip the model entirely, so they need a weather keyword and a city
+        if model_intent == "weather" and ("weather" not in hits or weather_request(text) is None):
+            return Route(FALLBACK_INTENT, confidence, "no-keyword-or-city", model_intent)
+        return Route(model_intent, confidence, source, model_intent)
+
+
+@lru_cache(maxsize=1)
+def get_router() -> IntentRouter:
+    """The shared router, trained on the corpus at INTENT_CORPUS_PATH (or the bundled one)."""
+    return IntentRouter(NaiveBayes().fit(load_corpus(os.getenv("INTENT_CORPUS_PATH", DEFAULT_CORPUS))))
+
+
+# -- Direct weather answers --
+
+_PLACE_AFTER = re.compile(r"\b(?:in|for|at|to)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)")
+
+
+def weather_request(text: str) -> Optional[Tuple[str, str]]:
+    """Pull (city, YYYY-MM-DD date) out of a weather question.
+
+    None when no city is found, or when the date can't be pinned to one day ("in March",
+    "next week"): the planner answers those. A question with no date at all is about today.
+    """
+    city = get_cost_table().find_destination(text)
+    if city is not None:
+        name = city.city
+    else:
+        match = _PLACE_AFTER.search(text)
+        if match is None:
+            return None
+        name = match.group(1)
+    try:
+        day = find_travel_date(text) or date.today()
+    except ValueError:
+        return None
+    return name, day.isoformat()
+
+
+def last_user_text(input: Union[str, list]) -> str:
+    """The latest user message of an agent input."""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user" and isinstance(item.get("content"), str):
+            return item["content"]
+    return ""
+
+
+async def answer_weather(text: str) -> Optional[str]:
+    """Answer a weather question from the weather tool's forecast, without a model call."""
+    request = weather_request(text)
+    if request is None:
+        return None
+    city, date = request
+    # Always the sentence form: this answer goes to the user, not back to a model
+    return await weather_forecast(city, date)
+
+
+def select_agent(route: Route, planner: Agent, routes: Dict[str, Agent]) -> Agent:
+    """The agent a route runs on; the planner when the intent has no direct agent."""
+    return routes.get(route.intent, planner)
+
+
+async def run_routed(
+    planner: Agent,
+    routes: Dict[str, Agent],
+    input: Union[str, list],
+    context: Any = None,
+    runner=Runner.run,
+    router: Optional[IntentRouter] = None,
+    **kwargs,
+) -> RunResult:
+    """Route the latest user message and run it, falling back to the planner.
+
+    Weather questions get a RunResult whose final output is the weather tool's answer, after
+    the planner's input guardrails have passed.
+    """
+    route = (router or get_router()).route(last_user_text(input))
+    if route.intent == "weather":
+        wrapper = RunContextWrapper(context=context)
+        guardrail_results = []
+        for guardrail in planner.input_guardrails:
+            result = await guardrail.run(planner, input, wrapper)
+            if result.output.tripwire_triggered:
+                raise InputGuardrailTripwireTriggered(result)
+            guardrail_results.append(result)
+        answer = await answer_weather(last_user_text(input))
+        return RunResult(
+            input=input, new_items=[], raw_responses=[], final_output=answer,
+            input_guardrail_results=guardrail_results, output_guardrail_results=[], _last_agent=planner,
+        )
+    return await runner(select_agent(route, planner, routes), input, context=context, **kwargs)
@@ -0,0 +1,94 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+# -- Agent runtime --
+
+# A single event loop running in a daemon thread for the whole server process. Streamlit reruns
+# the script on every interaction, and `asyncio.run` per turn would build and tear down a loop
+# each time, dropping the pooled HTTP connections the OpenAI and weather clients keep per loop.
+# Coroutines are submitted to the long-lived loop with run_coroutine_threadsafe instead.
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class AgentRuntime:
+    """Long-lived event loop thread that runs agent coroutines for synchronous callers."""
+
+    def __init__(self, name: str = "agent-runtime"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Schedule a coroutine on the runtime loop and return a thread-safe future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the runtime loop and block the calling thread for its result."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def call(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a plain function on the runtime loop and block for its result.
+
+        For state owned by the loop, such as the scheduler's queues, that must not be touched
+        from other threads.
+        """
+        future: "concurrent.futures.Future[T]" = concurrent.futures.Future()
+
+        def run():
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(run)
+        return future.result()
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Drive an async generator on the runtime loop and yield its items in this thread.
+
+        UI code (e.g. Streamlit placeholders) must run in the caller's thread, so items are
+        handed over through a queue instead of being rendered from the loop thread.
+        """
+        items: "queue.Queue[Any]" = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            except BaseException as e:
+                # Re-raised in the consuming thread
+                items.put(e)
+            finally:
+                items.put(_DONE)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,352 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Union
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.models.interface import Model
+from agents.models.openai_provider import OpenAIProvider
+
+from history import estimate_tokens
+from metrics import observe, register_collector
+
+# -- Agent run scheduler --
+
+# Every Streamlit session shares one process, one event loop (runtime.py) and one provider
+# rate limit. Sessions take a slot from the AdmissionScheduler before running an agent: at
+# most `max_running` runs at once and `max_running_per_user` for any one user; the rest wait
+# in per-user FIFO queues served round-robin, so one user firing off several questions
+# cannot push everyone else back. When the queue is full, or the user already has
+# `max_queued_per_user` questions waiting, the turn is shed straight away with SchedulerBusy
+# instead of waiting behind a backlog it would time out in. A waiting session is told its
+# place in line as it changes.
+#
+# Below the scheduler, every model call also passes a RateLimiter: token buckets sized to
+# the provider's requests- and tokens-per-minute limits (MODEL_RPM, MODEL_TPM). A call
+# reserves its estimated tokens up front and settles with the real usage afterwards, so
+# bursts queue here instead of coming back from the provider as 429s.
+
+DEFAULT_MAX_RUNNING = 8
+DEFAULT_MAX_RUNNING_PER_USER = 2
+DEFAULT_MAX_QUEUED = 32
+DEFAULT_MAX_QUEUED_PER_USER = 2
+# Output tokens reserved for a model call whose settings do not cap them
+DEFAULT_OUTPUT_TOKENS = 512
+
+
+class SchedulerBusy(Exception):
+    """The run was shed: the queue is full or the user already has enough runs waiting."""
+
+
+class Ticket:
+    """One run's place with the scheduler."""
+
+    __slots__ = ("user_id", "enqueued", "admitted", "released", "changed")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.enqueued = time.perf_counter()
+        self.admitted = False
+        self.released = False
+        self.changed = asyncio.Event()
+
+
+class AdmissionScheduler:
+    """Bounded, per-user fair admission of agent runs. Use it from one event loop."""
+
+    def __init__(
+        self,
+        max_running: int = DEFAULT_MAX_RUNNING,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        max_queued_per_user: int = DEFAULT_MAX_QUEUED_PER_USER,
+        max_running_per_user: int = DEFAULT_MAX_RUNNING_PER_USER,
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.max_running_per_user = max_running_per_user
+        self.running = 0
+        self._running_by_user: Dict[str, int] = {}
+        self.queued = 0
+        self.admitted_total = 0
+        self.shed_total = 0
+        # Users with waiting runs, in round-robin order
+        self._queues: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+
+    def enqueue(self, user_id: str) -> Ticket:
+        """Take a slot, or a place in line; raises SchedulerBusy when the run is shed."""
+        ticket = Ticket(user_id)
+        waiting = self._queues.get(user_id)
+        # After every dispatch, a free slot means nobody waiting can use it, so this run may start now
+        starts_now = (
+            self.running < self.max_running and not waiting
+            and self._running_by_user.get(user_id, 0) < self.max_running_per_user
+        )
+        if not starts_now and (self.queued >= self.max_queued or (waiting and len(waiting) >= self.max_queued_per_user)):
+            self.shed_total += 1
+            raise SchedulerBusy(f"{self.running} runs in progress and {self.queued} waiting")
+        if waiting is None:
+            waiting = self._queues[user_id] = deque()
+        waiting.append(ticket)
+        self.queued += 1
+        self._dispatch()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """Place in line (1 is next), or 0 once admitted. Users held back by their own running
+        runs are counted as if they were not, so this is an upper bound."""
+        if ticket.admitted or ticket.released:
+            return 0
+        own = self._queues[ticket.user_id]
+        k = own.index(ticket)
+        ahead = k
+        before_user = True
+        for user_id, waiting in self._queues.items():
+            if user_id == ticket.user_id:
+                before_user = False
+            else:
+                # Users earlier in the rotation are served once more before this ticket's round
+                ahead += min(len(waiting), k + before_user)
+        return ahead + 1
+
+    async def wait(self, ticket: Ticket) -> AsyncIterator[int]:
+        """Yield the ticket's place in line each time it changes, until it is admitted."""
+        last = None
+        while True:
+            # Cleared before looking, so a change made while the caller handles a place is not missed
+            ticket.changed.clear()
+            if ticket.admitted or ticket.released:
+                return
+            place = self.position(ticket)
+            if place != last:
+                last = place
+                yield place
+            await ticket.changed.wait()
+
+    def release(self, ticket: Ticket) -> None:
+        """Give back a slot (or leave the line) and admit the next waiting run."""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self.running -= 1
+            self._running_by_user[ticket.user_id] -= 1
+            if not self._running_by_user[ticket.user_id]:
+                del self._running_by_user[ticket.user_id]
+        else:
+            waiting = self._queues.get(ticket.user_id)
+            if waiting and ticket in waiting:
+                waiting.remove(ticket)
+                self.queued -= 1
+                if not waiting:
+                    del self._queues[ticket.user_id]
+        self._dispatch()
+
+    def _admit(self, ticket: Ticket) -> None:
+        ticket.admitted = True
+        self.running += 1
+        self._running_by_user[ticket.user_id] = self._running_by_user.get(ticket.user_id, 0) + 1
+        self.admitted_total += 1
+        observe("queue_wait", "scheduler", time.perf_counter() - ticket.enqueued)
+        ticket.changed.set()
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_running:
+            # The next user in the rotation who is not already at their own limit
+            user_id = next(
+                (u for u in self._queues if self._running_by_user.get(u, 0) < self.max_running_per_user), None
+            )
+            if user_id is None:
+                break
+            waiting = self._queues[user_id]
+            self.queued -= 1
+            self._admit(waiting.popleft())
+            if waiting:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+        # Everyone still waiting has moved up
+        for waiting in self._queues.values():
+            for queued_ticket in waiting:
+                queued_ticket.changed.set()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str):
+        """Hold a run slot for the body of the block."""
+        ticket = self.enqueue(user_id)
+        try:
+            async for _ in self.wait(ticket):
+                pass
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def render_prometheus(self) -> str:
+        return (
+            "# HELP scheduler_running Agent runs holding a slot\n"
+            "# TYPE scheduler_running gauge\n"
+            f"scheduler_running {self.running}\n"
+            "# HELP scheduler_queued Agent runs waiting for a slot\n"
+            "# TYPE scheduler_queued gauge\n"
+            f"scheduler_queued {self.queued}\n"
+            "# HELP scheduler_admitted_total Agent runs admitted\n"
+            "# TYPE scheduler_admitted_total counter\n"
+            f"scheduler_admitted_total {self.admitted_total}\n"
+            "# HELP scheduler_shed_total Agent runs turned away as busy\n"
+            "# TYPE scheduler_shed_total counter\n"
+            f"scheduler_shed_total {self.shed_total}\n"
+        )
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> AdmissionScheduler:
+    """The process-wide scheduler, sized by the AGENT_MAX_* settings."""
+    scheduler = AdmissionScheduler(
+        max_running=int(os.getenv("AGENT_MAX_RUNNING", DEFAULT_MAX_RUNNING)),
+        max_queued=int(os.getenv("AGENT_MAX_QUEUED", DEFAULT_MAX_QUEUED)),
+        max_queued_per_user=int(os.getenv("AGENT_MAX_QUEUED_PER_USER", DEFAULT_MAX_QUEUED_PER_USER)),
+        max_running_per_user=int(os.getenv("AGENT_MAX_RUNNING_PER_USER", DEFAULT_MAX_RUNNING_PER_USER)),
+    )
+    register_collector(scheduler.render_prometheus)
+    return scheduler
+
+
+# -- Provider rate limits --
+
+# Providers enforce per-minute limits over short slices (a 600 RPM limit may act as 10 per
+# second), so a bucket holds at most this many seconds' worth instead of a whole minute
+BURST_SECONDS = 1.0
+
+
+class TokenBucket:
+    """Refills at `per_minute` units a minute, holding up to BURST_SECONDS' worth; the level
+    may go negative when a reservation is settled for more than was taken."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` (capped at the capacity) is available."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """Requests- and tokens-per-minute buckets shared by every model call in the process."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and `tokens` tokens fit, then reserve them. Callers go first come, first served."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                delay = max(
+                    self.requests.delay(1) if self.requests else 0.0,
+                    self.tokens.delay(tokens) if self.tokens else 0.0,
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Return an over-estimate to the token bucket, or charge the shortfall."""
+        if self.tokens:
+            self.tokens.take(used - reserved)
+
+
+def _estimate_call_tokens(system_instructions, input, model_settings) -> int:
+    text = (system_instructions or "") + (input if isinstance(input, str) else json.dumps(input, default=str))
+    return estimate_tokens(text) + (model_settings.max_tokens or DEFAULT_OUTPUT_TOKENS)
+
+
+class RateLimitedModel(Model):
+    """Passes each model call through a RateLimiter before handing it to the wrapped model."""
+
+    _provider: Optional[OpenAIProvider] = None
+
+    def __init__(self, agent_name: str, model: Union[Model, str, None], limiter: RateLimiter):
+        self.agent_name = agent_name
+        self._model = model
+        self.limiter = limiter
+
+    @property
+    def model(self) -> Model:
+        # Model names are resolved on first use, as Runner would, so no API key is needed to import
+        if not isinstance(self._model, Model):
+            if RateLimitedModel._provider is None:
+                RateLimitedModel._provider = OpenAIProvider()
+            self._model = RateLimitedModel._provider.get_model(self._model)
+        return self._model
+
+    async def _reserve(self, system_instructions, input, model_settings) -> int:
+        reserved = _estimate_call_tokens(system_instructions, input, model_settings)
+        started = time.perf_counter()
+        await self.limiter.acquire(reserved)
+        observe("rate_limit_wait", self.agent_name, time.perf_counter() - started)
+        return reserved
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing) -> ModelResponse:
+        reserved = await self._reserve(system_instructions, input, model_settings)
+        response = await self.model.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing)
+        self.limiter.settle(reserved, response.usage.total_tokens)
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing) -> AsyncIterator:
+        reserved = await self._reserve(system_instructions, input, model_settings)
+        used = reserved
+        async for event in self.model.stream_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing):
+            if event.type == "response.completed" and event.response.usage:
+                used = event.response.usage.total_tokens
+            yield event
+        self.limiter.settle(reserved, used)
+
+
+def use_rate_limiter(agents: Iterable[Agent], limiter: RateLimiter) -> List[Agent]:
+    """Route the model calls of `agents`, and every agent reachable through their handoffs, through `limiter`."""
+    seen: Dict[int, Agent] = {}
+    pending = list(agents)
+    while pending:
+        agent = pending.pop()
+        if id(agent) in seen:
+            continue
+        seen[id(agent)] = agent
+        if not isinstance(agent.model, RateLimitedModel):
+            agent.model = RateLimitedModel(agent.name, agent.model, limiter)
+        pending.extend(h for h in agent.handoffs if isinstance(h, Agent))
+    return list(seen.values())
+
+
+def rate_limit_from_env(agents: Iterable[Agent]) -> Optional[RateLimiter]:
+    """Apply MODEL_RPM / MODEL_TPM (either may be left out); None when neither is set."""
+    rpm, tpm = os.getenv("MODEL_RPM"), os.getenv("MODEL_TPM")
+    if not rpm and not tpm:
+        return None
+    limiter = RateLimiter(float(rpm) if rpm else None, float(tpm) if tpm else None)
+    use_rate_limiter(agents, limiter)
+    return limiter
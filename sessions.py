@@ -0,0 +1,330 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from context import UserContext
+
+# -- Session store --
+
+# A session is one conversation: the UserContext and the chat_history, keyed by (user_id,
+# thread_id). Streamlit's st.session_state only lasts as long as the browser tab's connection
+# to one server process. Here sessions live in a backend that outlasts the process instead:
+# a SQLite file in WAL mode, so several replicas on the same volume read it while one writes.
+# Saves go to a write-behind buffer that a background thread commits in one transaction
+# every FLUSH_INTERVAL seconds; repeated saves of a session in between become one row write.
+#
+# In front of the backend sits an LRU of live sessions. Sessions idle for SESSION_IDLE_TTL
+# seconds, or pushed out by SESSION_CACHE_SIZE newer ones, are dropped from memory and
+# rehydrated from the backend on their next request. Each save bumps a version; a cached
+# session is checked against the stored version before it is served, so when another replica
+# has saved the session since, the newer copy is loaded.
+
+DEFAULT_PATH = "sessions.sqlite3"
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_IDLE_TTL = 30 * 60
+
+FLUSH_INTERVAL = 0.05   # seconds a save may wait before it is committed
+FLUSH_BATCH = 512       # pending sessions that trigger a commit straight away
+
+# (user_id, thread_id, version, updated_at, context JSON, chat_history JSON)
+Row = Tuple[str, str, int, float, str, str]
+
+
+@dataclass
+class Session:
+    user_id: str
+    thread_id: str
+    context: UserContext
+    chat_history: List[Dict[str, Any]] = field(default_factory=list)
+    version: int = 0
+    updated_at: float = 0.0
+
+
+def _to_row(session: Session) -> Row:
+    # Spelled out rather than dataclasses.asdict, which deep-copies every field on each save
+    context = {
+        "user_id": session.context.user_id,
+        "preferred_airlines": session.context.preferred_airlines,
+        "hotel_amenities": session.context.hotel_amenities,
+        "budget_level": session.context.budget_level,
+        "session_start": session.context.session_start.isoformat(),
+    }
+    return (
+        session.user_id, session.thread_id, session.version, session.updated_at,
+        json.dumps(context), json.dumps(session.chat_history, default=str),
+    )
+
+
+def _from_row(row: Row) -> Session:
+    user_id, thread_id, version, updated_at, context, chat_history = row
+    context = json.loads(context)
+    context["session_start"] = datetime.fromisoformat(context["session_start"])
+    return Session(user_id, thread_id, UserContext(**context), json.loads(chat_history), version, updated_at)
+
+
+class MemorySessionBackend:
+    """Session rows in a dict: one process only, gone on restart."""
+
+    def __init__(self):
+        self._rows: Dict[Tuple[str, str], Row] = {}
+        self._lock = threading.Lock()
+
+    def read(self, user_id: str, thread_id: str) -> Optional[Row]:
+        with self._lock:
+            return self._rows.get((user_id, thread_id))
+
+    def version(self, user_id: str, thread_id: str) -> Optional[int]:
+        row = self.read(user_id, thread_id)
+        return row[2] if row else None
+
+    def write(self, row: Row) -> None:
+        with self._lock:
+            self._rows[row[0], row[1]] = row
+
+    def latest_thread(self, user_id: str) -> Optional[str]:
+        with self._lock:
+            rows = [row for (user, _), row in self._rows.items() if user == user_id]
+        return max(rows, key=lambda row: row[3])[1] if rows else None
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+
+class SQLiteSessionBackend:
+    """Session rows in a SQLite file (WAL), written in batches by a background thread."""
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL, batch_size: int = FLUSH_BATCH):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()  # guards the writer connection
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only risks the last commits on power loss, never corruption
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        # The small columns come first: a version check reads them without touching the
+        # overflow pages that hold a long chat_history
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                user_id TEXT NOT NULL,
+                thread_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                context TEXT NOT NULL,
+                chat_history TEXT NOT NULL,
+                PRIMARY KEY (user_id, thread_id)
+            )"""
+        )
+        # Reads go through their own connection, so in WAL mode they never wait for a commit
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+        # Saves not yet committed, and the batch being committed, are read before the file
+        self._pending: Dict[Tuple[str, str], Row] = {}
+        self._writing: Dict[Tuple[str, str], Row] = {}
+        self._changed = threading.Condition()
+        self._flushing = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_behind, name="session-writer", daemon=True)
+        self._writer.start()
+
+    def _buffered(self, key: Tuple[str, str]) -> Optional[Row]:
+        with self._changed:
+            return self._pending.get(key) or self._writing.get(key)
+
+    def read(self, user_id: str, thread_id: str) -> Optional[Row]:
+        row = self._buffered((user_id, thread_id))
+        if row is not None:
+            return row
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT * FROM sessions WHERE user_id = ? AND thread_id = ?", (user_id, thread_id)
+            ).fetchone()
+
+    def version(self, user_id: str, thread_id: str) -> Optional[int]:
+        row = self._buffered((user_id, thread_id))
+        if row is not None:
+            return row[2]
+        with self._read_lock:
+            found = self._reader.execute(
+                "SELECT version FROM sessions WHERE user_id = ? AND thread_id = ?", (user_id, thread_id)
+            ).fetchone()
+        return found[0] if found else None
+
+    def write(self, row: Row) -> None:
+        with self._changed:
+            self._pending[row[0], row[1]] = row
+            if len(self._pending) >= self.batch_size:
+                self._changed.notify()
+
+    def latest_thread(self, user_id: str) -> Optional[str]:
+        with self._changed:
+            buffered = [row for row in (*self._writing.values(), *self._pending.values()) if row[0] == user_id]
+        with self._read_lock:
+            stored = self._reader.execute(
+                "SELECT * FROM sessions WHERE user_id = ? ORDER BY updated_at DESC LIMIT 1", (user_id,)
+            ).fetchone()
+        rows = buffered + ([stored] if stored else [])
+        return max(rows, key=lambda row: row[3])[1] if rows else None
+
+    def flush(self) -> None:
+        """Commit every pending save now, in one transaction."""
+        with self._flushing:
+            with self._changed:
+                self._writing, self._pending = self._pending, {}
+            if not self._writing:
+                return
+            try:
+                with self._lock:
+                    self._conn.execute("BEGIN")
+                    # An older copy never replaces a newer one another replica committed
+                    self._conn.executemany(
+                        """INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (user_id, thread_id) DO UPDATE SET
+                            context = excluded.context, chat_history = excluded.chat_history,
+                            version = excluded.version, updated_at = excluded.updated_at
+                        WHERE excluded.version >= sessions.version""",
+                        list(self._writing.values()),
+                    )
+                    self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                # e.g. the file stayed locked past busy_timeout: keep the batch for the next round
+                with self._lock:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                with self._changed:
+                    self._pending = {**self._writing, **self._pending}
+                    self._writing = {}
+                raise
+            with self._changed:
+                self._writing = {}
+
+    def _write_behind(self) -> None:
+        while not self._closed:
+            with self._changed:
+                self._changed.wait(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def close(self) -> None:
+        self._closed = True
+        with self._changed:
+            self._changed.notify()
+        self._writer.join()
+        self.flush()
+        self._reader.close()
+        self._conn.close()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._read_lock:
+            (count,) = self._reader.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return count
+
+
+@dataclass
+class SessionStats:
+    hits: int = 0
+    loads: int = 0
+    stale: int = 0  # cached copies replaced by a newer one from the backend
+
+
+class SessionStore:
+    """LRU of live sessions in front of a backend; idle sessions leave memory and reload on demand."""
+
+    def __init__(self, backend, maxsize: int = DEFAULT_CACHE_SIZE, idle_ttl: float = DEFAULT_IDLE_TTL):
+        self.backend = backend
+        self.stats = SessionStats()
+        self._cache: TTLCache = TTLCache(maxsize, idle_ttl)
+        self._lock = threading.Lock()
+
+    def _remember(self, session: Session) -> None:
+        # Setting the entry again restarts its idle timer
+        with self._lock:
+            self._cache[session.user_id, session.thread_id] = session
+
+    def get(self, user_id: str, thread_id: str) -> Optional[Session]:
+        """The stored session, from memory unless the backend has a newer version; None if unknown."""
+        with self._lock:
+            session = self._cache.get((user_id, thread_id))
+        if session is not None:
+            stored = self.backend.version(user_id, thread_id)
+            if stored is None or stored <= session.version:
+                self.stats.hits += 1
+                self._remember(session)
+                return session
+            self.stats.stale += 1
+
+        row = self.backend.read(user_id, thread_id)
+        if row is None:
+            return None
+        self.stats.loads += 1
+        session = _from_row(row)
+        self._remember(session)
+        return session
+
+    def open(self, user_id: str, thread_id: Optional[str] = None) -> Session:
+        """The user's session for `thread_id`, or their latest one; a new session when there is none."""
+        thread_id = thread_id or self.backend.latest_thread(user_id)
+        session = self.get(user_id, thread_id) if thread_id else None
+        if session is None:
+            session = Session(user_id, thread_id or str(uuid.uuid4()), UserContext(user_id= user_id))
+            self.save(session)
+        return session
+
+    def new_thread(self, session: Session) -> Session:
+        """Start a new conversation for the same user, keeping their preferences."""
+        context = UserContext(
+            user_id= session.user_id,
+            preferred_airlines= list(session.context.preferred_airlines),
+            hotel_amenities= list(session.context.hotel_amenities),
+            budget_level= session.context.budget_level,
+        )
+        thread = Session(session.user_id, str(uuid.uuid4()), context)
+        self.save(thread)
+        return thread
+
+    def save(self, session: Session) -> None:
+        """Record changes made to the session's context or chat_history."""
+        session.version += 1
+        session.updated_at = time.time()
+        self._remember(session)
+        self.backend.write(_to_row(session))
+
+    def __len__(self) -> int:
+        """Sessions held in memory right now."""
+        with self._lock:
+            self._cache.expire()
+            return len(self._cache)
+
+
+@lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    """The process-wide store: SQLite at SESSION_STORE_PATH ('memory' keeps sessions in this process only)."""
+    path = os.getenv("SESSION_STORE_PATH", DEFAULT_PATH)
+    backend = MemorySessionBackend() if path == "memory" else SQLiteSessionBackend(path)
+    atexit.register(backend.close)
+    return SessionStore(
+        backend,
+        maxsize= int(os.getenv("SESSION_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+        idle_ttl= float(os.getenv("SESSION_IDLE_TTL", DEFAULT_IDLE_TTL)),
+    )
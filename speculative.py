@@ -0,0 +1,52 @@
+import asyncio
+import copy
+from typing import Any, List, Union
+
+from agents import Agent, InputGuardrailTripwireTriggered, RunContextWrapper, Runner
+from agents.guardrail import InputGuardrailResult
+from agents.result import RunResult
+
+# -- Speculative guardrails --
+
+# Runner.run only lets the first turn overlap with the input guardrails; any handoff waits for
+# the guardrail verdict. Here the agent runs with its input guardrails stripped while the
+# guardrails run next to it. A tripped guardrail cancels the agent run and raises the usual
+# InputGuardrailTripwireTriggered; otherwise the result is released once both are done.
+# The tools are read-only searches, so work thrown away on a trip has no side effects.
+
+
+async def run_speculative(
+    agent: Agent,
+    input: Union[str, list],
+    context: Any = None,
+    **kwargs,
+) -> RunResult:
+    """Run `agent` and its input guardrails concurrently instead of guardrails-first."""
+    guardrails = list(agent.input_guardrails)
+    if not guardrails:
+        return await Runner.run(agent, input, context=context, **kwargs)
+
+    main_run = asyncio.create_task(
+        Runner.run(agent.clone(input_guardrails=[]), input, context=context, **kwargs)
+    )
+    wrapper = RunContextWrapper(context=context)
+    checks = [
+        asyncio.create_task(guardrail.run(agent, copy.deepcopy(input), wrapper))
+        for guardrail in guardrails
+    ]
+
+    guardrail_results: List[InputGuardrailResult] = []
+    try:
+        for next_check in asyncio.as_completed(checks):
+            result = await next_check
+            guardrail_results.append(result)
+            if result.output.tripwire_triggered:
+                raise InputGuardrailTripwireTriggered(result)
+        run = await main_run
+    finally:
+        for task in (main_run, *checks):
+            if not task.done():
+                task.cancel()
+
+    run.input_guardrail_results = guardrail_results
+    return run
@@ -0,0 +1,190 @@
+import asyncio
+import copy
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Union, get_origin
+
+from agents import Agent, InputGuardrailTripwireTriggered, RunContextWrapper, Runner
+from agents.result import RunResultStreaming
+from agents.stream_events import AgentUpdatedStreamEvent, RawResponsesStreamEvent, RunItemStreamEvent
+
+# -- Streaming runs --
+
+# Wraps Runner.run_streamed into a sequence of UI-friendly updates: progress messages for tool
+# calls and handoffs, the text streamed so far and, for agents with a structured output type,
+# the fields parsed out of the partial JSON. As in speculative.py, input guardrails run next to
+# the stream rather than inside it: the SDK cancels them once the stream ends, so their verdict
+# could otherwise be lost. The run's events are read by a task of our own; cancelling it is how
+# the run is stopped early, since stream_events cancels the run's background tasks when the
+# task reading it is cancelled.
+
+TOOL_STATUS = {
+    "search_flights": "Searching flights…",
+    "search_hotels": "Searching hotels…",
+    "get_weather_forecast": "Checking the weather…",
+}
+
+
+@dataclass
+class StreamUpdate:
+    agent: str
+    status: Optional[str] = None
+    text: str = ""
+    partial_output: Optional[Dict[str, Any]] = None
+    output_type: Any = None
+    final_output: Any = None
+    done: bool = False
+    statuses: List[str] = field(default_factory=list)
+
+
+def parse_partial_json(text: str) -> Optional[Union[dict, list]]:
+    """Parse the longest usable prefix of a JSON document that is still being streamed."""
+    stack: List[str] = []
+    in_string = escaped = False
+    cut_points = []  # (index of each comma, closers needed at that point)
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            cut_points.append((i, "".join(reversed(stack))))
+
+    if not stack and not in_string:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    # First try closing the open string and containers as they are, then fall back to
+    # dropping everything after the most recent comma (a half-written key or literal).
+    head = text[:-1] if escaped else text
+    candidates = [head + ('"' if in_string else "") + "".join(reversed(stack))]
+    candidates += [text[:i] + closers for i, closers in reversed(cut_points)]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def with_all_fields(output_type: Any, partial: Dict[str, Any]) -> Dict[str, Any]:
+    """Pad a partial structured output with empty values for the fields not streamed yet."""
+    empty = {
+        name: [] if get_origin(info.annotation) is list else ""
+        for name, info in getattr(output_type, "model_fields", {}).items()
+    }
+    return {**empty, **partial}
+
+
+def _status_for(event: RunItemStreamEvent) -> Optional[str]:
+    if event.name == "tool_called":
+        name = getattr(event.item.raw_item, "name", None)
+        return TOOL_STATUS.get(name, f"Running {name}…")
+    if event.name == "handoff_occured":
+        return f"Handed off to {event.item.target_agent.name}"
+    return None
+
+
+def _tripped_guardrail(checks: List[asyncio.Task]):
+    for check in checks:
+        if check.done() and not check.cancelled() and check.exception() is None:
+            result = check.result()
+            if result.output.tripwire_triggered:
+                return result
+    return None
+
+
+# Put on the event queue once the run's events are exhausted
+_DONE = object()
+
+
+async def _read_events(agent: Agent, input: Union[str, list], events: asyncio.Queue, **kwargs) -> RunResultStreaming:
+    """Start a streamed run and move its events into `events`, then _DONE."""
+    # Started in this task, so the run's trace is opened and closed in the same context
+    run = Runner.run_streamed(agent, input, **kwargs)
+    try:
+        async for event in run.stream_events():
+            events.put_nowait(event)
+    finally:
+        events.put_nowait(_DONE)
+    return run
+
+
+async def stream_agent(agent: Agent, input: Union[str, list], context: Any = None, **kwargs) -> AsyncIterator[StreamUpdate]:
+    """Run `agent` in streaming mode and yield a StreamUpdate after every meaningful event.
+
+    The last update has `done=True` and carries the final output. A tripped input guardrail
+    stops the stream and raises InputGuardrailTripwireTriggered.
+    """
+    guardrails = list(agent.input_guardrails)
+    wrapper = RunContextWrapper(context=context)
+    checks = [asyncio.create_task(g.run(agent, copy.deepcopy(input), wrapper)) for g in guardrails]
+    events: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.create_task(_read_events(
+        agent.clone(input_guardrails=[]) if guardrails else agent, input, events, context=context, **kwargs
+    ))
+
+    current = agent
+    text = ""
+    statuses: List[str] = []
+    try:
+        while (event := await events.get()) is not _DONE:
+            tripped = _tripped_guardrail(checks)
+            if tripped:
+                raise InputGuardrailTripwireTriggered(tripped)
+
+            status = None
+            if isinstance(event, AgentUpdatedStreamEvent):
+                current = event.new_agent
+                text = ""
+            elif isinstance(event, RunItemStreamEvent):
+                status = _status_for(event)
+                if status is None:
+                    continue
+                statuses.append(status)
+            elif isinstance(event, RawResponsesStreamEvent):
+                if event.data.type == "response.created":
+                    text = ""
+                    continue
+                if event.data.type != "response.output_text.delta":
+                    continue
+                text += event.data.delta
+
+            partial = None
+            if current.output_type not in (None, str) and text:
+                parsed = parse_partial_json(text)
+                partial = parsed if isinstance(parsed, dict) else None
+            yield StreamUpdate(
+                agent=current.name, status=status, text=text, partial_output=partial,
+                output_type=current.output_type, statuses=list(statuses),
+            )
+
+        # Errors from the run (max turns, model errors) surface here
+        run = await reader
+
+        # The stream is done; hold the final answer until every guardrail has passed
+        for next_check in asyncio.as_completed(checks):
+            result = await next_check
+            if result.output.tripwire_triggered:
+                raise InputGuardrailTripwireTriggered(result)
+    finally:
+        for task in (reader, *checks):
+            if not task.done():
+                task.cancel()
+
+    yield StreamUpdate(
+        agent=run.last_agent.name, text=text, final_output=run.final_output, done=True, statuses=list(statuses),
+    )
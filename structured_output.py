@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 from agents import Agent, Runner
 from dotenv import load_dotenv
 from tools import get_weather_forecast
+from batch import run_batch
 import os
 
 load_dotenv()
@@ -51,11 +52,16 @@ async def main():
         "I want to visit Tokyo for a week with a budget of $3000. What activities do you recommend based on the weather and how will the weather be?"
     ]
     
-    for query in queries:
+    # Run every query concurrently; results come back in the order of the list
+    results = await run_batch(travel_agent, queries)
+    
+    for result in results:
         print("\n" + "="*50)
-        print(f"QUERY: {query}")
+        print(f"QUERY: {result.query}")
         
-        result = await Runner.run(travel_agent, query)
+        if result.error:
+            print(f"\n⚠️ ERROR: {result.error}")
+            continue
         
         print("\nFINAL RESPONSE:")
         travel_plan = result.final_output
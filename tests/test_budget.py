@@ -0,0 +1,78 @@
+import pytest
+
+from budget import MIN_CONFIDENCE, assess_budget, extract_budget_signals
+
+
+@pytest.mark.parametrize("text", [
+    "I want to spend 5 days in Paris",
+    "Spend 10 days in Rome",
+    "flights to Miami for 7 days with max 1 stop",
+    "hotel in London for 3 nights under 4 stars",
+])
+def test_counts_after_a_keyword_are_not_budgets(text):
+    assert not extract_budget_signals(text).mentions_budget
+    assessment = assess_budget(text)
+    assert assessment.analysis.is_realistic
+    assert assessment.budget is None
+
+
+def test_bare_keyword_amount_falls_back_to_the_llm():
+    assessment = assess_budget("A week in Dubai with only 300")
+    assert assessment.budget == 300
+    assert assessment.confidence < MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text, budget", [
+    ("I want to go to Dubai for a week with only $300", 300),
+    ("Honeymoon in the Maldives for 6 days, budget 10k", 10_000),
+    ("Tokyo for a week, looking to spend under $5,000", 5_000),
+])
+def test_marked_amounts_are_judged_locally(text, budget):
+    assessment = assess_budget(text)
+    assert assessment.budget == budget
+    assert assessment.confidence >= MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "New York City for a week on $1,000",
+    "Backpacking Lisbon for 8 days on 700 euros",
+    "Hotel in Tokyo under 60 dollars a night",
+])
+def test_borderline_budgets_go_to_the_llm(text):
+    assessment = assess_budget(text)
+    assert assessment.analysis.is_realistic
+    assert assessment.confidence < MIN_CONFIDENCE
+
+
+def test_absurd_budgets_are_blocked_locally():
+    assessment = assess_budget("I want to go to Dubai for a week with only $300")
+    assert not assessment.analysis.is_realistic
+    assert assessment.confidence >= MIN_CONFIDENCE
+
+
+def test_flights_left_out_of_the_estimate_when_excluded():
+    included = assess_budget("Paris for 5 days on $800")
+    excluded = assess_budget("Paris for 5 days on $800 excluding flights")
+    assert excluded.estimate < included.estimate
+    assert excluded.analysis.is_realistic and excluded.confidence >= MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "Tokyo for a week with ¥50000",
+    "Tokyo for a week with 50000 yen",
+    "Paris for 5 days on €300",
+    "London for 4 days, budget £200",
+])
+def test_other_currencies_go_to_the_llm(text):
+    assert assess_budget(text).confidence < MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text, days", [
+    ("Rome, $200 a night, 5 days", 5),
+    ("Paris for 3 nights at 150 dollars a night", 3),
+    ("A week in Bali, 10 days if we can, $2,000", 10),
+    ("A week in Dubai with $3,000", 7),
+    ("whole trip to New York from Chicago under $150 a night", None),
+])
+def test_rates_are_not_durations(text, days):
+    assert extract_budget_signals(text).days == days
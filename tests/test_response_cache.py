@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from context import UserContext
+from response_cache import ResponseCache
+
+
+def test_signature_index_shrinks_with_evictions():
+    cache = ResponseCache(ttl=60, maxsize=4)
+    context = UserContext(user_id="test")
+    for city in ["Paris", "Tokyo", "Rome", "London", "Dubai", "Miami", "Lisbon", "Bangkok"]:
+        cache.store(f"Find me a hotel in {city}", context, f"Stay in {city}", "Hotel Specialist")
+    assert len(cache) == 4
+    assert cache.stats.evictions == 4
+    assert sum(len(keys) for keys in cache._by_signature.values()) == 4
+
+
+def test_signature_index_shrinks_with_expiry():
+    cache = ResponseCache(ttl=0.05, maxsize=100)
+    context = UserContext(user_id="test")
+    cache.store("Find me a hotel in Paris", context, "Stay in Paris", "Hotel Specialist")
+    time.sleep(0.1)
+    cache.store("Find me a hotel in Tokyo", context, "Stay in Tokyo", "Hotel Specialist")
+    assert sum(len(keys) for keys in cache._by_signature.values()) == 1
+    assert cache.stats.evictions == 0
+    assert cache.lookup("Find me a hotel in Tokyo", context) is not None
+
+
+def test_reversed_route_is_a_miss():
+    cache = ResponseCache(ttl=60, maxsize=100, similarity_threshold=0.5)
+    context = UserContext(user_id="test")
+    cache.store("I need a flight from New York to Chicago tomorrow", context, "NYC to ORD", "Flight Specialist")
+    assert cache.lookup("I need a flight from New York to Chicago tomorrow", context) is not None
+    assert cache.lookup("I need a flight to New York from Chicago tomorrow", context) is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("hotel in Paris for 2 adults", "hotel in Paris for 5 adults"),
+    ("4-star hotel in Rome", "5-star hotel in Rome"),
+    ("hotel in London for 3 nights", "hotel in London for 4 nights"),
+])
+def test_counts_are_part_of_the_key(stored, asked):
+    cache = ResponseCache(ttl=60, maxsize=100, similarity_threshold=0.5)
+    context = UserContext(user_id="test")
+    cache.store(stored, context, "A hotel", "Hotel Specialist")
+    assert cache.lookup(stored, context) is not None
+    assert cache.lookup(asked, context) is None
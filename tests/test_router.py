@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+import pytest
+
+from flight_inventory import find_travel_date
+from router import weather_request
+
+SUNDAY = date(2026, 10, 18)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Weather in Paris", None),
+    ("Weather in Paris today", SUNDAY),
+    ("Weather in Paris tomorrow", date(2026, 10, 19)),
+    ("Will it rain in Paris next Friday?", date(2026, 10, 23)),
+    ("Will it rain in London on Saturday?", date(2026, 10, 24)),
+    ("weather in Paris this weekend", SUNDAY),
+    ("weather in Rome in 3 days", date(2026, 10, 21)),
+    ("weather in Rome on 2026-11-02", date(2026, 11, 2)),
+    ("it may rain in Paris", None),
+])
+def test_find_travel_date(text, expected):
+    assert find_travel_date(text, SUNDAY) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Will it rain in Tokyo in March?",
+    "Weather in Paris next week",
+    "Is it sunny in Rome on the 5th?",
+])
+def test_vague_dates_are_refused(text):
+    with pytest.raises(ValueError):
+        find_travel_date(text, SUNDAY)
+
+
+def test_weather_request_dates():
+    assert weather_request("What's the weather in Paris?") == ("Paris", date.today().isoformat())
+    assert weather_request("Will it rain in Paris tomorrow?") == ("Paris", (date.today() + timedelta(days=1)).isoformat())
+    friday = weather_request("Will it rain in Paris next Friday?")
+    assert friday is not None and date.fromisoformat(friday[1]).weekday() == 4
+    assert weather_request("Will it rain in Tokyo in March?") is None
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+import tool_pool
+from flight_inventory import get_flight_inventory
+from tools import rank_flights
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("TOOL_WORKERS", "1")
+    tool_pool.close_tool_pool()
+    pool = tool_pool.get_tool_pool()
+    pool.start()
+    yield pool
+    tool_pool.close_tool_pool()
+
+
+def test_offloaded_search_sees_price_updates(pool):
+    inventory = get_flight_inventory()
+    day = date.today() + timedelta(days=1)
+    rows = inventory.lookup("New York", "Miami", day)
+    assert len(rows)
+
+    before = asyncio.run(rank_flights("New York", "Miami", day, None))
+    old = inventory.price[rows[0]]
+    inventory.update_prices(rows[:1], [old + 123.0])
+    try:
+        after = asyncio.run(rank_flights("New York", "Miami", day, None))
+        changed = [a.price for a, b in zip(after, before) if a.price != b.price]
+        assert changed == [pytest.approx(old + 123.0, abs=0.01)]
+    finally:
+        inventory.update_prices(rows[:1], [old])
+
+
+def test_parent_keeps_its_data_after_close(pool):
+    inventory = get_flight_inventory()
+    prices = inventory.price.copy()
+    tool_pool.close_tool_pool()
+    assert (inventory.price == prices).all()
+    inventory.update_prices([0], [prices[0]])
@@ -0,0 +1,40 @@
+from datetime import date
+
+import pytest
+
+from trip import DEFAULT_TRIP_DAYS, _TRIP_CUE, extract_trip
+
+SUNDAY = date(2026, 10, 18)
+
+
+@pytest.mark.parametrize("text", [
+    "Plan my whole trip to Paris in March, flights and hotels",
+    "Flights and hotels for Rome next week",
+])
+def test_unresolved_start_dates_are_left_to_the_planner(text):
+    assert extract_trip(text, SUNDAY) is None
+
+
+@pytest.mark.parametrize("text, start", [
+    ("Plan my whole trip to Paris, flights and hotels", date(2026, 10, 19)),
+    ("Flights and hotels for Paris next Friday, 4 days", date(2026, 10, 23)),
+    ("Whole trip to Tokyo from 2026-12-01 for a week", date(2026, 12, 1)),
+])
+def test_start_dates(text, start):
+    assert extract_trip(text, SUNDAY).start == start
+
+
+def test_nightly_rate_is_not_the_trip_length():
+    request = extract_trip("whole trip to New York from Chicago under $150 a night", SUNDAY)
+    assert request.days == DEFAULT_TRIP_DAYS
+    assert request.max_nightly == 150
+
+
+@pytest.mark.parametrize("text, whole_trip", [
+    ("Thanks for everything! What's the weather in Rome?", False),
+    ("Plan everything for my trip to Rome", True),
+    ("Can you sort out everything for our holiday in Lisbon?", True),
+    ("Flights and hotels for Paris", True),
+])
+def test_whole_trip_cue(text, whole_trip):
+    assert bool(_TRIP_CUE.search(text)) == whole_trip
@@ -0,0 +1,275 @@
+import asyncio
+import atexit
+import functools
+import importlib
+import io
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import timed
+
+# -- Tool worker pool --
+
+# The search tools rank over NumPy inventories in plain Python and NumPy code. Run inside the
+# agent's event loop, a long search stalls every other conversation in the process. Functions
+# registered with `offload` can instead run in a ProcessPoolExecutor:
+#
+#     share("route_graph", get_route_graph)
+#
+#     @offload("route_graph")
+#     def rank_flights(graph: RouteGraph, origin: str, ...) -> List[FlightRecord]:
+#
+# `await rank_flights(origin, ...)` passes the shared object as the first argument. When the
+# pool starts, the parent loads every shared object once and pickles them together; each NumPy
+# column is written into a single shared-memory block instead of into the pickle. Workers
+# unpickle that small payload once at start-up, and their columns are read-only views on the
+# block: nothing is copied per worker or per call. A call sends only its arguments and gets
+# the result records back; formatting and the tool cache stay in the parent. Once published,
+# the parent's own objects are pointed at the block as well (`adopt`), so in-place updates
+# such as FlightInventory.update_prices, and the derived prices its listeners keep in step,
+# are written straight into the memory the workers read. A search running during an update
+# may see some of the new prices and not others, as it would inline. Without TOOL_WORKERS,
+# or with 0, the functions run inline as before.
+
+# Columns smaller than this stay in the pickle; the block is laid out on cache-line boundaries
+MIN_SHARED_BYTES = 4096
+ALIGNMENT = 64
+
+
+@dataclass
+class _Task:
+    func: Callable[..., Any]
+    target: str
+
+
+_loaders: Dict[str, Callable[[], Any]] = {}
+_tasks: Dict[str, _Task] = {}
+
+
+def share(name: str, loader: Callable[[], Any]) -> None:
+    """Register data for offloaded functions; `loader` runs in the parent when the pool starts."""
+    _loaders[name] = loader
+
+
+def offload(target: str):
+    """Run a function in the worker pool, with the shared object `target` as its first argument.
+
+    The decorated function becomes a coroutine function taking the remaining arguments; its
+    arguments and result must pickle.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        _tasks[name] = _Task(func, target)
+
+        @functools.wraps(func)
+        async def call(*args):
+            pool = get_tool_pool()
+            if pool is None:
+                return func(_loaders[target](), *args)
+            return await pool.call(name, args)
+
+        return call
+
+    return decorator
+
+
+# -- Shared-memory publishing --
+
+class _SharingPickler(pickle.Pickler):
+    """Pickles NumPy columns as references to `arrays`, which end up in shared memory."""
+
+    def __init__(self, file, arrays: List[np.ndarray]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = arrays
+        self._ids: Dict[int, int] = {}
+
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray and not obj.dtype.hasobject and obj.nbytes >= MIN_SHARED_BYTES:
+            if id(obj) not in self._ids:
+                self._ids[id(obj)] = len(self.arrays)
+                self.arrays.append(obj)
+            return self._ids[id(obj)]
+        return None
+
+
+class _AttachingUnpickler(pickle.Unpickler):
+    def __init__(self, file, arrays: List[np.ndarray]):
+        super().__init__(file)
+        self.arrays = arrays
+
+    def persistent_load(self, index):
+        return self.arrays[index]
+
+
+def publish(objects: Dict[str, Any]) -> Tuple[shared_memory.SharedMemory, list, bytes, List[np.ndarray]]:
+    """Copy the columns of `objects` into a new shared-memory block.
+
+    Returns the block, a manifest of (offset, dtype, shape) per column, the pickled objects
+    with the columns left out, and the columns in manifest order. The caller owns the block
+    and must unlink it.
+    """
+    arrays: List[np.ndarray] = []
+    payload = io.BytesIO()
+    _SharingPickler(payload, arrays).dump(objects)
+
+    manifest, size = [], 0
+    for array in arrays:
+        size = -(-size // ALIGNMENT) * ALIGNMENT
+        manifest.append((size, array.dtype, array.shape))
+        size += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for array, (offset, dtype, shape) in zip(arrays, manifest):
+        np.ndarray(shape, dtype, buffer=block.buf, offset=offset)[...] = array
+    return block, manifest, payload.getvalue(), arrays
+
+
+def _rebind(obj: Any, replace: Dict[int, np.ndarray], seen: set) -> None:
+    """Swap arrays found in attributes, dicts and lists under `obj` for `replace[id(array)]`."""
+    if id(obj) in seen or isinstance(obj, (type, np.ndarray, str, bytes)):
+        return
+    seen.add(id(obj))
+    if isinstance(obj, (dict, list)):
+        slots = obj
+    elif hasattr(obj, "__dict__"):
+        slots = vars(obj)
+    else:
+        return
+    for key in (range(len(slots)) if isinstance(slots, list) else list(slots)):
+        value = slots[key]
+        if type(value) is not np.ndarray:
+            _rebind(value, replace, seen)
+        elif id(value) in replace:
+            slots[key] = replace[id(value)]
+
+
+def adopt(objects: Dict[str, Any], columns: List[np.ndarray], block: shared_memory.SharedMemory, manifest: list) -> List[np.ndarray]:
+    """Point the parent's published objects at their columns in the block; returns the views.
+
+    Writes the parent then makes in place land in shared memory, where the workers see them.
+    """
+    views = [np.ndarray(shape, dtype, buffer=block.buf, offset=offset) for offset, dtype, shape in manifest]
+    _rebind(objects, {id(column): view for column, view in zip(columns, views)}, set())
+    return views
+
+
+def release(objects: Dict[str, Any], views: List[np.ndarray]) -> None:
+    """Undo `adopt`: give the parent's objects private copies of the columns, current values included."""
+    _rebind(objects, {id(view): view.copy() for view in views}, set())
+
+
+def attach(block: shared_memory.SharedMemory, manifest: list, payload: bytes) -> Dict[str, Any]:
+    """Rebuild published objects over read-only views of the block's columns."""
+    arrays = []
+    for offset, dtype, shape in manifest:
+        array = np.ndarray(shape, dtype, buffer=block.buf, offset=offset)
+        array.flags.writeable = False
+        arrays.append(array)
+    return _AttachingUnpickler(io.BytesIO(payload), arrays).load()
+
+
+# -- Worker processes --
+
+# Set in each worker by its initializer; the block stays open for the life of the process
+_worker_block: Optional[shared_memory.SharedMemory] = None
+_worker_objects: Dict[str, Any] = {}
+
+
+def _init_worker(modules: List[str], block_name: str, manifest: list, payload: bytes) -> None:
+    global _worker_block
+    # Importing the modules registers their offloaded functions in this process
+    for module in modules:
+        importlib.import_module(module)
+    _worker_block = shared_memory.SharedMemory(name=block_name)
+    _worker_objects.update(attach(_worker_block, manifest, payload))
+
+
+def _run_task(name: str, args: tuple):
+    task = _tasks[name]
+    return task.func(_worker_objects[task.target], *args)
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _start_method() -> str:
+    # Forking a process that runs threads (Streamlit, the agent runtime) can deadlock the child
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class ToolPool:
+    """Worker processes attached to one shared-memory copy of the registered data."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._objects = {name: loader() for name, loader in _loaders.items()}
+        self.block, manifest, payload, columns = publish(self._objects)
+        self._views = adopt(self._objects, columns, self.block, manifest)
+        del columns
+        modules = sorted({task.func.__module__ for task in _tasks.values()})
+        self._executor = ProcessPoolExecutor(
+            max_workers= workers,
+            mp_context= multiprocessing.get_context(_start_method()),
+            initializer= _init_worker,
+            initargs= (modules, self.block.name, manifest, payload),
+        )
+
+    @property
+    def shared_bytes(self) -> int:
+        return self.block.size
+
+    def start(self) -> int:
+        """Block until the workers are up and attached; returns how many answered."""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        wait(futures)
+        return len({future.result() for future in futures})
+
+    async def call(self, name: str, args: tuple):
+        loop = asyncio.get_running_loop()
+        with timed("tool_worker", name.rsplit(".", 1)[-1]):
+            return await loop.run_in_executor(self._executor, _run_task, name, args)
+
+    def close(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+        # The parent keeps using its objects after the pool is gone
+        release(self._objects, self._views)
+        self._views = []
+        try:
+            self.block.close()
+        except BufferError:
+            # Something still holds a view on a column; the mapping goes when the process does
+            pass
+        self.block.unlink()
+
+
+_pool: Optional[ToolPool] = None
+
+
+def get_tool_pool() -> Optional[ToolPool]:
+    """The process-wide pool with TOOL_WORKERS processes; None (run inline) when unset or 0."""
+    global _pool
+    if _pool is None and _worker_block is None:
+        workers = int(os.getenv("TOOL_WORKERS") or 0)
+        if workers > 0:
+            _pool = ToolPool(workers)
+    return _pool
+
+
+def close_tool_pool() -> None:
+    """Stop the workers and free the shared block; the next offloaded call reads TOOL_WORKERS again."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+atexit.register(close_tool_pool)
@@ -1,144 +1,143 @@
 from agents import function_tool, RunContextWrapper
-import requests
-from datetime import datetime, timedelta
-from dotenv import load_dotenv
+from datetime import date, datetime, timedelta
 from typing import Optional, List
-import json
 
 from context import UserContext
+from cache import cached_tool
+from climatology import get_climatology
+from connections import RouteGraph, get_route_graph
+from fare_calendar import get_fare_calendar
+from flight_inventory import parse_travel_date
+from hotel_inventory import HotelInventory, get_hotel_inventory
+from records import FlightRecord, HotelRecord, WeatherRecord, compact_output, dumps_table, encode, output_variant
+from tool_pool import offload, share
+from weather import WeatherError, get_weather_client, weather_api_enabled
+
+# Maximum number of flights returned to the Flight Specialist per search
+MAX_FLIGHT_RESULTS = 10
+# Longest date range the fare calendar covers in one call
+MAX_CALENDAR_DAYS = 31
+# Maximum number of hotels returned to the Hotel Specialist per search
+MAX_HOTEL_RESULTS = 5
+
+# Cache lifetimes in seconds; fares move faster than hotel rates, forecasts slowest of all
+WEATHER_CACHE_TTL = 30 * 60
+FLIGHT_CACHE_TTL = 5 * 60
+HOTEL_CACHE_TTL = 10 * 60
 
 # -- Weather tool --
 
-# We'll work with dummy data first and then after testing replace it with a real API call.
+# The live forecast comes from weather.py; past its 5-day window, and offline, the answer is the
+# city's climate normals for that day of the year from the memory-mapped store (climatology.py).
 
 # --- Tools ---
 
+@cached_tool(ttl=WEATHER_CACHE_TTL, name="get_weather_forecast")
+async def weather_forecast(city: str, date: str, compact: bool = False) -> str:
+    """The forecast for a city and date as a sentence, or as a compact table with `compact`."""
+    # Use the live OpenWeatherMap forecast (async, pooled client) when an API key is configured
+    forecast = None
+    travel_date = parse_travel_date(date)
+    if weather_api_enabled():
+        try:
+            summary = await get_weather_client().daily_summary(city, travel_date.isoformat())
+            if summary:
+                forecast = WeatherRecord(city, date, summary["condition"], f"{summary['temp_min']}-{summary['temp_max']}")
+        except WeatherError:
+            pass
+    
+    # Dates beyond the 5-day forecast window and API failures use the climate normals
+    forecast = forecast or get_climatology().forecast(city, travel_date)
+    if forecast is None:
+        return f"Weather forecast for {city} is not available."
+    return dumps_table([forecast]) if compact else forecast.describe()
+
+
 @function_tool
 async def get_weather_forecast(city: str, date: str) -> str:
     """Get the weather forecast for a city on a specific date."""
-    # In a real implementation, this would call a weather API
-    weather_data = {
-        "New York": {"sunny": 0.3, "rainy": 0.4, "cloudy": 0.3},
-        "Los Angeles": {"sunny": 0.8, "rainy": 0.1, "cloudy": 0.1},
-        "Chicago": {"sunny": 0.4, "rainy": 0.3, "cloudy": 0.3},
-        "Miami": {"sunny": 0.7, "rainy": 0.2, "cloudy": 0.1},
-        "London": {"sunny": 0.2, "rainy": 0.5, "cloudy": 0.3},
-        "Paris": {"sunny": 0.4, "rainy": 0.3, "cloudy": 0.3},
-        "Tokyo": {"sunny": 0.5, "rainy": 0.3, "cloudy": 0.2},
-    }
-    
-    if city in weather_data:
-        conditions = weather_data[city]
-        # Simple simulation based on probabilities
-        highest_prob = max(conditions, key=conditions.get)
-        temp_range = {
-            "New York": "15-25°C",
-            "Los Angeles": "20-30°C",
-            "Chicago": "10-20°C",
-            "Miami": "25-35°C",
-            "London": "10-18°C",
-            "Paris": "12-22°C",
-            "Tokyo": "15-25°C",
-        }
-        return f"The weather in {city} on {date} is forecasted to be {highest_prob} with temperatures around {temp_range.get(city, '15-25°C')}."
-    else:
-        return f"Weather forecast for {city} is not available."
+    return await weather_forecast(city, date, compact= compact_output())
     
     
+# -- Search workers --
+
+# The ranking behind search_flights and search_hotels runs through tool_pool.py: with
+# TOOL_WORKERS set, in worker processes that read the route graph and the hotel inventory from
+# shared memory, so a long search does not hold up the event loop; otherwise inline. The tools
+# below keep their signatures and still format and cache the results in this process.
+
+share("route_graph", get_route_graph)
+share("hotel_inventory", get_hotel_inventory)
+
+
+@offload("route_graph")
+def rank_flights(graph: RouteGraph, origin: str, destination: str, travel_date: date, preferred_airlines: Optional[List[str]]) -> List[FlightRecord]:
+    """Direct flights and one- or two-stop connections, ranked on price, duration and stops."""
+    itineraries = graph.search(
+        origin, destination, travel_date,
+        preferred_airlines= preferred_airlines,
+        limit= MAX_FLIGHT_RESULTS,
+    )
+    return [graph.to_record(itinerary) for itinerary in itineraries]
+
+
+@offload("hotel_inventory")
+def rank_hotels(inventory: HotelInventory, city: str, preferred_amenities: Optional[List[str]], budget_level: Optional[str], max_price: Optional[float]) -> List[HotelRecord]:
+    """Hotels ranked by matching amenities, then by price according to the budget level."""
+    return inventory.search(
+        city,
+        preferred_amenities= preferred_amenities,
+        budget_level= budget_level,
+        max_price= max_price,
+        limit= MAX_HOTEL_RESULTS,
+    )
+
+
 @function_tool
-def search_flights(wrapper: RunContextWrapper[UserContext], origin: str, destination: str, date: str) -> str:
+@cached_tool(ttl=FLIGHT_CACHE_TTL, context_fields=("preferred_airlines",), variant=output_variant)
+async def search_flights(wrapper: RunContextWrapper[UserContext], origin: str, destination: str, date: str) -> str:
     """Search for flights from origin to destination on a specific date."""
-    # In a real implementation, this would call a flight API
-    # for now using mock data
-    
-    flight_options = [
-        {
-            "airline": "SkyWays",
-            "departure_time": "08:00",
-            "arrival_time": "10:30",
-            "price": 350.00,
-            "direct": True
-        },
-        {
-            "airline": "OceanAir",
-            "departure_time": "12:45",
-            "arrival_time": "15:15",
-            "price": 275.50,
-            "direct": True
-        },
-        {
-            "airline": "MountainJet",
-            "departure_time": "16:30",
-            "arrival_time": "21:45",
-            "price": 225.75,
-            "direct": False
-        }
-    ]
+    # Direct flights and one- or two-stop connections come from the route graph over the fare
+    # inventory (connections.py), ranked on price, duration and stops
+    travel_date = parse_travel_date(date)
     
     # apply user preferences if available
+    preferred_airlines = None
     if wrapper and wrapper.context:
         preferred_airlines = wrapper.context.preferred_airlines
-        if preferred_airlines:
-            # Move the preferred airlines to the top of the list
-            flight_options.sort(key= lambda x: x["airline"] not in preferred_airlines)
+    
+    flight_options = await rank_flights(origin, destination, travel_date, preferred_airlines)
+    
+    return encode(flight_options)    
 
-            for flight in flight_options:
-                if flight["airline"] in preferred_airlines:
-                    flight["preferred"] = True
+@function_tool
+def search_fare_calendar(origin: str, destination: str, start: str, end: str) -> str:
+    """Find the cheapest fare on each day from start to end (inclusive) for flexible travel dates."""
+    # Answered from per-day minimum fares kept current by fare_calendar.py, so the whole range
+    # costs one tool call; not cached, since the calendar already follows every fare change
+    first_date, last_date = parse_travel_date(start), parse_travel_date(end)
+    if last_date < first_date:
+        raise ValueError("The end date must not be before the start date.")
+    last_date = min(last_date, first_date + timedelta(days=MAX_CALENDAR_DAYS - 1))
+    
+    fare_days = get_fare_calendar().lookup(origin, destination, first_date, last_date)
     
-    return json.dumps(flight_options)    
+    # Every day of the range matters here, so the compact table is not cut to the top k
+    return encode(fare_days, ranked= False)
+
 
 @function_tool
-def search_hotels(wrapper: RunContextWrapper[UserContext], city: str, check_in: str, check_out:str, max_price: Optional[float] = None) -> str:
+@cached_tool(ttl=HOTEL_CACHE_TTL, context_fields=("hotel_amenities", "budget_level"), variant=output_variant)
+async def search_hotels(wrapper: RunContextWrapper[UserContext], city: str, check_in: str, check_out:str, max_price: Optional[float] = None) -> str:
     """Search for hotels in a city for specific dates within a price range."""
-    # In a real implementation, this would call a hotel search API
-    hotel_options = [
-        {
-            "name": "City Center Hotel",
-            "location": "Downtown",
-            "price_per_night": 199.99,
-            "amenities": ["WiFi", "Pool", "Gym", "Restaurant"]
-        },
-        {
-            "name": "Riverside Inn",
-            "location": "Riverside District",
-            "price_per_night": 149.50,
-            "amenities": ["WiFi", "Free Breakfast", "Parking"]
-        },
-        {
-            "name": "Luxury Palace",
-            "location": "Historic District",
-            "price_per_night": 349.99,
-            "amenities": ["WiFi", "Pool", "Spa", "Fine Dining", "Concierge"]
-        }
-    ]
-    
-    # Filter by max_price if provided
-    if max_price is not None:
-        filtered_hotels = [hotel for hotel in hotel_options if hotel["price_per_night"] <= max_price]
-    else: 
-        filtered_hotels = hotel_options
-        
+    # Hotels come from the bitmask-indexed inventory (hotel_inventory.py); only the top results are returned
+    preferred_amenities = None
+    budget_level = None
     if wrapper and wrapper.context:
         preferred_amenities = wrapper.context.hotel_amenities
         budget_level = wrapper.context.budget_level
-        
-        # Sort hotels by preference match
-        if preferred_amenities:
-            # Calculate a score based on how many preferred amenities each hotel has
-            for hotel in filtered_hotels:
-                matching_amenities = [a for a in preferred_amenities if a in hotel["amenities"]]
-                hotel["matching_amenities"] = matching_amenities    # add a new key to the hotel dict
-                hotel["preference_score"] = len(matching_amenities)
-                
-        # sort by preference score
-        filtered_hotels.sort(key = lambda x: x["preference_score"], reverse=True)
-        
-        # Apply budget filter if available
-        if budget_level:
-            if budget_level == "budget":
-                filtered_hotels.sort(key = lambda x: x["price_per_night"])
-            elif budget_level == "luxury":
-                filtered_hotels.sort(key = lambda x: x["price_per_night"], reverse=True)
     
-    return json.dumps(filtered_hotels)
\ No newline at end of file
+    # Rank by matching amenities, then by price according to the budget level
+    hotel_options = await rank_hotels(city, preferred_amenities, budget_level, max_price)
+    
+    return encode(hotel_options)
\ No newline at end of file
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import html
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from cachetools import LRUCache
+
+# -- Transcript rendering --
+
+# home.py reruns its whole script on every interaction, and used to rebuild and resend one
+# markdown element per message each time, all parsed again as markdown in the browser. Here
+# each message is rendered to HTML once and kept by its id, and messages are grouped into
+# pages of PAGE_SIZE. A full page never changes, so its joined HTML is cached too; only the
+# last page grows as messages are appended. The page shows the last page plus `earlier`
+# full pages before it, older ones stay behind a button, so a rerun sends a bounded amount.
+# Pages go out through st.html, which is not run through markdown. Assistant outputs with
+# structure are HTML from format_agent_response (home.py); plain-text replies are markdown
+# and rendered here, with raw HTML escaped like user messages.
+#
+# The avatars are SVG files in assets/, inlined into the page CSS once as data URIs instead
+# of an <img> per message pointing at an external avatar service.
+
+PAGE_SIZE = 20
+DEFAULT_CACHE_SIZE = 4096   # rendered messages kept, across every session in the process
+
+ASSETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+
+def chat_message(role: str, content: str, **fields: Any) -> Dict[str, Any]:
+    """A new chat_history entry with its id and timestamp."""
+    return {
+        "id": uuid.uuid4().hex,
+        "role": role,
+        "content": content,
+        **fields,
+        "timestamp": datetime.now().strftime("%I:%M %p"),
+    }
+
+
+def message_id(message: Dict[str, Any]) -> str:
+    """The message's id; entries saved before ids existed get one from their contents."""
+    if "id" in message:
+        return message["id"]
+    key = f"{message['role']}\0{message.get('timestamp', '')}\0{message['content']}"
+    return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _markdown():
+    # Imported on the first plain-text reply rather than with the page
+    from markdown_it import MarkdownIt
+
+    return MarkdownIt("commonmark", {"html": False})
+
+
+def render_message(message: Dict[str, Any]) -> str:
+    """One chat message as HTML, avatar and timestamp included."""
+    role = message["role"]
+    content = message["content"]
+    if role == "user":
+        body = html.escape(content).replace("\n", "<br>")
+    elif isinstance(message.get("output"), dict):
+        body = content  # format_agent_response HTML
+    else:
+        body = _markdown().render(content)
+    return (
+        f'<div class="chat-message {role}"><div class="content">'
+        f'<div class="avatar {role}"></div>'
+        f'<div class="message">{body}<div class="timestamp">{html.escape(message.get("timestamp", ""))}</div></div>'
+        "</div></div>"
+    )
+
+
+@lru_cache(maxsize=1)
+def avatar_css() -> str:
+    """CSS rules giving `.avatar.user` and `.avatar.assistant` their pictures from assets/."""
+    rules = []
+    for role in ("user", "assistant"):
+        with open(os.path.join(ASSETS, f"avatar_{role}.svg"), "rb") as f:
+            data = base64.b64encode(f.read()).decode()
+        rules.append(f'.avatar.{role} {{ background-image: url("data:image/svg+xml;base64,{data}"); }}')
+    return "\n".join(rules)
+
+
+@dataclass
+class RenderStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class TranscriptRenderer:
+    """Rendered HTML per message and per full page of messages, shared by every session."""
+
+    def __init__(self, page_size: int = PAGE_SIZE, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.page_size = page_size
+        self.stats = RenderStats()
+        self._messages: LRUCache = LRUCache(maxsize)
+        self._pages: LRUCache = LRUCache(max(maxsize // page_size, 1))
+        # Streamlit runs each session's script in its own thread
+        self._lock = threading.Lock()
+
+    def _cached(self, cache: LRUCache, key, render) -> str:
+        with self._lock:
+            rendered = cache.get(key)
+        if rendered is not None:
+            self.stats.hits += 1
+            return rendered
+        self.stats.misses += 1
+        rendered = render()
+        with self._lock:
+            cache[key] = rendered
+        return rendered
+
+    def message_html(self, message: Dict[str, Any]) -> str:
+        return self._cached(self._messages, message_id(message), lambda: render_message(message))
+
+    def page_count(self, messages: List[Dict[str, Any]]) -> int:
+        return -(-len(messages) // self.page_size)
+
+    def page_html(self, messages: List[Dict[str, Any]], page: int) -> str:
+        """The HTML of page `page`, counted from the first message."""
+        chunk = messages[page * self.page_size: (page + 1) * self.page_size]
+
+        def join() -> str:
+            return "\n".join(self.message_html(message) for message in chunk)
+
+        if len(chunk) < self.page_size:
+            return join()
+        return self._cached(self._pages, (message_id(chunk[0]), message_id(chunk[-1])), join)
+
+    def visible_pages(self, messages: List[Dict[str, Any]], earlier: int) -> range:
+        """The last page, which may still grow, and up to `earlier` full pages before it."""
+        count = self.page_count(messages)
+        return range(max(count - 1 - earlier, 0), count)
+
+
+@lru_cache(maxsize=1)
+def get_transcript_renderer() -> TranscriptRenderer:
+    """The process-wide renderer, sized by TRANSCRIPT_PAGE_SIZE and TRANSCRIPT_CACHE_SIZE."""
+    return TranscriptRenderer(
+        page_size= int(os.getenv("TRANSCRIPT_PAGE_SIZE", PAGE_SIZE)),
+        maxsize= int(os.getenv("TRANSCRIPT_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+    )
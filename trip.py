@@ -0,0 +1,221 @@
+import asyncio
+import copy
+import json
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, List, Optional, Type, Union
+
+from agents import Agent, InputGuardrailTripwireTriggered, RunContextWrapper, Runner
+from agents.guardrail import InputGuardrailResult
+from agents.result import RunResult
+from pydantic import BaseModel
+
+from budget import extract_budget_signals, get_cost_table
+from flight_inventory import find_travel_date
+from metrics import timed
+from router import last_user_text
+from tools import search_flights, search_hotels, weather_forecast
+
+# -- Trip orchestration --
+
+# Through the Travel Planner, a whole trip is a chain of model round-trips: the planner calls
+# the weather tool and answers, and flights and hotels each take a handoff, a tool call and an
+# answer, one request after the other. For a whole-trip request the parameters are parsed once
+# from the message instead; the flight search, hotel search and a weather lookup per day run
+# at once as plain tool calls; then the flight and hotel specialists and the planner each take
+# a single model turn at the same time, with the search results in their input. Their answers
+# are merged into one combined plan. Input guardrails run alongside, as in speculative.py.
+
+# Length of a trip that does not say, and the most days that get a weather lookup
+DEFAULT_TRIP_DAYS = 3
+MAX_WEATHER_DAYS = 7
+
+_TRIP_CUE = re.compile(
+    r"\b(?:whole|full|entire|complete)\s+(?:trip|vacation|holiday|itinerary)\b"
+    r"|\b(?:plan|book|organi[sz]e|sort out)\s+everything\b|\beverything\s+for\s+(?:my|our|the|a)\s+(?:trip|vacation|holiday)\b"
+    r"|\bflights?\b.*\bhotels?\b|\bhotels?\b.*\bflights?\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+@dataclass
+class TripRequest:
+    destination: str
+    start: date
+    days: int
+    origin: Optional[str] = None
+    budget: Optional[float] = None
+    max_nightly: Optional[float] = None
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.days)
+
+    def describe(self) -> str:
+        route = f"from {self.origin} to {self.destination}" if self.origin else f"to {self.destination}"
+        text = f"Trip {route}, {self.start.isoformat()} to {self.end.isoformat()} ({self.days} days)"
+        if self.budget:
+            text += f", budget ${self.budget:,.0f}"
+        return text + "."
+
+
+def extract_trip(text: str, today: Optional[date] = None) -> Optional[TripRequest]:
+    """Parse destination, origin, dates and budget out of a message.
+
+    None without a destination, or when the start date can't be pinned to one day ("in
+    March"): the planner asks or decides instead. A message with no date starts tomorrow.
+    """
+    table = get_cost_table()
+    destination = table.find_destination(text)
+    origin = table.find_origin(text)
+    if destination is None or (origin is not None and origin.city == destination.city):
+        return None
+
+    try:
+        start = find_travel_date(text, today) or (today or date.today()) + timedelta(days=1)
+    except ValueError:
+        return None
+    signals = extract_budget_signals(text)
+    return TripRequest(
+        destination= destination.city,
+        start= start,
+        days= signals.days or DEFAULT_TRIP_DAYS,
+        origin= origin.city if origin else None,
+        budget= signals.budget,
+        max_nightly= max(signals.nightly_amounts) if signals.nightly_amounts else None,
+    )
+
+
+def _with_note(input: Union[str, list], note: str) -> list:
+    """The conversation plus a system note after the latest user message."""
+    items = [{"role": "user", "content": input}] if isinstance(input, str) else list(input)
+    return items + [{"role": "system", "content": note}]
+
+
+def _has_results(output: str) -> bool:
+    return bool(output) and output not in ("[]", "no results") and not output.startswith("An error occurred")
+
+
+class TripOrchestrator:
+    """Answers a whole-trip request in one concurrent step over the planner and its specialists.
+
+    The agents are single-turn clones without tools or handoffs; list them in the agent graph
+    so replay and rate limits (replay.py, scheduler.py) cover them too.
+    """
+
+    def __init__(self, planner: Agent, flight_agent: Agent, hotel_agent: Agent, output_type: Type[BaseModel]):
+        self.source = planner
+        self.guardrails = list(planner.input_guardrails)
+        self.planner = planner.clone(name="Trip Planner", tools=[], handoffs=[], input_guardrails=[])
+        self.flight_agent = flight_agent.clone(name="Trip Flight Specialist", tools=[], handoffs=[], input_guardrails=[])
+        self.hotel_agent = hotel_agent.clone(name="Trip Hotel Specialist", tools=[], handoffs=[], input_guardrails=[])
+        self.output_type = output_type
+
+    @property
+    def agents(self) -> List[Agent]:
+        return [self.planner, self.flight_agent, self.hotel_agent]
+
+    def parse(self, text: str) -> Optional[TripRequest]:
+        """The trip in a whole-trip request (flights and hotels, 'the whole trip'...), else None."""
+        if not _TRIP_CUE.search(text):
+            return None
+        return extract_trip(text)
+
+    async def search(self, request: TripRequest, context: Any = None) -> dict:
+        """Flight and hotel searches and the daily forecasts, all at once, as the tools return them."""
+        wrapper = RunContextWrapper(context=context)
+
+        async def flights():
+            if request.origin is None:
+                return ""
+            args = {"origin": request.origin, "destination": request.destination, "date": request.start.isoformat()}
+            return await search_flights.on_invoke_tool(wrapper, json.dumps(args))
+
+        async def hotels():
+            args = {
+                "city": request.destination, "check_in": request.start.isoformat(),
+                "check_out": request.end.isoformat(), "max_price": request.max_nightly,
+            }
+            return await search_hotels.on_invoke_tool(wrapper, json.dumps(args))
+
+        days = [request.start + timedelta(days=i) for i in range(min(request.days, MAX_WEATHER_DAYS))]
+        # Sentence form: the forecasts go into the combined plan as they are
+        forecasts = [weather_forecast(request.destination, day.isoformat()) for day in days]
+        with timed("trip", "search"):
+            flight_results, hotel_results, *weather = await asyncio.gather(flights(), hotels(), *forecasts)
+        return {"flights": flight_results, "hotels": hotel_results, "weather": weather}
+
+    async def _plan(self, input: Union[str, list], context: Any, request: TripRequest) -> RunResult:
+        results = await self.search(request, context)
+        trip = request.describe()
+        weather = "\n".join(results["weather"])
+
+        runs = {
+            "plan": Runner.run(self.planner, _with_note(input, (
+                f"{trip}\nWeather for the stay:\n{weather}\n"
+                "The flight and hotel specialists are choosing the flight and the hotel at the same time; "
+                "plan the activities for the whole stay."
+            )), context=context),
+        }
+        if _has_results(results["flights"]):
+            runs["flight"] = Runner.run(self.flight_agent, _with_note(input, (
+                f"{trip}\nsearch_flights results:\n{results['flights']}\n"
+                "Recommend one of these flights; do not search again."
+            )), context=context)
+        if _has_results(results["hotels"]):
+            runs["hotel"] = Runner.run(self.hotel_agent, _with_note(input, (
+                f"{trip}\nsearch_hotels results:\n{results['hotels']}\n"
+                "Recommend one of these hotels; do not search again."
+            )), context=context)
+
+        with timed("trip", "agents"):
+            done = dict(zip(runs, await asyncio.gather(*runs.values())))
+        combined = self.output_type(
+            origin= request.origin,
+            destination= request.destination,
+            start_date= request.start.isoformat(),
+            end_date= request.end.isoformat(),
+            plan= done["plan"].final_output,
+            flight= done["flight"].final_output if "flight" in done else None,
+            hotel= done["hotel"].final_output if "hotel" in done else None,
+            weather= results["weather"],
+        )
+        return RunResult(
+            input=input,
+            new_items=[item for run in done.values() for item in run.new_items],
+            raw_responses=[response for run in done.values() for response in run.raw_responses],
+            final_output=combined,
+            input_guardrail_results=[],
+            output_guardrail_results=[],
+            _last_agent=self.planner,
+        )
+
+    async def run(self, input: Union[str, list], context: Any = None, request: Optional[TripRequest] = None) -> RunResult:
+        """Plan the trip with the planner's input guardrails running alongside."""
+        request = request or extract_trip(last_user_text(input))
+        if request is None:
+            raise ValueError("No destination found for the trip.")
+
+        main_run = asyncio.create_task(self._plan(input, context, request))
+        wrapper = RunContextWrapper(context=context)
+        checks = [
+            asyncio.create_task(guardrail.run(self.source, copy.deepcopy(input), wrapper))
+            for guardrail in self.guardrails
+        ]
+
+        guardrail_results: List[InputGuardrailResult] = []
+        try:
+            for next_check in asyncio.as_completed(checks):
+                result = await next_check
+                guardrail_results.append(result)
+                if result.output.tripwire_triggered:
+                    raise InputGuardrailTripwireTriggered(result)
+            run = await main_run
+        finally:
+            for task in (main_run, *checks):
+                if not task.done():
+                    task.cancel()
+
+        run.input_guardrail_results = guardrail_results
+        return run
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -- OpenWeatherMap client --
+
+# Async replacement for the blocking `requests` calls in test.py. One pooled httpx.AsyncClient
+# is shared per event loop (keep-alive, timeouts), transient failures are retried with
+# exponential backoff, and geocoding results are kept in a small SQLite file because a
+# city's coordinates never change. OPENWEATHER_BASE_URL points the client at a local stub.
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org"
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.25  # seconds; doubled on every retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class WeatherError(Exception):
+    """Raised when the weather service cannot answer a request."""
+
+
+class GeocodeCache:
+    """Write-through cache of city -> (lat, lon), held in memory and persisted to SQLite."""
+
+    def __init__(self, path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Tuple[float, float]] = {}
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode (city TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL)"
+            )
+            for city, lat, lon in self._conn.execute("SELECT city, lat, lon FROM geocode"):
+                self._memory[city] = (lat, lon)
+
+    @staticmethod
+    def _key(city: str) -> str:
+        return " ".join(city.split()).casefold()
+
+    def get(self, city: str) -> Optional[Tuple[float, float]]:
+        return self._memory.get(self._key(city))
+
+    def set(self, city: str, coords: Tuple[float, float]) -> None:
+        key = self._key(city)
+        with self._lock:
+            self._memory[key] = coords
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?)", (key, *coords))
+
+
+class WeatherClient:
+    """Async OpenWeatherMap client over a pooled httpx.AsyncClient."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        geocode_cache: Optional[GeocodeCache] = None,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.api_key = api_key or os.getenv("OPENWEATHER_API_KEY")
+        self.max_retries = max_retries
+        self.geocode_cache = geocode_cache or GeocodeCache()
+        self._http = httpx.AsyncClient(
+            base_url=base_url or os.getenv("OPENWEATHER_BASE_URL", DEFAULT_BASE_URL),
+            timeout=timeout,
+            limits=limits,
+        )
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def _get(self, path: str, params: dict):
+        """GET a JSON document, retrying connection errors, 429s and 5xx with backoff."""
+        params = {**params, "appid": self.api_key}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._http.get(path, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = WeatherError(f"{path} returned HTTP {response.status_code}")
+            except httpx.TransportError as e:
+                error = WeatherError(f"{path} failed: {e}")
+            except httpx.HTTPStatusError as e:
+                raise WeatherError(f"{path} returned HTTP {e.response.status_code}") from e
+            if attempt < self.max_retries:
+                await asyncio.sleep(BACKOFF_BASE * 2 ** attempt * (1 + random.random() / 2))
+        raise error
+
+    async def geocode(self, city: str) -> Tuple[float, float]:
+        coords = self.geocode_cache.get(city)
+        if coords is None:
+            data = await self._get("/geo/1.0/direct", {"q": city, "limit": 1})
+            if not data:
+                raise WeatherError(f"City '{city}' not found.")
+            coords = (data[0]["lat"], data[0]["lon"])
+            self.geocode_cache.set(city, coords)
+        return coords
+
+    async def current(self, city: str) -> dict:
+        """Current conditions for a city (metric units)."""
+        lat, lon = await self.geocode(city)
+        return await self._get("/data/2.5/weather", {"lat": lat, "lon": lon, "units": "metric"})
+
+    async def forecast(self, city: str) -> dict:
+        """Five-day / three-hour forecast for a city (metric units)."""
+        lat, lon = await self.geocode(city)
+        return await self._get("/data/2.5/forecast", {"lat": lat, "lon": lon, "units": "metric"})
+
+    async def daily_summary(self, city: str, date: str) -> Optional[dict]:
+        """Summarize the forecast for one YYYY-MM-DD date, or None if it is out of range."""
+        data = await self.forecast(city)
+        entries = [e for e in data.get("list", []) if e.get("dt_txt", "").startswith(date)]
+        if not entries:
+            return None
+        conditions = Counter(e["weather"][0]["main"].lower() for e in entries if e.get("weather"))
+        return {
+            "city": city,
+            "date": date,
+            "condition": conditions.most_common(1)[0][0] if conditions else "unknown",
+            "temp_min": round(min(e["main"]["temp_min"] for e in entries)),
+            "temp_max": round(max(e["main"]["temp_max"] for e in entries)),
+        }
+
+    async def current_many(self, cities: List[str]) -> Dict[str, object]:
+        """Fetch current conditions for several cities concurrently; failures map to the error."""
+        results = await asyncio.gather(*(self.current(city) for city in cities), return_exceptions=True)
+        return dict(zip(cities, results))
+
+
+# One client per event loop: an AsyncClient's pooled connections belong to the loop that made them.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, WeatherClient]" = weakref.WeakKeyDictionary()
+_geocode_cache: Optional[GeocodeCache] = None
+
+
+def get_weather_client() -> WeatherClient:
+    """Return the shared client for the running event loop, creating it on first use."""
+    global _geocode_cache
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        if _geocode_cache is None:
+            _geocode_cache = GeocodeCache(os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.sqlite3"))
+        client = _clients[loop] = WeatherClient(geocode_cache=_geocode_cache)
+    return client
+
+
+def weather_api_enabled() -> bool:
+    return bool(os.getenv("OPENWEATHER_API_KEY"))